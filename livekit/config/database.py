@@ -7,7 +7,7 @@ import logging
 from typing import Optional, Dict, Any
 from dataclasses import dataclass
 
-from integrations.mongodb_client import MongoDBClient
+from integrations.mongodb_client import MongoDBClient, get_mongodb_client
 
 
 @dataclass
@@ -47,7 +47,7 @@ class DatabaseClient:
             return
         
         try:
-            self._client = MongoDBClient()
+            self._client = get_mongodb_client()
             logging.info("Database client initialized successfully")
         except Exception as e:
             logging.error(f"Failed to initialize database client: {e}")
@@ -109,16 +109,16 @@ class DatabaseClient:
             
         return await self._client.save_n8n_spreadsheet_id(assistant_id, spreadsheet_id)
     
-    async def deduct_minutes(self, user_id: str, minutes: float) -> Dict[str, Any]:
+    async def deduct_minutes(self, user_id: str, minutes: float, call_id: Optional[str] = None) -> Dict[str, Any]:
         """
-        Deduct minutes from user's account after a call.
+        Deduct minutes from user's account after a call (at most once per ``call_id``).
         Returns dict with success status and remaining minutes info.
         """
         if not self.is_available():
             logging.warning("Database client not available for minutes deduction")
             return {"success": False, "error": "Database not available"}
         
-        return await self._client.deduct_minutes(user_id, minutes)
+        return await self._client.deduct_minutes(user_id, minutes, call_id=call_id)
     
     async def check_minutes_available(self, user_id: str) -> Dict[str, Any]:
         """
@@ -3,7 +3,9 @@ Settings configuration for the application.
 """
 import os
 from dataclasses import dataclass
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Sequence
+
+from utils.assistant_profiles import select_profile
 
 @dataclass
 class Settings:
@@ -38,17 +40,19 @@ def get_settings() -> Settings:
         _settings = Settings.from_env()
     return _settings
 
-def validate_model_names(config: Dict[str, Any]) -> Dict[str, Any]:
+def validate_model_names(config: Dict[str, Any], profiles: Sequence[str] = ()) -> Dict[str, Any]:
     """
     Validate and return model names from configuration.
     Ensures that LLM, STT, and TTS models are specified or defaults are used.
+    When ``profiles`` is given only the fields of those assistant profiles are copied.
     """
     if not isinstance(config, dict):
         # logging.warning(f"Invalid config type for validation: {type(config)}")
         return config or {}
     
-    # Clone to avoid mutating original if needed, typically ok to mutate
-    validated = config.copy()
+    # Clone to avoid mutating original; narrow to the caller's profiles so large
+    # fields (prompts, workflow graphs) are not copied by stages that never read them
+    validated = select_profile(config, *profiles) if profiles else config.copy()
     
     # Ensure keys exist with sensible defaults if missing
     # LLM Settings
@@ -0,0 +1,158 @@
+"""
+In-process cache for assistant configurations.
+
+Assistant documents are read on every call start but change rarely. Entries
+are kept for a bounded time (TTL) and evicted least-recently-used, and are
+invalidated as soon as the document changes: via a MongoDB change stream on
+``assistants`` when the deployment supports it (replica sets / Atlas), or by
+polling ``updated_at`` on standalone servers.
+"""
+
+import os
+import asyncio
+import datetime
+import logging
+from typing import Any, Dict, Optional, Set
+
+from integrations.change_streams import watch_collection
+from utils.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+class AssistantConfigCache:
+    """TTL + LRU cache of assistant documents keyed by assistant id."""
+
+    def __init__(
+        self,
+        ttl: float = 300.0,
+        max_entries: int = 512,
+        poll_interval: float = 15.0,
+        enabled: bool = True,
+    ):
+        self.enabled = enabled
+        self.poll_interval = poll_interval
+        self._entries = TTLCache(max_entries=max_entries, ttl=ttl, on_evict=self._forget)
+        # Mongo _id (hex) -> lookup keys the document is cached under ("asst_..." id, _id hex);
+        # pruned as entries expire or are evicted, so it never outgrows the cache
+        self._keys_by_object_id: Dict[str, Set[str]] = {}
+        self._watch_task: Optional[asyncio.Task] = None
+        # Bumped on every invalidation so fetches that raced a change are not cached
+        self.generation = 0
+
+    @classmethod
+    def from_env(cls) -> "AssistantConfigCache":
+        return cls(
+            ttl=float(os.getenv("ASSISTANT_CACHE_TTL_SECONDS", "300")),
+            max_entries=int(os.getenv("ASSISTANT_CACHE_MAX_ENTRIES", "512")),
+            poll_interval=float(os.getenv("ASSISTANT_CACHE_POLL_SECONDS", "15")),
+            enabled=os.getenv("ASSISTANT_CACHE_ENABLED", "true").lower() != "false",
+        )
+
+    def get(self, assistant_id: str) -> Optional[Dict[str, Any]]:
+        """Return a shallow copy of the cached assistant, or None."""
+        if not self.enabled:
+            return None
+        assistant = self._entries.get(assistant_id)
+        return dict(assistant) if assistant is not None else None
+
+    def put(self, assistant_id: str, assistant: Dict[str, Any], generation: Optional[int] = None) -> None:
+        """Cache an assistant document under the id it was looked up by.
+
+        ``generation`` is the value of ``self.generation`` read before the fetch;
+        the document is dropped if an invalidation happened in between.
+        """
+        if not self.enabled:
+            return
+        if generation is not None and generation != self.generation:
+            return
+        self._entries.set(assistant_id, dict(assistant))
+        object_id = assistant.get("_id_str")
+        if object_id:
+            self._keys_by_object_id.setdefault(object_id, set()).add(assistant_id)
+
+    def _forget(self, assistant_id: str, assistant: Dict[str, Any]) -> None:
+        """Drop an expired or evicted entry's key from the object id index."""
+        object_id = assistant.get("_id_str")
+        keys = self._keys_by_object_id.get(object_id)
+        if keys is None:
+            return
+        keys.discard(assistant_id)
+        if not keys:
+            del self._keys_by_object_id[object_id]
+
+    def invalidate(self, object_id: str) -> None:
+        """Drop every entry for the assistant with the given Mongo ``_id``."""
+        self.generation += 1
+        keys = self._keys_by_object_id.pop(object_id, set())
+        keys.add(object_id)
+        for key in keys:
+            self._entries.pop(key)
+        logger.debug(f"ASSISTANT_CACHE_INVALIDATED | object_id={object_id} | keys={len(keys)}")
+
+    def clear(self) -> None:
+        self.generation += 1
+        self._entries.clear()
+        self._keys_by_object_id.clear()
+
+    def ensure_watching(self, db) -> None:
+        """Start the invalidation watcher once, from inside the running event loop."""
+        if not self.enabled or db is None:
+            return
+        if self._watch_task is None or self._watch_task.done():
+            self._watch_task = asyncio.create_task(self._watch_changes(db))
+
+    async def stop(self) -> None:
+        if self._watch_task and not self._watch_task.done():
+            self._watch_task.cancel()
+            try:
+                await self._watch_task
+            except asyncio.CancelledError:
+                pass
+        self._watch_task = None
+
+    async def _watch_changes(self, db) -> None:
+        """Invalidate entries from the assistants change stream, falling back to polling."""
+        await watch_collection(
+            db.assistants,
+            on_change=self._on_change,
+            # Events may have been missed while the stream was down
+            on_reset=self.clear,
+            poll_fallback=lambda: self._poll_changes(db),
+            retry_interval=self.poll_interval,
+            pipeline=[{"$match": {"operationType": {"$in": ["insert", "update", "replace", "delete"]}}}],
+        )
+
+    def _on_change(self, change: Dict[str, Any]) -> None:
+        document_key = change.get("documentKey") or {}
+        if "_id" in document_key:
+            self.invalidate(str(document_key["_id"]))
+
+    async def _poll_changes(self, db) -> None:
+        """Polling fallback: invalidate assistants whose ``updated_at`` moved since the last poll."""
+        logger.info(f"ASSISTANT_CACHE_WATCH_STARTED | mode=polling | interval={self.poll_interval}s")
+        last_sync = datetime.datetime.now(datetime.timezone.utc)
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            # Small overlap so writes landing during the previous query are not missed
+            since = last_sync - datetime.timedelta(seconds=1)
+            last_sync = datetime.datetime.now(datetime.timezone.utc)
+            try:
+                async for doc in db.assistants.find({"updated_at": {"$gt": since}}, {"_id": 1}):
+                    self.invalidate(str(doc["_id"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"ASSISTANT_CACHE_POLL_ERROR | error={str(e)}")
+
+
+# Process-wide cache shared by every MongoDBClient in the worker
+_assistant_cache: Optional[AssistantConfigCache] = None
+
+
+def get_assistant_cache() -> AssistantConfigCache:
+    """Get the global assistant config cache instance."""
+    global _assistant_cache
+    if _assistant_cache is None:
+        _assistant_cache = AssistantConfigCache.from_env()
+    return _assistant_cache
@@ -3,42 +3,21 @@ from __future__ import annotations
 import datetime
 import logging
 import hashlib
-import time
 from dataclasses import dataclass
 from typing import Protocol, Optional
 from zoneinfo import ZoneInfo
 
 from livekit.agents.utils import http_context
 
-# Global cache for calendar slots
-_calendar_cache = {}
-_cache_ttl = 300  # 5 minutes cache TTL
-_cache_max_size = 100  # Maximum cache entries
+from utils.ttl_cache import get_cache
+
+# Global cache for calendar slots (CACHE_CALENDAR_* overrides the limits)
+_calendar_cache = get_cache("calendar", max_entries=4096, ttl=300, max_bytes=32 * 1024 * 1024)
 
 def _get_calendar_cache_key(event_type_id: str, start_time: str, end_time: str) -> str:
     """Generate cache key for calendar slots."""
     return hashlib.md5(f"{event_type_id}:{start_time}:{end_time}".encode()).hexdigest()
 
-def _is_calendar_cache_valid(timestamp: float) -> bool:
-    """Check if calendar cache entry is still valid."""
-    return time.time() - timestamp < _cache_ttl
-
-def _clean_calendar_cache():
-    """Remove expired entries from calendar cache."""
-    current_time = time.time()
-    expired_keys = [
-        key for key, (_, timestamp) in _calendar_cache.items()
-        if current_time - timestamp > _cache_ttl
-    ]
-    for key in expired_keys:
-        del _calendar_cache[key]
-    
-    # If still over limit, remove oldest entries
-    if len(_calendar_cache) > _cache_max_size:
-        sorted_items = sorted(_calendar_cache.items(), key=lambda x: x[1][1])
-        for key, _ in sorted_items[:len(_calendar_cache) - _cache_max_size]:
-            del _calendar_cache[key]
-
 # API versions & base URLs
 CAL_EVENT_TYPES_VERSION = "2024-06-14"   # v2 event types requires this header
 CAL_BOOKINGS_VERSION    = "2024-08-13"   # v2 bookings requires this header
@@ -294,18 +273,10 @@ class CalComCalendar(Calendar):
         
         # Check cache first for massive speed improvement
         cache_key = _get_calendar_cache_key(str(self._event_type_id or ""), start_param, end_param)
-        if cache_key in _calendar_cache:
-            cached_result, timestamp = _calendar_cache[cache_key]
-            if _is_calendar_cache_valid(timestamp):
-                self._log.info("CALENDAR_CACHE_HIT | saved_time=1.5s | slots=%d", len(cached_result.slots))
-                return cached_result
-            else:
-                # Remove expired entry
-                del _calendar_cache[cache_key]
-        
-        # Clean cache periodically
-        if len(_calendar_cache) > _cache_max_size * 0.8:
-            _clean_calendar_cache()
+        cached_result = _calendar_cache.get(cache_key)
+        if cached_result is not None:
+            self._log.info("CALENDAR_CACHE_HIT | saved_time=1.5s | slots=%d", len(cached_result.slots))
+            return cached_result
 
         # Try v1 first with retries
         slots = await self._fetch_slots_v1_with_retry(start_param, end_param)
@@ -340,7 +311,7 @@ class CalComCalendar(Calendar):
         result = CalendarResult(slots=slots)
         
         # Cache the result for future queries
-        _calendar_cache[cache_key] = (result, time.time())
+        _calendar_cache.set(cache_key, result)
         self._log.info("CALENDAR_CACHE_STORED | slots=%d | cache_size=%d", len(slots), len(_calendar_cache))
         
         return result
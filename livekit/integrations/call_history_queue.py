@@ -0,0 +1,281 @@
+"""
+Write-behind queue for call history records.
+
+Job shutdown callbacks hand their call record to this queue instead of
+writing to MongoDB directly. The record is first appended to a local SQLite
+journal (so nothing is lost if the worker dies or MongoDB is unreachable) and
+a background flusher upserts journaled records into ``callhistories`` in
+batches, retrying with exponential backoff.
+
+The journal may be shared by several job processes on the same host: rows are
+leased before they are flushed, and writes are upserts keyed by ``call_id``,
+so a record replayed twice is harmless.
+"""
+
+import os
+import time
+import sqlite3
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from bson import json_util
+
+logger = logging.getLogger(__name__)
+
+# Journal location when CALL_HISTORY_JOURNAL_PATH is not set; mount a persistent
+# volume here on containers, or the unflushed records are lost with the container
+DEFAULT_JOURNAL_PATH = "/var/lib/livekit-agent/call_history_journal.db"
+
+# Receives a batch of records and returns the indexes (within the batch) that failed
+BatchWriter = Callable[[List[Dict[str, Any]]], Awaitable[List[int]]]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS call_history_journal (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    call_id TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL DEFAULT 0,
+    lease_until REAL NOT NULL DEFAULT 0,
+    dead INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL
+)
+"""
+
+
+class CallHistoryJournal:
+    """SQLite-backed journal of call history records waiting to be written to MongoDB."""
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(_SCHEMA)
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_journal_due ON call_history_journal (dead, next_attempt_at)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        # One short-lived connection per operation: calls come from worker threads
+        conn = sqlite3.connect(self.path, timeout=10.0, isolation_level=None)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def append(self, record: Dict[str, Any]) -> int:
+        """Durably store a record and return its journal id."""
+        now = time.time()
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "INSERT INTO call_history_journal (call_id, payload, created_at) VALUES (?, ?, ?)",
+                (record.get("call_id", ""), json_util.dumps(record), now),
+            )
+            return cursor.lastrowid
+
+    def claim(self, limit: int, lease_seconds: float) -> List[Tuple[int, Dict[str, Any], int]]:
+        """Lease up to ``limit`` due records as ``(id, record, attempts)`` tuples."""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = conn.execute(
+                    "SELECT id, payload, attempts FROM call_history_journal "
+                    "WHERE dead = 0 AND next_attempt_at <= ? AND lease_until <= ? "
+                    "ORDER BY id LIMIT ?",
+                    (now, now, limit),
+                ).fetchall()
+                if rows:
+                    conn.executemany(
+                        "UPDATE call_history_journal SET lease_until = ? WHERE id = ?",
+                        [(now + lease_seconds, row[0]) for row in rows],
+                    )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return [(row[0], json_util.loads(row[1]), row[2]) for row in rows]
+
+    def complete(self, ids: List[int]) -> None:
+        if not ids:
+            return
+        with self._connect() as conn:
+            conn.executemany("DELETE FROM call_history_journal WHERE id = ?", [(i,) for i in ids])
+
+    def retry_later(self, failures: List[Tuple[int, int]], base_delay: float, max_delay: float, max_attempts: int) -> List[int]:
+        """Release failed ``(id, attempts)`` leases with backoff; returns ids moved to dead-letter."""
+        now = time.time()
+        dead: List[int] = []
+        updates = []
+        for journal_id, attempts in failures:
+            attempts += 1
+            if attempts >= max_attempts:
+                dead.append(journal_id)
+            delay = min(max_delay, base_delay * (2 ** (attempts - 1)))
+            updates.append((attempts, now + delay, int(attempts >= max_attempts), journal_id))
+        with self._connect() as conn:
+            conn.executemany(
+                "UPDATE call_history_journal SET attempts = ?, next_attempt_at = ?, lease_until = 0, dead = ? "
+                "WHERE id = ?",
+                updates,
+            )
+        return dead
+
+    def pending_count(self) -> int:
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM call_history_journal WHERE dead = 0").fetchone()[0]
+
+
+class CallHistoryWriteQueue:
+    """Journals call history records and flushes them to MongoDB in batches."""
+
+    def __init__(
+        self,
+        journal_path: str,
+        batch_size: int = 50,
+        flush_interval: float = 2.0,
+        retry_base_delay: float = 2.0,
+        retry_max_delay: float = 300.0,
+        max_attempts: int = 50,
+        enabled: bool = True,
+    ):
+        self.enabled = enabled
+        self.journal_path = journal_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self.max_attempts = max_attempts
+        self._journal: Optional[CallHistoryJournal] = None
+        self._writer: Optional[BatchWriter] = None
+        self._flush_task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+
+    @classmethod
+    def from_env(cls) -> "CallHistoryWriteQueue":
+        enabled = os.getenv("CALL_HISTORY_WRITE_BEHIND", "true").lower() != "false"
+        # Resolved once so the journal does not move with the working directory
+        journal_path = os.path.abspath(os.getenv("CALL_HISTORY_JOURNAL_PATH") or DEFAULT_JOURNAL_PATH)
+        if enabled:
+            logger.info(f"CALL_HISTORY_JOURNAL | path={journal_path}")
+        return cls(
+            journal_path=journal_path,
+            batch_size=int(os.getenv("CALL_HISTORY_BATCH_SIZE", "50")),
+            flush_interval=float(os.getenv("CALL_HISTORY_FLUSH_SECONDS", "2")),
+            enabled=enabled,
+        )
+
+    @property
+    def journal(self) -> CallHistoryJournal:
+        if self._journal is None:
+            self._journal = CallHistoryJournal(self.journal_path)
+        return self._journal
+
+    def ensure_started(self, writer: BatchWriter) -> None:
+        """Start the flusher once, from inside the running event loop.
+
+        Records journaled by a previous process on this host are replayed too.
+        """
+        if not self.enabled:
+            return
+        self._writer = writer
+        if self._flush_task is None or self._flush_task.done():
+            self._wakeup = asyncio.Event()
+            self._flush_task = asyncio.create_task(self._run())
+
+    async def enqueue(self, record: Dict[str, Any]) -> bool:
+        """Journal a record for the flusher. Returns once it is on disk."""
+        try:
+            journal_id = await asyncio.to_thread(self.journal.append, record)
+        except Exception as e:
+            logger.error(f"CALL_HISTORY_JOURNAL_FAILED | call_id={record.get('call_id')} | error={str(e)}")
+            return False
+        logger.info(f"CALL_HISTORY_QUEUED | call_id={record.get('call_id')} | journal_id={journal_id}")
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return True
+
+    async def flush(self, timeout: Optional[float] = None) -> int:
+        """Flush due records now (e.g. on worker shutdown). Returns how many were written."""
+        if self._writer is None:
+            return 0
+        flushed = 0
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while deadline is None or time.monotonic() < deadline:
+            written, claimed = await self._flush_batch()
+            flushed += written
+            if claimed < self.batch_size or written == 0:
+                break
+        return flushed
+
+    async def stop(self, timeout: float = 5.0) -> None:
+        if self._flush_task and not self._flush_task.done():
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+        self._flush_task = None
+        await self.flush(timeout=timeout)
+
+    async def _run(self) -> None:
+        logger.info(f"CALL_HISTORY_FLUSHER_STARTED | journal={self.journal_path} | batch_size={self.batch_size}")
+        while True:
+            try:
+                written, claimed = await self._flush_batch()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"CALL_HISTORY_FLUSH_ERROR | error={str(e)}")
+                written, claimed = 0, 0
+
+            if claimed >= self.batch_size and written:
+                continue  # backlog: keep draining
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def _flush_batch(self) -> Tuple[int, int]:
+        """Write one batch. Returns ``(written, claimed)``."""
+        # Lease long enough to cover a slow bulk write before another process may retry it
+        lease_seconds = max(60.0, self.flush_interval * 10)
+        claimed = await asyncio.to_thread(self.journal.claim, self.batch_size, lease_seconds)
+        if not claimed:
+            return 0, 0
+
+        records = [record for _, record, _ in claimed]
+        try:
+            failed_indexes = set(await self._writer(records))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"CALL_HISTORY_BATCH_FAILED | records={len(records)} | error={str(e)}")
+            failed_indexes = set(range(len(records)))
+
+        done = [journal_id for i, (journal_id, _, _) in enumerate(claimed) if i not in failed_indexes]
+        failures = [(journal_id, attempts) for i, (journal_id, _, attempts) in enumerate(claimed) if i in failed_indexes]
+        await asyncio.to_thread(self.journal.complete, done)
+        if failures:
+            dead = await asyncio.to_thread(
+                self.journal.retry_later, failures, self.retry_base_delay, self.retry_max_delay, self.max_attempts
+            )
+            if dead:
+                logger.error(f"CALL_HISTORY_DEAD_LETTER | journal_ids={dead} | kept in {self.journal_path}")
+
+        logger.info(f"CALL_HISTORY_FLUSHED | written={len(done)} | failed={len(failures)}")
+        return len(done), len(claimed)
+
+
+# Process-wide queue shared by every MongoDBClient in the worker
+_call_history_queue: Optional[CallHistoryWriteQueue] = None
+
+
+def get_call_history_queue() -> CallHistoryWriteQueue:
+    """Get the global call history write-behind queue."""
+    global _call_history_queue
+    if _call_history_queue is None:
+        _call_history_queue = CallHistoryWriteQueue.from_env()
+    return _call_history_queue
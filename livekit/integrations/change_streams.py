@@ -0,0 +1,54 @@
+"""
+Helpers for keeping in-process state in sync with MongoDB collections.
+"""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from pymongo.errors import OperationFailure, PyMongoError
+
+logger = logging.getLogger(__name__)
+
+# Error code returned by standalone servers for $changeStream
+CHANGE_STREAMS_UNSUPPORTED = 40573
+
+
+async def watch_collection(
+    collection,
+    on_change: Callable[[Dict[str, Any]], None],
+    on_reset: Callable[[], None],
+    poll_fallback: Callable[[], Awaitable[None]],
+    retry_interval: float = 15.0,
+    pipeline: Optional[List[Dict[str, Any]]] = None,
+    **watch_kwargs,
+) -> None:
+    """Feed change events of ``collection`` to ``on_change`` until cancelled.
+
+    Transient errors call ``on_reset`` (events may have been missed) and the
+    stream is reopened after ``retry_interval``. Deployments without change
+    stream support (standalone servers) hand over to ``poll_fallback``.
+    """
+    name = getattr(collection, "name", "collection")
+    resume_token = None
+    while True:
+        try:
+            async with collection.watch(pipeline or [], resume_after=resume_token, **watch_kwargs) as stream:
+                logger.info(f"CHANGE_STREAM_STARTED | collection={name}")
+                async for change in stream:
+                    resume_token = stream.resume_token
+                    on_change(change)
+        except asyncio.CancelledError:
+            raise
+        except OperationFailure as e:
+            if e.code == CHANGE_STREAMS_UNSUPPORTED:
+                logger.info(f"CHANGE_STREAM_UNSUPPORTED | collection={name} | falling back to polling")
+                await poll_fallback()
+                return
+            logger.warning(f"CHANGE_STREAM_ERROR | collection={name} | error={str(e)} | retrying")
+        except PyMongoError as e:
+            logger.warning(f"CHANGE_STREAM_ERROR | collection={name} | error={str(e)} | retrying")
+
+        on_reset()
+        resume_token = None
+        await asyncio.sleep(retry_interval)
@@ -0,0 +1,192 @@
+"""
+In-memory DID -> inbound assistant routing table.
+
+Loads every ``phonenumbers`` -> ``inbound_assistant_id`` mapping once per
+worker (in ``prewarm()``, before the first call) so that resolving the assistant for an inbound SIP call is a dict
+lookup instead of sequential MongoDB queries. The table is kept fresh from a
+change stream on ``phonenumbers`` or, on standalone servers, by a periodic
+resync that applies only the delta.
+"""
+
+import os
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional
+
+from integrations.change_streams import watch_collection
+from utils.helpers import normalize_e164
+
+logger = logging.getLogger(__name__)
+
+_PROJECTION = {"number": 1, "inbound_assistant_id": 1}
+
+
+class DIDRoutingTable:
+    """Maps normalised E.164 DIDs to inbound assistant ids."""
+
+    def __init__(self, sync_interval: float = 60.0, enabled: bool = True):
+        self.enabled = enabled
+        self.sync_interval = sync_interval
+        self._routes: Dict[str, str] = {}                    # normalised number -> assistant id
+        self._number_by_object_id: Dict[str, str] = {}       # phonenumbers _id -> normalised number
+        self._loaded = False
+        self._sync_task: Optional[asyncio.Task] = None
+        self._reload_task: Optional[asyncio.Task] = None
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_env(cls) -> "DIDRoutingTable":
+        return cls(
+            sync_interval=float(os.getenv("DID_ROUTING_SYNC_SECONDS", "60")),
+            enabled=os.getenv("DID_ROUTING_ENABLED", "true").lower() != "false",
+        )
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._loaded
+
+    def lookup(self, phone_number: str) -> Optional[str]:
+        """Return the assistant id routed to ``phone_number``, counting misses."""
+        if not self.enabled:
+            return None
+        number = normalize_e164(phone_number)
+        assistant_id = self._routes.get(number) if number else None
+        if assistant_id:
+            self.hits += 1
+            return assistant_id
+        self.misses += 1
+        logger.info(
+            f"DID_ROUTE_MISS | phone={phone_number} | loaded={self._loaded} | "
+            f"misses={self.misses} | hits={self.hits}"
+        )
+        return None
+
+    def upsert(self, phone_record: Dict[str, Any]) -> None:
+        """Add or replace the route described by a ``phonenumbers`` document."""
+        object_id = str(phone_record["_id"]) if phone_record.get("_id") is not None else None
+        number = normalize_e164(phone_record.get("number"))
+
+        # Number may have changed on an update; drop the route under the old number
+        if object_id:
+            previous = self._number_by_object_id.pop(object_id, None)
+            if previous and previous != number:
+                self._routes.pop(previous, None)
+
+        if not number:
+            return
+        assistant_id = phone_record.get("inbound_assistant_id")
+        if assistant_id:
+            self._routes[number] = assistant_id
+        else:
+            self._routes.pop(number, None)
+        if object_id:
+            self._number_by_object_id[object_id] = number
+
+    def remove(self, object_id: str) -> None:
+        number = self._number_by_object_id.pop(object_id, None)
+        if number:
+            self._routes.pop(number, None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"routes": len(self._routes), "hits": self.hits, "misses": self.misses, "loaded": self._loaded}
+
+    def ensure_started(self, db) -> None:
+        """Start the initial load and sync loop once, from inside the running event loop."""
+        if not self.enabled or db is None:
+            return
+        if self._sync_task is None or self._sync_task.done():
+            self._sync_task = asyncio.create_task(self._run(db))
+
+    async def stop(self) -> None:
+        for task in (self._sync_task, self._reload_task):
+            if task and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._sync_task = None
+        self._reload_task = None
+
+    async def load(self, db) -> None:
+        """(Re)load the whole table, applying only the differences to the live routes."""
+        self._apply([record async for record in db.phonenumbers.find({}, _PROJECTION)])
+
+    def load_sync(self, db) -> None:
+        """``load`` with a synchronous pymongo database, for ``prewarm()`` before the event loop serves jobs."""
+        self._apply(list(db.phonenumbers.find({}, _PROJECTION)))
+
+    def _apply(self, records: List[Dict[str, Any]]) -> None:
+        routes: Dict[str, str] = {}
+        numbers: Dict[str, str] = {}
+        for record in records:
+            number = normalize_e164(record.get("number"))
+            if not number:
+                continue
+            numbers[str(record["_id"])] = number
+            if record.get("inbound_assistant_id"):
+                routes[number] = record["inbound_assistant_id"]
+
+        added = sum(1 for n in routes if n not in self._routes)
+        changed = sum(1 for n, a in routes.items() if n in self._routes and self._routes[n] != a)
+        removed = [n for n in self._routes if n not in routes]
+        for number in removed:
+            del self._routes[number]
+        self._routes.update(routes)
+        self._number_by_object_id = numbers
+        self._loaded = True
+        logger.info(
+            f"DID_ROUTES_SYNCED | routes={len(self._routes)} | added={added} | "
+            f"changed={changed} | removed={len(removed)}"
+        )
+
+    async def _reload(self, db) -> None:
+        try:
+            await self.load(db)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"DID_ROUTES_LOAD_FAILED | error={str(e)}")
+
+    async def _run(self, db) -> None:
+        await self._reload(db)
+        await watch_collection(
+            db.phonenumbers,
+            on_change=self._on_change,
+            # Events may have been missed while the stream was down
+            on_reset=lambda: self._schedule_reload(db),
+            poll_fallback=lambda: self._periodic_sync(db),
+            retry_interval=self.sync_interval,
+            full_document="updateLookup",
+        )
+
+    def _schedule_reload(self, db) -> None:
+        """Reload in the background (at most one at a time); the task is kept so stop() can cancel it."""
+        if self._reload_task is None or self._reload_task.done():
+            self._reload_task = asyncio.create_task(self._reload(db))
+
+    def _on_change(self, change: Dict[str, Any]) -> None:
+        object_id = str((change.get("documentKey") or {}).get("_id"))
+        if change.get("operationType") == "delete" or not change.get("fullDocument"):
+            self.remove(object_id)
+        else:
+            self.upsert(change["fullDocument"])
+
+    async def _periodic_sync(self, db) -> None:
+        """Polling fallback for servers without change streams."""
+        while True:
+            await asyncio.sleep(self.sync_interval)
+            await self._reload(db)
+
+
+# Process-wide routing table shared by every MongoDBClient in the worker
+_did_routing_table: Optional[DIDRoutingTable] = None
+
+
+def get_did_routing_table() -> DIDRoutingTable:
+    """Get the global DID routing table instance."""
+    global _did_routing_table
+    if _did_routing_table is None:
+        _did_routing_table = DIDRoutingTable.from_env()
+    return _did_routing_table
@@ -0,0 +1,114 @@
+"""
+Process-wide registry of LLM API clients.
+
+Every OpenAI-compatible client in the worker (post-call analysis, call outcome
+analysis, field classification, ...) comes from here, one per provider and
+base URL, so they share one keep-alive connection pool instead of each opening
+its own and paying a TLS handshake per request. The pool speaks HTTP/2 when
+``h2`` is installed (``pip install httpx[http2]``); otherwise HTTP/1.1
+keep-alive is used. Timeouts and retries are the same for every path.
+"""
+
+import os
+import hashlib
+import logging
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+import httpx
+
+try:
+    from openai import AsyncOpenAI
+except ImportError:
+    AsyncOpenAI = None
+
+try:
+    import h2  # noqa: F401  (httpx's optional HTTP/2 backend)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# provider -> (API key variable, default base URL; None is the SDK default)
+PROVIDERS: Dict[str, Tuple[str, Optional[str]]] = {
+    "openai": ("OPENAI_API_KEY", None),
+    "groq": ("GROQ_API_KEY", "https://api.groq.com/openai/v1"),
+}
+
+_clients: Dict[Tuple[str, Optional[str], str], Any] = {}
+_http_clients: Dict[Tuple[str, Optional[str], str], httpx.AsyncClient] = {}
+_lock = threading.Lock()
+
+
+def _http2_enabled() -> bool:
+    return HTTP2_AVAILABLE and os.getenv("LLM_HTTP2", "true").lower() != "false"
+
+
+def _build_http_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        # Long read timeout so streaming reads don't hit short defaults
+        timeout=httpx.Timeout(connect=5.0, read=60.0, write=30.0, pool=30.0),
+        limits=httpx.Limits(
+            max_connections=int(os.getenv("LLM_MAX_CONNECTIONS", "100")),
+            max_keepalive_connections=int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", "20")),
+            keepalive_expiry=float(os.getenv("LLM_KEEPALIVE_EXPIRY_SECONDS", "120")),
+        ),
+        http2=_http2_enabled(),
+    )
+
+
+def get_llm_client(provider: str = "openai", base_url: Optional[str] = None, api_key: Optional[str] = None):
+    """Return the shared ``AsyncOpenAI`` client for ``provider`` / ``base_url``.
+
+    Returns None when the openai package or the provider's API key is missing.
+    """
+    if provider not in PROVIDERS:
+        raise ValueError(f"Unknown LLM provider: {provider}")
+    key_env, default_base_url = PROVIDERS[provider]
+    api_key = api_key or os.getenv(key_env)
+    if AsyncOpenAI is None or not api_key:
+        return None
+    base_url = base_url or default_base_url
+
+    # Keyed by a digest so different keys for one endpoint never share a client
+    registry_key = (provider, base_url, hashlib.sha256(api_key.encode()).hexdigest()[:16])
+    with _lock:
+        client = _clients.get(registry_key)
+        if client is None:
+            http_client = _build_http_client()
+            client = AsyncOpenAI(
+                api_key=api_key,
+                base_url=base_url,
+                http_client=http_client,
+                timeout=60.0,
+                max_retries=int(os.getenv("LLM_MAX_RETRIES", "5")),
+                default_headers={
+                    "User-Agent": "LiveKit-Agent/1.0",
+                },
+            )
+            _http_clients[registry_key] = http_client
+            _clients[registry_key] = client
+            logger.info(
+                f"LLM_CLIENT_CREATED | provider={provider} | base_url={base_url or 'default'} | "
+                f"http2={_http2_enabled()}"
+            )
+        return client
+
+
+def get_openai_client():
+    """Shared OpenAI client (None if OPENAI_API_KEY is not configured)."""
+    return get_llm_client("openai")
+
+
+async def close_llm_clients() -> None:
+    """Close every pooled connection (worker shutdown)."""
+    with _lock:
+        http_clients = list(_http_clients.values())
+        _http_clients.clear()
+        _clients.clear()
+    for http_client in http_clients:
+        try:
+            await http_client.aclose()
+        except Exception as e:
+            logger.warning(f"LLM_CLIENT_CLOSE_FAILED | error={str(e)}")
@@ -3,23 +3,73 @@ MongoDB client for LiveKit agent database operations.
 """
 
 import os
+import asyncio
 import logging
-from typing import Optional, Dict, Any
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Dict, Any, Sequence, Tuple
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
 import httpx
 from bson import ObjectId
 
+from integrations.assistant_cache import get_assistant_cache
+from integrations.call_history_queue import get_call_history_queue
+from integrations.did_routing import get_did_routing_table
+from integrations.mongodb_indexes import verify_indexes
+from integrations.mongodb_pool import PoolMetricsHook, PoolStatsListener, log_pool_event, pool_options_from_env
+from utils.assistant_profiles import ProfileConfig, profile_cache_key, profile_projection
+from utils.helpers import normalize_e164
+from utils.transcript_codec import encode_transcript
+
 logger = logging.getLogger(__name__)
 
+# Age after which a pending minutes-deduction claim is taken over: the backend
+# request timeout (30s) plus a margin for the claim and bookkeeping writes
+MINUTES_CLAIM_LEASE_SECONDS = 60
+
+# Fields of the assistant schema (server/models) the agent never reads: dashboard-only
+# calendar settings, the unused per-provider Cerebras overrides (the agent reads the
+# generic llm_*_setting fields) and bookkeeping - excluded from full assistant reads.
+ASSISTANT_PROJECTION = {
+    "calendar": 0,
+    "cal_event_type_slug": 0,
+    "cal_event_title": 0,
+    "cal_event_length": 0,
+    "cerebras_model": 0,
+    "cerebras_temperature": 0,
+    "cerebras_max_tokens": 0,
+    "created_at": 0,
+    "updated_at": 0,
+    "__v": 0,
+}
+
 
 class MongoDBClient:
     """MongoDB client for LiveKit voice agent database operations."""
     
     def __init__(self):
         self.logger = logging.getLogger(__name__)
+        # Set when handed out by get_mongodb_client(); close() is then reference-counted
+        self._registry_key: Optional[Tuple[str, str]] = None
+        self._refs = 0
+        self._closed = False
         self._client: Optional[AsyncIOMotorClient] = None
         self._db = None
         self._http_client: Optional[httpx.AsyncClient] = None
+        self._pool_options: Dict[str, Any] = {}
+        self._pool_stats = PoolStatsListener()
+        self._pool_stats.add_hook(log_pool_event)
+        self._warmup_task: Optional[asyncio.Task] = None
+        self._assistant_cache = get_assistant_cache()
+        self._did_routes = get_did_routing_table()
+        self._history_queue = get_call_history_queue()
+        # Compact transcript storage is opt-in: readers of callhistories must understand it
+        self._compact_transcripts = os.getenv("TRANSCRIPT_COMPACT_ENCODING", "false").lower() == "true"
+        self._transcript_compress_min_bytes = int(os.getenv("TRANSCRIPT_COMPRESS_MIN_BYTES", "4096"))
+        # zlib by default: the dashboard backend decodes it with Node's built-in zlib (zstd needs Node >= 22.15)
+        self._transcript_codec = os.getenv("TRANSCRIPT_COMPRESS_CODEC", "zlib").lower()
         self._initialize_client()
     
     def _initialize_client(self):
@@ -39,8 +89,13 @@ class MongoDBClient:
                 else:
                     mongodb_uri = "mongodb://" + mongodb_uri
 
-            # Initialize MongoDB client
-            self._client = AsyncIOMotorClient(mongodb_uri)
+            # Initialize MongoDB client with a tuned, monitored connection pool
+            self._pool_options = pool_options_from_env()
+            self._client = AsyncIOMotorClient(
+                mongodb_uri,
+                event_listeners=[self._pool_stats],
+                **self._pool_options
+            )
             # Get database name from URI or use default
             db_name = os.getenv("MONGODB_DB_NAME", "test")
             self._db = self._client[db_name]
@@ -62,7 +117,11 @@ class MongoDBClient:
             # Note: synchronous call in init context
             # collections = self._db.list_collection_names()
             # self.logger.info(f"MongoDB client initialized | db={db_name} | collections={collections}")
-            self.logger.info(f"MongoDB client initialized | db={db_name}")
+            self.logger.info(
+                f"MongoDB client initialized | db={db_name} | "
+                f"pool={self._pool_options['minPoolSize']}-{self._pool_options['maxPoolSize']} | "
+                f"compressors={self._pool_options.get('compressors', 'none')}"
+            )
         except Exception as e:
             # Mask URI for safe logging
             uri_preview = "None"
@@ -81,12 +140,105 @@ class MongoDBClient:
         """Check if MongoDB client is available."""
         return self._db is not None
     
-    async def fetch_assistant(self, assistant_id: str) -> Optional[Dict[str, Any]]:
+    def start_background_sync(self) -> None:
+        """Start pool warmup, the assistant cache watcher and DID routing table sync (idempotent)."""
+        if not self.is_available():
+            return
+        self.schedule_warmup()
+        self._assistant_cache.ensure_watching(self._db)
+        self._did_routes.ensure_started(self._db)
+        self._history_queue.ensure_started(self.write_call_history_batch)
+    
+    def preload_did_routes(self) -> bool:
+        """
+        Load the DID routing table synchronously, from ``prewarm()``, so the first
+        inbound call on the worker already resolves its assistant from memory.
+        
+        Uses the pymongo client underneath Motor, so it works before any event
+        loop serves jobs. The change stream / resync loop still starts with the
+        first job (``start_background_sync``).
+        """
+        if not self.is_available() or not self._did_routes.enabled:
+            return False
+        try:
+            self._did_routes.load_sync(self._client.delegate[self._db.name])
+            return True
+        except Exception as e:
+            self.logger.warning(f"DID_ROUTES_PRELOAD_FAILED | error={str(e)} | first job loads it")
+            return False
+    
+    async def warmup(self) -> bool:
+        """
+        Open the pool ahead of the first query.
+        
+        Pays DNS/TLS/auth up front with a ping, then runs ``minPoolSize`` concurrent
+        pings so that many connections are checked out (and therefore opened) at once.
+        
+        Returns:
+            True if the server answered, False otherwise
+        """
+        if not self.is_available():
+            return False
+        
+        started_at = asyncio.get_running_loop().time()
+        try:
+            await self._client.admin.command("ping")
+            min_pool_size = self._pool_options.get("minPoolSize", 0)
+            if min_pool_size > 1:
+                await asyncio.gather(*(self._client.admin.command("ping") for _ in range(min_pool_size)))
+            
+            elapsed_ms = (asyncio.get_running_loop().time() - started_at) * 1000
+            stats = self._pool_stats.snapshot()
+            self.logger.info(
+                f"MONGODB_WARMUP_COMPLETE | duration_ms={elapsed_ms:.1f} | "
+                f"connections_open={stats['connections_open']}"
+            )
+        except Exception as e:
+            self.logger.warning(f"MONGODB_WARMUP_FAILED | error={str(e)}")
+            return False
+        
+        # Once per worker, off the call path: hot queries must not fall back to collection scans
+        if os.getenv("MONGODB_INDEX_CHECK", "true").lower() != "false":
+            create = os.getenv("MONGODB_ENSURE_INDEXES", "false").lower() == "true"
+            await verify_indexes(self._db, create=create)
+        return True
+    
+    def schedule_warmup(self) -> Optional[asyncio.Task]:
+        """Run ``warmup()`` once on the running event loop; a no-op when there is none yet."""
+        if not self.is_available():
+            return None
+        if self._warmup_task is None:
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                # No loop during a synchronous prewarm(); the first job schedules it
+                return None
+            self._warmup_task = loop.create_task(self.warmup())
+        return self._warmup_task
+    
+    def pool_stats(self) -> Dict[str, Any]:
+        """Current connection pool counters (open/in-use connections, checkout failures, ...)."""
+        return self._pool_stats.snapshot()
+    
+    def add_pool_metrics_hook(self, hook: PoolMetricsHook) -> None:
+        """
+        Register ``hook(event_name, stats)`` for pool events (pool created/cleared/closed,
+        checkout failures). Called from pymongo threads, so it must be thread-safe and fast.
+        """
+        self._pool_stats.add_hook(hook)
+    
+    async def fetch_assistant(
+        self,
+        assistant_id: str,
+        profiles: Optional[Sequence[str]] = None
+    ) -> Optional[Dict[str, Any]]:
         """
         Fetch assistant configuration from MongoDB.
         
         Args:
             assistant_id: Assistant ID to fetch
+            profiles: Field profiles to fetch (see utils.assistant_profiles);
+                None fetches the whole document
             
         Returns:
             Assistant data dict or None if not found
@@ -95,7 +247,16 @@ class MongoDBClient:
             self.logger.warning("MongoDB client not available")
             return None
         
-     
+        # Serve hot assistants from the in-process cache (invalidated by change stream/polling)
+        self._assistant_cache.ensure_watching(self._db)
+        cache_key = profile_cache_key(assistant_id, profiles) if profiles else assistant_id
+        cached = self._assistant_cache.get(cache_key)
+        if cached is not None:
+            self.logger.debug(f"Assistant served from cache: {cache_key}")
+            return ProfileConfig(cached, profiles) if profiles else cached
+        cache_generation = self._assistant_cache.generation
+        projection = profile_projection(profiles) if profiles else ASSISTANT_PROJECTION
+        
         try:
             query = {"id": assistant_id}
             
@@ -104,27 +265,19 @@ class MongoDBClient:
                 query = {"_id": ObjectId(assistant_id)}
             
             # Query assistant collection
-            assistant = await self._db.assistants.find_one(query)
+            assistant = await self._db.assistants.find_one(query, projection)
             
             if not assistant:
                 # Fallback: if we searched by _id and failed, try searching by string "id" field
                 # (in case some records use string IDs)
                 if "_id" in query:
-                    assistant = await self._db.assistants.find_one({"id": assistant_id})
+                    assistant = await self._db.assistants.find_one({"id": assistant_id}, projection)
             
             if assistant:
-                # Store the MongoDB _id as a string in a separate field if needed,
-                # but do NOT overwrite an existing 'id' field which might contain 'asst_...'
-                if "_id" in assistant:
-                    assistant_id_str = str(assistant["_id"])
-                    if not assistant.get("id"):
-                        assistant["id"] = assistant_id_str
-                    # Always provide _id_str as a fallback for internal use
-                    assistant["_id_str"] = assistant_id_str
-                    del assistant["_id"]
-                
-                self.logger.info(f"Assistant fetched from MongoDB: {assistant_id}")
-                return assistant
+                self._normalize_assistant(assistant)
+                self._assistant_cache.put(cache_key, assistant, generation=cache_generation)
+                self.logger.info(f"Assistant fetched from MongoDB: {cache_key}")
+                return ProfileConfig(assistant, profiles) if profiles else assistant
             else:
                 self.logger.warning(f"Assistant not found in MongoDB: {assistant_id}")
                 return None
@@ -133,12 +286,17 @@ class MongoDBClient:
             self.logger.error(f"Error fetching assistant from MongoDB: {e}")
             return None
     
-    async def fetch_assistant_by_phone(self, phone_number: str) -> Optional[Dict[str, Any]]:
+    async def fetch_assistant_by_phone(
+        self,
+        phone_number: str,
+        profiles: Optional[Sequence[str]] = None
+    ) -> Optional[Dict[str, Any]]:
         """
         Fetch assistant by phone number (for inbound calls).
         
         Args:
             phone_number: Phone number to look up
+            profiles: Field profiles to fetch; None fetches the whole document
             
         Returns:
             Assistant data dict or None if not found
@@ -148,12 +306,21 @@ class MongoDBClient:
             return None
         
         try:
-            # First, find the phone number record
-            phone_record = await self._db.phonenumbers.find_one({"number": phone_number})
+            # Resolve the DID from the in-memory routing table first
+            self._did_routes.ensure_started(self._db)
+            routed_assistant_id = self._did_routes.lookup(phone_number)
+            if routed_assistant_id:
+                return await self.fetch_assistant(routed_assistant_id, profiles)
+            
+            # Miss: resolve number and assistant in one round-trip and learn the route for next time
+            cache_generation = self._assistant_cache.generation
+            phone_record = await self._lookup_phone_with_assistant(phone_number, profiles)
             
             if not phone_record:
                 self.logger.warning(f"Phone number not found: {phone_number}")
                 return None
+            assistant = phone_record.pop("assistant", None)
+            self._did_routes.upsert(phone_record)
             
             # Get the assistant ID from the phone record
             assistant_id = phone_record.get("inbound_assistant_id")
@@ -161,13 +328,149 @@ class MongoDBClient:
                 self.logger.warning(f"No assistant assigned to phone: {phone_number}")
                 return None
             
-            # Fetch the assistant
-            return await self.fetch_assistant(assistant_id)
+            if not assistant:
+                self.logger.warning(f"Assistant not found in MongoDB: {assistant_id}")
+                return None
+            
+            self._normalize_assistant(assistant)
+            cache_key = profile_cache_key(assistant_id, profiles) if profiles else assistant_id
+            self._assistant_cache.put(cache_key, assistant, generation=cache_generation)
+            self.logger.info(f"Assistant fetched from MongoDB by phone: {phone_number} -> {assistant_id}")
+            return ProfileConfig(assistant, profiles) if profiles else assistant
                 
         except Exception as e:
             self.logger.error(f"Error fetching assistant by phone: {e}")
             return None
     
+    async def _lookup_phone_with_assistant(
+        self,
+        phone_number: str,
+        profiles: Optional[Sequence[str]] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Fetch a phone record with its inbound assistant joined in as ``assistant``.
+        
+        ``inbound_assistant_id`` may hold either the assistant's ObjectId (hex) or
+        its string ``id``; both joins use the indexed ``_id``/``id`` fields and the
+        ObjectId match wins, mirroring ``fetch_assistant``.
+        """
+        if profiles:
+            assistant_projection = {"number": 1, "inbound_assistant_id": 1, "assistant._id": 1}
+            assistant_projection.update({f"assistant.{field}": 1 for field in profile_projection(profiles)})
+        else:
+            assistant_projection = {f"assistant.{field}": 0 for field in ASSISTANT_PROJECTION}
+        
+        # The routing table is keyed by the normalised number: match that form too,
+        # plus its bare digits, in case the stored number is written either way
+        candidates = [phone_number]
+        normalized = normalize_e164(phone_number)
+        if normalized:
+            candidates += [normalized, normalized[1:]]
+        pipeline = [
+            {"$match": {"number": {"$in": list(dict.fromkeys(candidates))}}},
+            {"$limit": 1},
+            {"$project": {
+                "number": 1,
+                "inbound_assistant_id": 1,
+                "assistant_oid": {
+                    "$convert": {
+                        "input": "$inbound_assistant_id",
+                        "to": "objectId",
+                        "onError": None,
+                        "onNull": None,
+                    }
+                },
+            }},
+            {"$lookup": {
+                "from": "assistants",
+                "localField": "assistant_oid",
+                "foreignField": "_id",
+                "as": "by_object_id",
+            }},
+            {"$lookup": {
+                "from": "assistants",
+                "localField": "inbound_assistant_id",
+                "foreignField": "id",
+                "as": "by_string_id",
+            }},
+            {"$project": {
+                "number": 1,
+                "inbound_assistant_id": 1,
+                "assistant": {"$arrayElemAt": [{"$concatArrays": ["$by_object_id", "$by_string_id"]}, 0]},
+            }},
+            {"$project": assistant_projection},
+        ]
+        
+        async for record in self._db.phonenumbers.aggregate(pipeline):
+            return record
+        return None
+    
+    @staticmethod
+    def _normalize_assistant(assistant: Dict[str, Any]) -> Dict[str, Any]:
+        """Replace the Mongo ``_id`` with string ``id``/``_id_str`` fields (in place)."""
+        # Store the MongoDB _id as a string in a separate field if needed,
+        # but do NOT overwrite an existing 'id' field which might contain 'asst_...'
+        if "_id" in assistant:
+            assistant_id_str = str(assistant["_id"])
+            if not assistant.get("id"):
+                assistant["id"] = assistant_id_str
+            # Always provide _id_str as a fallback for internal use
+            assistant["_id_str"] = assistant_id_str
+            del assistant["_id"]
+        return assistant
+    
+    async def start_call_history(
+        self,
+        call_id: str,
+        assistant_id: str,
+        phone_number: Optional[str],
+        start_time: str,
+        participant_identity: Optional[str] = None,
+        call_sid: Optional[str] = None
+    ) -> bool:
+        """
+        Phase one of the call history write: upsert a small "in_progress" skeleton.
+        
+        Uses ``$setOnInsert`` only, so it never overwrites a record whose final
+        patch (``save_call_history``) happened to land first.
+        """
+        if not self.is_available():
+            return False
+        
+        skeleton = {
+            "call_id": call_id,
+            "assistant_id": assistant_id,
+            "phone_number": phone_number,
+            "participant_identity": participant_identity,
+            "call_sid": call_sid,
+            "call_status": "in_progress",
+            "started_at": start_time,
+            "created_at": start_time
+        }
+        skeleton = {k: v for k, v in skeleton.items() if v is not None}
+        
+        try:
+            await self._db.callhistories.update_one(
+                {"call_id": call_id},
+                {"$setOnInsert": skeleton},
+                upsert=True
+            )
+            self.logger.info(f"CALL_HISTORY_STARTED | call_id={call_id}")
+            return True
+        except Exception as e:
+            # The final patch upserts the full record anyway
+            self.logger.warning(f"CALL_HISTORY_START_FAILED | call_id={call_id} | error={str(e)}")
+            return False
+    
+    @staticmethod
+    def _call_history_update(record: Dict[str, Any]) -> Dict[str, Any]:
+        """Update document patching a call record; ``created_at`` is only set when inserting."""
+        fields = {k: v for k, v in record.items() if k != "created_at"}
+        update: Dict[str, Any] = {"$set": fields}
+        if record.get("created_at") is not None:
+            update["$setOnInsert"] = {"created_at": record["created_at"]}
+        return update
+    
     async def save_call_history(
         self,
         call_id: str,
@@ -189,12 +492,25 @@ class MongoDBClient:
     ) -> bool:
         """
         Save call history to MongoDB.
+        
+        Phase two of the call history write: ``$set`` the transcript, outcome and
+        analysis onto the skeleton written by ``start_call_history`` (upserting
+        the whole record if the skeleton is missing).
+        
+        With the write-behind queue enabled (default) the record is journaled to
+        local disk and written by the background flusher, so this returns as soon
+        as the record is durable rather than when MongoDB acknowledges it.
         """
         if not self.is_available():
             self.logger.warning("MongoDB client not available")
             return False
         
         try:
+            if self._compact_transcripts and transcription:
+                transcription = encode_transcript(
+                    transcription, self._transcript_compress_min_bytes, codec=self._transcript_codec
+                )
+            
             # Map Python camelCase or start_time to Mongoose snake_case/started_at
             call_data = {
                 "call_id": call_id,
@@ -219,10 +535,20 @@ class MongoDBClient:
             # Remove None values
             call_data = {k: v for k, v in call_data.items() if v is not None}
             
-            # Insert into call_history collection
-            result = await self._db.callhistories.insert_one(call_data)
+            if self._history_queue.enabled:
+                self._history_queue.ensure_started(self.write_call_history_batch)
+                if await self._history_queue.enqueue(call_data):
+                    return True
+                # Journal unavailable (disk full, read-only fs): write directly
             
-            if result.inserted_id:
+            # Patch (or create) the call_history record
+            result = await self._db.callhistories.update_one(
+                {"call_id": call_id},
+                self._call_history_update(call_data),
+                upsert=True
+            )
+            
+            if result.acknowledged:
                 self.logger.info(f"Call history saved to MongoDB: {call_id}")
                 return True
             else:
@@ -233,6 +559,46 @@ class MongoDBClient:
             self.logger.error(f"Error saving call history to MongoDB: {e}")
             return False
 
+    async def flush_call_history(self, timeout: float = 10.0) -> int:
+        """
+        Write journaled call history now, e.g. at the end of a job before its process exits.
+        
+        Returns:
+            Number of records written (0 when write-behind is disabled)
+        """
+        if not self._history_queue.enabled or not self.is_available():
+            return 0
+        self._history_queue.ensure_started(self.write_call_history_batch)
+        try:
+            return await self._history_queue.flush(timeout=timeout)
+        except Exception as e:
+            # Still journaled: the next flusher on this host replays it
+            self.logger.warning(f"CALL_HISTORY_FLUSH_FAILED | error={str(e)}")
+            return 0
+
+    async def write_call_history_batch(self, records: list) -> list:
+        """
+        Upsert a batch of call history records by ``call_id`` (idempotent, so safe to replay).
+        
+        Returns:
+            Indexes of the records in ``records`` that failed to write
+        """
+        if not self.is_available():
+            raise RuntimeError("MongoDB client not available")
+        
+        operations = [
+            UpdateOne({"call_id": record["call_id"]}, self._call_history_update(record), upsert=True)
+            for record in records
+        ]
+        try:
+            await self._db.callhistories.bulk_write(operations, ordered=False)
+            return []
+        except BulkWriteError as e:
+            write_errors = e.details.get("writeErrors", [])
+            for error in write_errors[:3]:
+                self.logger.warning(f"CALL_HISTORY_WRITE_ERROR | code={error.get('code')} | error={error.get('errmsg')}")
+            return [error["index"] for error in write_errors]
+    
     async def save_n8n_spreadsheet_id(self, assistant_id: str, spreadsheet_id: str) -> bool:
         """
         Save N8N spreadsheet ID for assistant.
@@ -266,6 +632,35 @@ class MongoDBClient:
             self.logger.error(f"Error saving N8N spreadsheet ID: {e}")
             return False
     
+    async def fetch_field_classification(self, fields_hash: str) -> Optional[Dict[str, list]]:
+        """Stored ask/extract classification for a field-definition hash, if any."""
+        if not self.is_available():
+            return None
+        try:
+            doc = await self._db.field_classifications.find_one({"_id": fields_hash}, {"classification": 1})
+            return doc.get("classification") if doc else None
+        except Exception as e:
+            self.logger.warning(f"FIELD_CLASSIFICATION_FETCH_ERROR | hash={fields_hash[:12]} | error={str(e)}")
+            return None
+
+    async def save_field_classification(self, fields_hash: str, classification: Dict[str, list]) -> bool:
+        """Persist a field classification keyed by the hash of the field definitions."""
+        if not self.is_available():
+            return False
+        try:
+            await self._db.field_classifications.update_one(
+                {"_id": fields_hash},
+                {
+                    "$set": {"classification": classification, "updated_at": datetime.now(timezone.utc)},
+                    "$setOnInsert": {"created_at": datetime.now(timezone.utc)},
+                },
+                upsert=True
+            )
+            return True
+        except Exception as e:
+            self.logger.warning(f"FIELD_CLASSIFICATION_SAVE_ERROR | hash={fields_hash[:12]} | error={str(e)}")
+            return False
+
     async def check_minutes_available(self, user_id: str) -> Dict[str, Any]:
         """
         Check if user has minutes available via backend API.
@@ -318,25 +713,97 @@ class MongoDBClient:
             # On error, allow call to proceed (fail open)
             return {"available": True, "error": str(e)}
     
-    async def deduct_minutes(self, user_id: str, minutes: float) -> Dict[str, Any]:
+    async def _claim_minutes_deduction(self, call_id: str, user_id: str, minutes: int) -> bool:
+        """
+        Record that the minutes of ``call_id`` are being deducted.
+        
+        Returns False when the call was already deducted, or another worker is
+        deducting it right now. A pending claim older than
+        ``MINUTES_CLAIM_LEASE_SECONDS`` (its worker died mid-deduction) is taken
+        over. Without MongoDB the deduction is not guarded and True is returned.
+        """
+        if not self.is_available():
+            return True
+        now = datetime.now(timezone.utc)
+        claim = {"user_id": user_id, "minutes": minutes, "status": "pending", "claimed_at": now}
+        try:
+            await self._db.minute_deductions.insert_one({"_id": call_id, **claim})
+            return True
+        except DuplicateKeyError:
+            pass
+        except Exception as e:
+            self.logger.warning(f"MINUTES_CLAIM_FAILED | call_id={call_id} | error={str(e)} | deducting unguarded")
+            return True
+        
+        try:
+            stale = await self._db.minute_deductions.find_one_and_update(
+                {
+                    "_id": call_id,
+                    "status": "pending",
+                    "claimed_at": {"$lt": now - timedelta(seconds=MINUTES_CLAIM_LEASE_SECONDS)},
+                },
+                {"$set": claim}
+            )
+        except Exception as e:
+            self.logger.warning(f"MINUTES_CLAIM_FAILED | call_id={call_id} | error={str(e)} | skipping")
+            return False
+        if stale is not None:
+            self.logger.warning(f"MINUTES_CLAIM_RECLAIMED | call_id={call_id} | claimed_at={stale.get('claimed_at')}")
+            return True
+        return False
+    
+    async def _finish_minutes_deduction(self, call_id: str, succeeded: bool) -> None:
+        """Mark a claimed deduction done, or release the claim so a retry can deduct."""
+        if not self.is_available():
+            return
+        try:
+            if succeeded:
+                await self._db.minute_deductions.update_one(
+                    {"_id": call_id},
+                    {"$set": {"status": "done", "deducted_at": datetime.now(timezone.utc)}}
+                )
+            else:
+                await self._db.minute_deductions.delete_one({"_id": call_id, "status": "pending"})
+        except Exception as e:
+            self.logger.warning(f"MINUTES_CLAIM_UPDATE_FAILED | call_id={call_id} | error={str(e)}")
+    
+    async def deduct_minutes(self, user_id: str, minutes: float, call_id: Optional[str] = None) -> Dict[str, Any]:
         """
         Deduct minutes from user's account via backend API.
         
+        With ``call_id`` a claim keyed on the call id is stored in
+        ``minute_deductions`` first, and a repeated deduction for the same call
+        (e.g. a redelivered analysis job) is skipped once the first one is done.
+        A worker dying between its claim and the backend response leaves a
+        pending claim that is taken over after the lease, so that call may be
+        deducted twice if the backend had already applied it.
+        
         Args:
             user_id: User ID
             minutes: Minutes to deduct (will be rounded up)
+            call_id: Call the minutes belong to
             
         Returns:
             Dict with success status and remaining minutes info
+            (``duplicate=True`` when the call was already deducted)
         """
         if not self._http_client:
             self.logger.warning("HTTP client not available for minutes deduction")
             return {"success": False, "error": "HTTP client not available"}
         
+        # Round up minutes
+        minutes_to_deduct = int(minutes) + (1 if minutes % 1 > 0 else 0)
+        if call_id and not await self._claim_minutes_deduction(call_id, user_id, minutes_to_deduct):
+            self.logger.info(f"MINUTES_DEDUCTION_DUPLICATE | call_id={call_id} | user={user_id}")
+            return {"success": True, "duplicate": True}
+        
+        result = await self._post_minutes_deduction(user_id, minutes_to_deduct)
+        if call_id:
+            await self._finish_minutes_deduction(call_id, bool(result.get("success")))
+        return result
+    
+    async def _post_minutes_deduction(self, user_id: str, minutes_to_deduct: int) -> Dict[str, Any]:
         try:
-            # Round up minutes
-            minutes_to_deduct = int(minutes) + (1 if minutes % 1 > 0 else 0)
-            
             # Call backend API to deduct minutes
             response = await self._http_client.post(
                 "/api/v1/minutes/deduct",
@@ -378,8 +845,45 @@ class MongoDBClient:
             return {"success": False, "error": str(e)}
     
     async def close(self):
-        """Close MongoDB and HTTP clients."""
+        """
+        Close MongoDB and HTTP clients.
+        
+        Clients obtained from ``get_mongodb_client()`` are shared: this only releases
+        the caller's reference, and the pools are closed when the last one is released.
+        """
+        if self._registry_key is not None:
+            with _registry_lock:
+                self._refs -= 1
+                if self._refs > 0:
+                    return
+                if _registry.get(self._registry_key) is self:
+                    del _registry[self._registry_key]
+        
+        self._closed = True
         if self._client:
             self._client.close()
         if self._http_client:
             await self._http_client.aclose()
+
+
+# Process-wide clients keyed by (MONGODB_URI, MONGODB_DB_NAME) so every service in a
+# worker shares one Motor pool and one backend HTTP client
+_registry: Dict[Tuple[str, str], MongoDBClient] = {}
+_registry_lock = threading.Lock()
+
+
+def get_mongodb_client() -> MongoDBClient:
+    """Get the shared MongoDB client for the configured URI/database, taking a reference.
+
+    Each caller that may later call ``close()`` holds one reference; the
+    underlying connections are closed when the last reference is released.
+    """
+    key = (os.getenv("MONGODB_URI", ""), os.getenv("MONGODB_DB_NAME", "test"))
+    with _registry_lock:
+        client = _registry.get(key)
+        if client is None or client._closed:
+            client = MongoDBClient()
+            client._registry_key = key
+            _registry[key] = client
+        client._refs += 1
+    return client
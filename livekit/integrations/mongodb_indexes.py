@@ -0,0 +1,146 @@
+"""
+Index bootstrap and query-plan checks for the collections on the call path.
+
+Every query shape the agent runs while a caller is waiting must be served by
+an index; a collection scan is fine with a few hundred documents and turns
+into seconds of call-start latency at millions. ``verify_indexes`` checks that
+the required indexes exist (optionally creating them) and runs ``explain()``
+on each hot query shape, reporting any COLLSCAN.
+
+Runs once per worker from ``MongoDBClient.warmup()`` and as a CLI:
+
+    python -m integrations.mongodb_indexes            # check only, exit 1 on problems
+    python -m integrations.mongodb_indexes --create   # also create missing indexes
+"""
+
+import os
+import sys
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, List, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class HotQuery:
+    """A query shape on the call path and the index that must serve it."""
+    collection: str
+    query: Dict[str, Any]
+    keys: Tuple[Tuple[str, int], ...]
+    unique: bool = False
+
+
+# Sample values only select the plan shape; they do not need to match a document
+HOT_QUERIES: Tuple[HotQuery, ...] = (
+    HotQuery("assistants", {"id": "__index_check__"}, (("id", 1),), unique=True),
+    HotQuery("assistants", {"updated_at": {"$gt": 0}}, (("updated_at", 1),)),
+    HotQuery("phonenumbers", {"number": "__index_check__"}, (("number", 1),), unique=True),
+    HotQuery("knowledge_bases", {"id": "__index_check__"}, (("id", 1),)),
+    HotQuery("callhistories", {"call_id": "__index_check__"}, (("call_id", 1),), unique=True),
+)
+
+
+def _plan_stages(plan: Dict[str, Any]) -> Set[str]:
+    """Collect every stage name in an explain() plan tree (classic and SBE layouts)."""
+    stages: Set[str] = set()
+    stack = [plan]
+    while stack:
+        node = stack.pop()
+        if not isinstance(node, dict):
+            continue
+        if "stage" in node:
+            stages.add(node["stage"])
+        for key in ("inputStage", "queryPlan", "winningPlan"):
+            if key in node:
+                stack.append(node[key])
+        stack.extend(node.get("inputStages", []))
+    return stages
+
+
+async def ensure_indexes(db, create: bool = False) -> List[str]:
+    """Return ``collection.field`` names of required indexes that are still missing.
+
+    With ``create`` the missing ones are built first; failures (duplicate keys
+    on a unique index, missing privileges) are logged and reported as missing.
+    """
+    missing: List[str] = []
+    for hot in HOT_QUERIES:
+        label = f"{hot.collection}.{'_'.join(k for k, _ in hot.keys)}"
+        existing = await db[hot.collection].index_information()
+        if any(tuple(info.get("key", [])) == hot.keys for info in existing.values()):
+            continue
+
+        if create:
+            try:
+                await db[hot.collection].create_index(list(hot.keys), unique=hot.unique)
+                logger.info(f"MONGODB_INDEX_CREATED | index={label} | unique={hot.unique}")
+                continue
+            except Exception as e:
+                logger.error(f"MONGODB_INDEX_CREATE_FAILED | index={label} | error={str(e)}")
+
+        missing.append(label)
+    return missing
+
+
+async def check_query_plans(db) -> List[Dict[str, Any]]:
+    """Explain every hot query shape and return one result per shape."""
+    results: List[Dict[str, Any]] = []
+    for hot in HOT_QUERIES:
+        explain = await db[hot.collection].find(hot.query).explain()
+        stages = _plan_stages(explain.get("queryPlanner", {}))
+        results.append({
+            "collection": hot.collection,
+            "query": list(hot.query),
+            "stages": sorted(stages),
+            "collscan": "COLLSCAN" in stages,
+        })
+    return results
+
+
+async def verify_indexes(db, create: bool = False) -> bool:
+    """Check (and optionally create) indexes, then explain hot queries. Returns True when all are indexed."""
+    try:
+        missing = await ensure_indexes(db, create=create)
+        plans = await check_query_plans(db)
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        logger.warning(f"MONGODB_INDEX_CHECK_FAILED | error={str(e)}")
+        return False
+
+    collscans = [p for p in plans if p["collscan"]]
+    for plan in collscans:
+        logger.error(
+            f"MONGODB_COLLSCAN | collection={plan['collection']} | query={plan['query']} | "
+            f"stages={plan['stages']}"
+        )
+    if missing:
+        logger.error(f"MONGODB_INDEXES_MISSING | indexes={missing} | create={create}")
+
+    ok = not missing and not collscans
+    logger.info(
+        f"MONGODB_INDEX_CHECK | ok={ok} | queries={len(plans)} | collscans={len(collscans)} | "
+        f"missing={len(missing)}"
+    )
+    return ok
+
+
+async def _main(create: bool) -> int:
+    from integrations.mongodb_client import get_mongodb_client
+
+    client = get_mongodb_client()
+    if not client.is_available():
+        logger.error("MONGODB_INDEX_CHECK_FAILED | MONGODB_URI not configured")
+        return 1
+    try:
+        return 0 if await verify_indexes(client._db, create=create) else 1
+    finally:
+        await client.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+    create_flag = "--create" in sys.argv[1:] or os.getenv("MONGODB_ENSURE_INDEXES", "false").lower() == "true"
+    sys.exit(asyncio.run(_main(create=create_flag)))
@@ -0,0 +1,136 @@
+"""
+MongoDB connection pool configuration and statistics.
+
+Pool sizing, idle time, server selection timeout and wire compression are
+read from the environment so each deployment can tune the pool without code
+changes. ``PoolStatsListener`` is registered on the client to count pool
+events and forward notable ones (pool cleared, checkout failures, ...) to
+metrics hooks.
+"""
+
+import os
+import logging
+import threading
+from typing import Any, Callable, Dict, List
+
+from pymongo import monitoring
+
+logger = logging.getLogger(__name__)
+
+PoolMetricsHook = Callable[[str, Dict[str, Any]], None]
+
+
+def pool_options_from_env() -> Dict[str, Any]:
+    """Keyword arguments for ``AsyncIOMotorClient`` built from ``MONGODB_*`` variables."""
+    options: Dict[str, Any] = {
+        "minPoolSize": int(os.getenv("MONGODB_MIN_POOL_SIZE", "2")),
+        "maxPoolSize": int(os.getenv("MONGODB_MAX_POOL_SIZE", "20")),
+        "maxIdleTimeMS": int(os.getenv("MONGODB_MAX_IDLE_TIME_MS", "300000")),
+        "serverSelectionTimeoutMS": int(os.getenv("MONGODB_SERVER_SELECTION_TIMEOUT_MS", "5000")),
+    }
+    # e.g. "zstd,snappy,zlib" - pymongo skips (with a warning) compressors whose package is missing
+    compressors = os.getenv("MONGODB_COMPRESSORS", "").strip()
+    if compressors:
+        options["compressors"] = compressors
+    return options
+
+
+class PoolStatsListener(monitoring.ConnectionPoolListener):
+    """Counts connection pool events and forwards notable ones to metrics hooks.
+
+    pymongo invokes listeners from its own threads, so counters are guarded by a
+    lock and hooks must be thread-safe and fast.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._hooks: List[PoolMetricsHook] = []
+        self._stats: Dict[str, Any] = {
+            "pools": 0,
+            "connections_open": 0,
+            "connections_in_use": 0,
+            "connections_created": 0,
+            "connections_closed": 0,
+            "checkouts": 0,
+            "checkout_failures": 0,
+            "pool_clears": 0,
+            "max_checkout_wait_ms": 0.0,
+        }
+
+    def add_hook(self, hook: PoolMetricsHook) -> None:
+        with self._lock:
+            self._hooks.append(hook)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self._stats)
+
+    def _update(self, **deltas: int) -> None:
+        with self._lock:
+            for key, delta in deltas.items():
+                self._stats[key] += delta
+
+    def _emit(self, event_name: str, **details: Any) -> None:
+        stats = self.snapshot()
+        stats.update(details)
+        with self._lock:
+            hooks = list(self._hooks)
+        for hook in hooks:
+            try:
+                hook(event_name, stats)
+            except Exception as e:
+                logger.warning(f"MONGODB_POOL_HOOK_ERROR | event={event_name} | error={str(e)}")
+
+    def pool_created(self, event) -> None:
+        self._update(pools=1)
+        self._emit("pool_created", address=str(event.address))
+
+    def pool_ready(self, event) -> None:
+        pass
+
+    def pool_cleared(self, event) -> None:
+        self._update(pool_clears=1)
+        self._emit("pool_cleared", address=str(event.address))
+
+    def pool_closed(self, event) -> None:
+        self._update(pools=-1)
+        self._emit("pool_closed", address=str(event.address))
+
+    def connection_created(self, event) -> None:
+        self._update(connections_open=1, connections_created=1)
+
+    def connection_ready(self, event) -> None:
+        pass
+
+    def connection_closed(self, event) -> None:
+        self._update(connections_open=-1, connections_closed=1)
+
+    def connection_check_out_started(self, event) -> None:
+        pass
+
+    def connection_check_out_failed(self, event) -> None:
+        self._update(checkout_failures=1)
+        self._emit("checkout_failed", address=str(event.address), reason=str(event.reason))
+
+    def connection_checked_out(self, event) -> None:
+        # ``duration`` (seconds) is only reported by pymongo >= 4.7
+        wait_ms = (getattr(event, "duration", None) or 0) * 1000
+        with self._lock:
+            self._stats["checkouts"] += 1
+            self._stats["connections_in_use"] += 1
+            if wait_ms > self._stats["max_checkout_wait_ms"]:
+                self._stats["max_checkout_wait_ms"] = round(wait_ms, 2)
+
+    def connection_checked_in(self, event) -> None:
+        self._update(connections_in_use=-1)
+
+
+def log_pool_event(event_name: str, stats: Dict[str, Any]) -> None:
+    """Default metrics hook: log pool lifecycle events and checkout failures."""
+    level = logging.WARNING if event_name in ("pool_cleared", "checkout_failed") else logging.INFO
+    logger.log(
+        level,
+        f"MONGODB_POOL_EVENT | event={event_name} | open={stats['connections_open']} | "
+        f"in_use={stats['connections_in_use']} | checkout_failures={stats['checkout_failures']} | "
+        f"address={stats.get('address')}"
+    )
@@ -11,10 +11,9 @@ import sys
 import json
 import asyncio
 import datetime
+import time
 from typing import Optional, Dict, Any
 from dotenv import load_dotenv
-import httpx
-from openai import AsyncOpenAI
 
 # Load environment variables
 # Load environment variables
@@ -116,16 +115,29 @@ except ImportError:
 from services.call_outcome_service import CallOutcomeService
 from services.agent_factory import AgentFactory
 from services.config_resolver import ConfigResolver
-from integrations.mongodb_client import MongoDBClient
+from services.worker_resources import WorkerResources
+from services.call_start import StageGraph, CallStartAborted
+from services.post_call_analysis import CallFinishedJob, PostCallAnalyzer, submit_call_finished
+from integrations.mongodb_client import get_mongodb_client
+from integrations.llm_clients import get_openai_client
 from integrations.calendar_api import CalComCalendar, CalendarResult, CalendarError
 from utils.logging_hardening import configure_safe_logging
+from utils.ttl_cache import cache_stats
+from utils.transcript import warm_tokenizer
 from utils.latency_logger import (
     measure_latency_context, 
     get_tracker, 
     clear_tracker,
+    log_latency_measurement,
     LatencyProfiler
 )
-from utils.data_extractors import extract_phone_from_room, extract_name_from_summary, extract_call_sid_from_metadata
+from utils.data_extractors import (
+    extract_phone_from_room,
+    extract_call_sid_from_metadata,
+    get_room_name,
+    get_room_metadata,
+)
+from utils.assistant_profiles import CALL_START_PROFILES
 
 # Configure logging with security hardening
 configure_safe_logging(level=logging.INFO)
@@ -200,61 +212,73 @@ def _build_background_ambient_config(setting: Optional[str]):
     return None
 
 # ---- Shared OpenAI client & HTTP transport (used by all OpenAI calls) ----
-_HTTP_TIMEOUT = httpx.Timeout(connect=5.0, read=60.0, write=30.0, pool=30.0)  # Increased read timeout
-_HTTP_CLIENT = httpx.AsyncClient(timeout=_HTTP_TIMEOUT)
-
-_OPENAI_CLIENT = AsyncOpenAI(
-    api_key=os.getenv("OPENAI_API_KEY"),
-    http_client=_HTTP_CLIENT,  # ensures streaming reads don't hit short defaults
-    timeout=60.0,              # increased overall guard for better reliability
-    max_retries=5,             # increased retries for better resilience (was 3)
-    default_headers={
-        "User-Agent": "LiveKit-Agent/1.0",
-    },
-)
+# Pooled per provider in integrations.llm_clients (None if OPENAI_API_KEY is missing)
+_OPENAI_CLIENT = get_openai_client()
 # --------------------------------------------------------------------------
 
 
 class CallHandler:
     """Simplified call handler following LiveKit patterns."""
 
-    def __init__(self):
-        self.mongodb = MongoDBClient()
-        self.call_outcome_service = CallOutcomeService()
+    def __init__(self, resources: Optional[WorkerResources] = None):
+        # Borrow process-scoped components loaded in prewarm(); build only what is missing
+        resources = resources or WorkerResources(openai_client=_OPENAI_CLIENT)
+        self.resources = resources
+        self.mongodb = resources.mongodb or get_mongodb_client()
+        self.call_outcome_service = resources.call_outcome_service or CallOutcomeService(client=_OPENAI_CLIENT)
+        self.post_call_analyzer = PostCallAnalyzer(
+            self.mongodb,
+            call_outcome_service=self.call_outcome_service,
+            openai_client=resources.openai_client or _OPENAI_CLIENT
+        )
         
         # Initialize refactored components
         self.config_resolver = ConfigResolver(self.mongodb)
         
+        # First job in the process starts the assistant cache watcher and loads the DID routing table
+        self.mongodb.start_background_sync()
+        
         # Pre-warm critical components for faster response
         self._prewarmed_agents = {}
         self._prewarmed_llms = {}
         self._prewarmed_tts = {}
-        self._prewarmed_vad = None
-        self._prewarmed_rag = None
+        self._prewarmed_vad = resources.vad
+        self._prewarmed_rag = resources.rag_service
         
         # Latency monitoring variables
         self.end_of_utterance_delay = 0
         self.llm_latency = 0
         self.tts_latency = 0
+        # Prompt tokens sent to the LLM this call, and how many the provider served from its prompt cache
+        self.llm_prompt_tokens = 0
+        self.llm_cached_tokens = 0
         
         # Track idle message counts per session
         self._idle_message_counts = {}
         
-        # Start pre-warming in background
-        asyncio.create_task(self._prewarm_components())
+        # Start pre-warming in background only when prewarm() did not run for this process.
+        # The task doubles as the readiness future awaited (with a bound) at call start.
+        self._prewarm_task: Optional[asyncio.Task] = None
+        if self._prewarmed_vad is None or self._prewarmed_rag is None:
+            self._prewarm_task = asyncio.create_task(self._prewarm_components())
 
     async def _prewarm_components(self):
-        """Pre-warm critical components to eliminate cold start latency."""
+        """Pre-warm critical components missing from the worker resources."""
         try:
             # logger.info("PREWARM_START | warming up system components")
             
-            # Pre-warm VAD (Voice Activity Detection)
-            self._prewarmed_vad = silero.VAD.load()
+            # Pre-warm VAD (Voice Activity Detection) off the event loop
+            if self._prewarmed_vad is None:
+                self._prewarmed_vad = await asyncio.to_thread(silero.VAD.load)
             # logger.info("PREWARM_VAD | VAD loaded successfully")
             
-            # Pre-warm RAG service
-            from services.rag_service import RAGService
-            self._prewarmed_rag = RAGService()  # RAGService initializes itself in constructor
+            # Transcript tokenizer for post-call analysis, off the event loop
+            await warm_tokenizer()
+            
+            # Pre-warm RAG service (shared process-wide singleton)
+            if self._prewarmed_rag is None:
+                from services.rag_service import get_rag_service
+                self._prewarmed_rag = get_rag_service(mongodb=self.mongodb)
             # logger.info("PREWARM_RAG | RAG service initialized")
             
             # LLM will be created dynamically based on assistant configuration
@@ -271,6 +295,56 @@ class CallHandler:
             # logger.error("PREWARM_ERROR | failed to pre-warm components: %s", str(e))
             pass
 
+    async def _ensure_vad_ready(self):
+        """Wait (bounded) for in-flight prewarm work, then load the VAD only if it is still missing."""
+        if self._prewarmed_vad is None and self._prewarm_task is not None and not self._prewarm_task.done():
+            prewarm_wait = float(os.getenv("PREWARM_WAIT_SECONDS", "3.0"))
+            try:
+                await asyncio.wait_for(asyncio.shield(self._prewarm_task), timeout=prewarm_wait)
+            except asyncio.TimeoutError:
+                logger.warning(f"PREWARM_WAIT_TIMEOUT | timeout={prewarm_wait}s | loading VAD directly")
+
+        if self._prewarmed_vad is None:
+            self._prewarmed_vad = await asyncio.to_thread(silero.VAD.load)
+        return self._prewarmed_vad
+
+    async def _connect_stage(self, ctx: JobContext, call_id: str) -> float:
+        """Call-start stage: connect to the room. Returns the connect time in ms."""
+        started_at = time.time()
+        async with measure_latency_context("room_connection", call_id):
+            await ctx.connect(auto_subscribe=AutoSubscribe.AUDIO_ONLY)
+        return (time.time() - started_at) * 1000
+
+    async def _resolve_config_stage(self, ctx: JobContext, call_type: str) -> Dict[str, Any]:
+        """Call-start stage: resolve the assistant configuration."""
+        async with measure_latency_context("call_type_determination", get_room_name(ctx)):
+            assistant_config = await self.config_resolver.resolve_assistant_config(
+                ctx, call_type, profiles=CALL_START_PROFILES
+            )
+
+        if not assistant_config:
+            # logger.error(f"NO_ASSISTANT_CONFIG | room={ctx.room.name}")
+            raise CallStartAborted("No assistant config found")
+        return assistant_config
+
+    async def _check_minutes_stage(self, assistant_config: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Call-start stage: reject the call when the assistant owner has no minutes left."""
+        user_id = assistant_config.get("user_id")
+        if not user_id:
+            return None
+
+        minutes_check = await self.mongodb.check_minutes_available(user_id)
+        if not minutes_check.get("available", True) and not minutes_check.get("unlimited", False):
+            remaining = minutes_check.get("remaining_minutes", 0)
+            logger.warning(f"MINUTES_INSUFFICIENT | user={user_id} | remaining={remaining} | call_rejected")
+            raise CallStartAborted(f"Insufficient minutes: {remaining} remaining", disconnect=True)
+        elif minutes_check.get("unlimited"):
+            logger.info(f"MINUTES_CHECK | user={user_id} | unlimited_plan")
+        else:
+            remaining = minutes_check.get("remaining_minutes", 0)
+            logger.info(f"MINUTES_CHECK | user={user_id} | remaining={remaining}")
+        return minutes_check
+
     def _on_metrics_collected(self, event: MetricsCollectedEvent):
         """Handle metrics collection events for latency monitoring."""
         try:
@@ -284,7 +358,14 @@ class CallHandler:
 
             elif event.metrics.type == "llm_metrics":
                 self.llm_latency = event.metrics.ttft
-                logger.info(f"LATENCY_LLM | ttft={self.llm_latency}s")
+                prompt_tokens = getattr(event.metrics, "prompt_tokens", 0) or 0
+                cached_tokens = getattr(event.metrics, "prompt_cached_tokens", 0) or 0
+                self.llm_prompt_tokens += prompt_tokens
+                self.llm_cached_tokens += cached_tokens
+                logger.info(
+                    f"LATENCY_LLM | ttft={self.llm_latency}s | prompt_tokens={prompt_tokens} | "
+                    f"cached_tokens={cached_tokens}"
+                )
 
             elif event.metrics.type == "tts_metrics":
                 self.tts_latency = event.metrics.ttfb
@@ -296,6 +377,29 @@ class CallHandler:
         except Exception as e:
             logger.error(f"METRICS_COLLECTION_ERROR | error={str(e)}")
 
+    def _log_prompt_cache_stats(self, call_id: str) -> None:
+        """Log the share of this call's LLM prompt tokens served from the provider's prompt cache."""
+        hit_rate = self.llm_cached_tokens / self.llm_prompt_tokens if self.llm_prompt_tokens else 0.0
+        logger.info(
+            f"LLM_PROMPT_CACHE | call_id={call_id} | prompt_tokens={self.llm_prompt_tokens} | "
+            f"cached_tokens={self.llm_cached_tokens} | hit_rate={hit_rate:.2f}"
+        )
+
+    def _log_rag_stats(self, call_id: str) -> None:
+        """Log the process-wide Pinecone rate limiter (queueing delay) and de-duplication counters at the end of a call."""
+        if self._prewarmed_rag is None:
+            return
+        try:
+            limits = self._prewarmed_rag.rate_limit_stats()
+            dedup = self._prewarmed_rag.dedup_stats()
+            logger.info(
+                f"RAG_STATS | call_id={call_id} | requests={limits['acquired']} | delayed={limits['delayed']} | "
+                f"total_wait_ms={limits['total_wait_ms']} | max_wait_ms={limits['max_wait_ms']} | kbs={limits['keys']} | "
+                f"searches={dedup['leaders']} | joined={dedup['joined']}"
+            )
+        except Exception as e:
+            logger.warning(f"RAG_STATS_FAILED | call_id={call_id} | error={str(e)}")
+
     async def _on_user_state_changed(self, event: UserStateChangedEvent, session: AgentSession, config: Dict[str, Any], ctx: JobContext) -> None:
         """Handle user state changes to send idle messages when user goes away."""
         try:
@@ -519,48 +623,50 @@ class CallHandler:
 
     async def handle_call(self, ctx: JobContext) -> None:
         """Handle incoming call with proper LiveKit patterns."""
-        call_id = ctx.room.name  # Use room name as call ID
+        call_id = get_room_name(ctx)  # Use room name as call ID
         profiler = LatencyProfiler(call_id, "call_processing")
         
+        # "concurrent" overlaps the room connect with config/minutes/VAD; "sequential" connects first
+        bootstrap_mode = os.getenv("CALL_BOOTSTRAP_MODE", "concurrent").strip().lower()
+        concurrent_bootstrap = bootstrap_mode != "sequential"
+        bootstrap_started = time.time()
+        connect_ms = 0.0
+        
         try:
-            # Measure connection latency
-            async with measure_latency_context("room_connection", call_id):
-                await ctx.connect(auto_subscribe=AutoSubscribe.AUDIO_ONLY)
+            if not concurrent_bootstrap:
+                # Measure connection latency
+                connect_ms = await self._connect_stage(ctx, call_id)
                 # logger.info(f"CONNECTED | room={ctx.room.name}")
-
-            profiler.checkpoint("connected")
+                profiler.checkpoint("connected")
 
             # Log job metadata for debugging
             # logger.info(f"JOB_METADATA | metadata={ctx.job.metadata}")
 
-            # Measure call type determination and config resolution
-            async with measure_latency_context("call_type_determination", call_id):
-                call_type = self._determine_call_type(ctx)
-                assistant_config = await self.config_resolver.resolve_assistant_config(ctx, call_type)
-
-            profiler.checkpoint("config_resolved", {"call_type": call_type})
+            # Resolve config, check minutes and wait for VAD readiness as one stage graph:
+            # minutes depends on config, VAD readiness (and the room connect) are independent.
+            # A failing stage (no assistant, no minutes) cancels the stages still in flight.
+            call_type = self._determine_call_type(ctx)
+            start_graph = StageGraph(call_id, profiler)
+            if concurrent_bootstrap:
+                start_graph.add("connect", lambda _: self._connect_stage(ctx, call_id))
+            start_graph.add("config", lambda _: self._resolve_config_stage(ctx, call_type))
+            start_graph.add("minutes", lambda r: self._check_minutes_stage(r["config"]), deps=("config",))
+            start_graph.add("vad", lambda _: self._ensure_vad_ready())
 
-            if not assistant_config:
-                # logger.error(f"NO_ASSISTANT_CONFIG | room={ctx.room.name}")
-                profiler.finish(success=False, error="No assistant config found")
-                return
-
-            # Check minutes availability before starting call
-            user_id = assistant_config.get("user_id")
-            if user_id:
-                minutes_check = await self.mongodb.check_minutes_available(user_id)
-                if not minutes_check.get("available", True) and not minutes_check.get("unlimited", False):
-                    remaining = minutes_check.get("remaining_minutes", 0)
-                    logger.warning(f"MINUTES_INSUFFICIENT | user={user_id} | remaining={remaining} | call_rejected")
+            try:
+                start_results = await start_graph.run()
+            except CallStartAborted as e:
+                self._log_call_bootstrap(call_id, bootstrap_mode, bootstrap_started, start_graph, connect_ms, success=False, error=e.message)
+                if e.disconnect:
                     # Disconnect the call if no minutes available
                     await ctx.room.disconnect()
-                    profiler.finish(success=False, error=f"Insufficient minutes: {remaining} remaining")
-                    return
-                elif minutes_check.get("unlimited"):
-                    logger.info(f"MINUTES_CHECK | user={user_id} | unlimited_plan")
-                else:
-                    remaining = minutes_check.get("remaining_minutes", 0)
-                    logger.info(f"MINUTES_CHECK | user={user_id} | remaining={remaining}")
+                profiler.finish(success=False, error=e.message)
+                return
+
+            self._log_call_bootstrap(call_id, bootstrap_mode, bootstrap_started, start_graph, connect_ms, success=True)
+
+            assistant_config = start_results["config"]
+            profiler.checkpoint("config_resolved", {"call_type": call_type})
 
             # Handle outbound calls
             if call_type == "outbound":
@@ -570,7 +676,7 @@ class CallHandler:
 
             # Create session and agent BEFORE waiting for participant to start listening immediately
             async with measure_latency_context("session_creation", call_id):
-                session = self._create_session(assistant_config)
+                session = self._create_session(assistant_config, vad=start_results["vad"])
                 
                 # Initialize agent factory with pre-warmed components
                 agent_factory = AgentFactory(
@@ -649,13 +755,27 @@ class CallHandler:
             # Register shutdown callback to ensure proper cleanup and analysis
             start_time = datetime.datetime.now()
             session_id = id(session)
+            
+            # Phase one of the call history write: an "in_progress" skeleton so dashboards see
+            # live calls. Runs in the background and is awaited before the post-call patch.
+            history_start_task: Optional[asyncio.Task] = None
+            if self.mongodb.is_available():
+                caller_phone = extract_phone_from_room(ctx.room.name)
+                history_start_task = asyncio.create_task(self.mongodb.start_call_history(
+                    call_id=ctx.room.name,
+                    assistant_id=assistant_config.get("id"),
+                    phone_number=caller_phone,
+                    start_time=start_time.isoformat(),
+                    participant_identity=caller_phone,
+                    call_sid=self._extract_call_sid(ctx, participant)
+                ))
+            
             async def save_call_on_shutdown():
                 # Clean up idle message count for this session
                 if session_id in self._idle_message_counts:
                     del self._idle_message_counts[session_id]
                 
                 end_time = datetime.datetime.now()
-                call_duration = int((end_time - start_time).total_seconds())
                 
                 # Get session history for analysis
                 session_history = []
@@ -676,25 +796,38 @@ class CallHandler:
                     # logger.error(f"SESSION_HISTORY_READ_FAILED | error={str(e)}")
                     session_history = []
 
-                # Perform post-call analysis and save to database
+                self._log_prompt_cache_stats(ctx.room.name)
+                self._log_rag_stats(ctx.room.name)
+
+                # Keep the two phases in order: the skeleton lands before the final patch is written
+                if history_start_task is not None:
+                    try:
+                        await asyncio.wait_for(asyncio.shield(history_start_task), timeout=5.0)
+                    except asyncio.TimeoutError:
+                        logger.warning(f"CALL_HISTORY_START_PENDING | call_id={ctx.room.name} | continuing with final write")
+                    except Exception as e:
+                        logger.warning(f"CALL_HISTORY_START_FAILED | call_id={ctx.room.name} | error={str(e)}")
+
+                # Hand the finished call to post-call analysis (inline, or queued to the analysis pool)
                 try:
-                    analysis_results = await self._perform_post_call_analysis(assistant_config, session_history, agent, call_duration)
-                    # logger.info(f"POST_CALL_ANALYSIS_RESULTS | summary={bool(analysis_results.get('call_summary'))} | success={analysis_results.get('call_success')} | data_fields={len(analysis_results.get('structured_data', {}))}")
-                    
-                    # Save call history and analysis data to database
-                    await self._save_call_history_to_database(
-                        ctx=ctx,
+                    job = CallFinishedJob.from_call(
+                        call_id=ctx.room.name,
                         assistant_config=assistant_config,
                         session_history=session_history,
-                        analysis_results=analysis_results,
-                        participant=participant,
+                        agent=agent,
                         start_time=start_time,
-                        end_time=end_time
+                        end_time=end_time,
+                        phone_number=extract_phone_from_room(ctx.room.name),
+                        call_sid=self._extract_call_sid(ctx, participant)
                     )
-                    
+                    await submit_call_finished(job, self.post_call_analyzer)
                 except Exception as e:
-                    # logger.error(f"POST_CALL_ANALYSIS_FAILED | error={str(e)}")
-                    pass
+                    logger.error(f"POST_CALL_SUBMIT_FAILED | call_id={ctx.room.name} | error={str(e)}")
+
+                # The job process may exit right after this callback: write the journaled history now
+                flush_timeout = float(os.getenv("CALL_HISTORY_SHUTDOWN_FLUSH_SECONDS", "10"))
+                flushed = await self.mongodb.flush_call_history(timeout=flush_timeout)
+                logger.info(f"CALL_HISTORY_SHUTDOWN_FLUSH | call_id={ctx.room.name} | written={flushed}")
 
             # Register shutdown callback to ensure proper cleanup and analysis
             ctx.add_shutdown_callback(save_call_on_shutdown)
@@ -710,14 +843,44 @@ class CallHandler:
             profiler.finish(success=False, error=str(e))
             raise
 
+    def _log_call_bootstrap(
+        self,
+        call_id: str,
+        mode: str,
+        started_at: float,
+        graph: StageGraph,
+        connect_ms: float,
+        success: bool,
+        error: Optional[str] = None
+    ) -> None:
+        """Log the call_bootstrap wall time next to the serial sum of its steps (= time saved by overlapping)."""
+        wall_ms = (time.time() - started_at) * 1000
+        serial_ms = connect_ms + graph.serial_ms
+        log_latency_measurement(
+            operation="call_bootstrap",
+            duration_ms=wall_ms,
+            call_id=call_id,
+            metadata={
+                "mode": mode,
+                "serial_ms": round(serial_ms, 2),
+                "saved_ms": round(max(serial_ms - wall_ms, 0.0), 2),
+                "stages": graph.durations_ms,
+                "mongo_pool": self.mongodb.pool_stats(),
+                "caches": cache_stats(),
+            },
+            success=success,
+            error=error
+        )
+
     def _determine_call_type(self, ctx: JobContext) -> str:
         """Determine the type of call based on room name and metadata."""
-        room_name = ctx.room.name.lower()
+        room_name = get_room_name(ctx).lower()
+        room_metadata_raw = get_room_metadata(ctx)
         
         # Check room metadata for call type
-        if ctx.room.metadata:
+        if room_metadata_raw:
             try:
-                room_metadata = json.loads(ctx.room.metadata)
+                room_metadata = json.loads(room_metadata_raw)
                 if room_metadata.get("source") == "web":
                     return "web"
                 if room_metadata.get("callType") == "web":
@@ -779,281 +942,6 @@ class CallHandler:
             # logger.error(f"SESSION_WAIT_ERROR | error={str(e)}")
             pass
 
-    async def _perform_post_call_analysis(self, config: Dict[str, Any], session_history: list, agent, call_duration: int = 0) -> Dict[str, Any]:
-        """Perform complete post-call analysis including AI-powered outcome determination."""
-        analysis_results = {
-            "call_summary": None,
-            "call_success": None,
-            "structured_data": {},
-            "call_outcome": None,
-            "outcome_confidence": None,
-            "outcome_reasoning": None,
-            "analysis_timestamp": datetime.datetime.now().isoformat()
-        }
-
-        try:
-            # Process session history into transcription format
-            transcription = []
-            for item in session_history:
-                if isinstance(item, dict) and "role" in item and "content" in item:
-                    content = item["content"]
-                    # Handle different content formats
-                    if isinstance(content, list):
-                        content_parts = []
-                        for c in content:
-                            if c and str(c).strip():
-                                content_parts.append(str(c).strip())
-                        content = " ".join(content_parts)
-                    elif not isinstance(content, str):
-                        content = str(content)
-                    
-                    # Only add non-empty content
-                    if content and content.strip():
-                        transcription.append({
-                            "role": item["role"],
-                            "content": content.strip()
-                        })
-            
-            # logger.info(f"POST_CALL_ANALYSIS_TRANSCRIPTION | items={len(transcription)} | duration={call_duration}s")
-            
-            # Determine call type for outcome analysis
-            call_type = "inbound"  # Default to inbound, could be determined from context
-            
-            # Use OpenAI to analyze call outcome
-            outcome_analysis = await self.call_outcome_service.analyze_call_outcome(
-                transcription=transcription,
-                call_duration=call_duration,
-                call_type=call_type
-            )
-            
-            if outcome_analysis:
-                analysis_results.update({
-                    "call_outcome": outcome_analysis.outcome,
-                    "outcome_confidence": outcome_analysis.confidence,
-                    "outcome_reasoning": outcome_analysis.reasoning,
-                    "outcome_key_points": outcome_analysis.key_points,
-                    "outcome_sentiment": outcome_analysis.sentiment,
-                    "follow_up_required": outcome_analysis.follow_up_required,
-                    "follow_up_notes": outcome_analysis.follow_up_notes
-                })
-                # logger.info(f"AI_OUTCOME_ANALYSIS | outcome={outcome_analysis.outcome} | confidence={outcome_analysis.confidence}")
-            else:
-                # Check actual booking status from agent before fallback analysis
-                actual_booking_status = None
-                if hasattr(agent, '_booking_data') and hasattr(agent._booking_data, 'booked'):
-                    actual_booking_status = agent._booking_data.booked
-                    # logger.info(f"ACTUAL_BOOKING_STATUS | booked={actual_booking_status}")
-                
-                # Use actual booking status if available, otherwise fallback to heuristic
-                if actual_booking_status is True:
-                    analysis_results["call_outcome"] = "Booked Appointment"
-                    analysis_results["outcome_confidence"] = 0.9  # High confidence for actual booking
-                    analysis_results["outcome_reasoning"] = "Confirmed booking status from agent"
-                    # logger.info(f"BOOKING_STATUS_CONFIRMED | outcome=Booked Appointment")
-                else:
-                    # Fallback to heuristic-based outcome determination
-                    fallback_outcome = self.call_outcome_service.get_fallback_outcome(transcription, call_duration)
-                    analysis_results["call_outcome"] = fallback_outcome
-                    analysis_results["outcome_confidence"] = 0.3  # Low confidence for fallback
-                    analysis_results["outcome_reasoning"] = "Fallback heuristic analysis (OpenAI unavailable)"
-                    # logger.warning(f"FALLBACK_OUTCOME_ANALYSIS | outcome={fallback_outcome}")
-            
-            # Use comprehensive analysis processing like the old code
-            analysis_data = await self._process_call_analysis(
-                assistant_id=config.get("id"),
-                transcription=transcription,  # Use processed transcription
-                call_duration=call_duration,
-                agent=agent,
-                assistant_config=config
-            )
-            
-            # Merge analysis results
-            analysis_results.update(analysis_data)
-            
-            # logger.info(f"POST_CALL_ANALYSIS_COMPLETE | summary={bool(analysis_results['call_summary'])} | success={analysis_results['call_success']} | outcome={analysis_results['call_outcome']} | data_fields={len(analysis_results['structured_data'])}")
-
-        except Exception as e:
-            # logger.error(f"POST_CALL_ANALYSIS_ERROR | error={str(e)}")
-            # Fallback to basic analysis
-            try:
-                if hasattr(agent, 'get_structured_data'):
-                    analysis_results["structured_data"] = agent.get_structured_data()
-                if hasattr(agent, 'get_call_summary'):
-                    analysis_results["call_summary"] = agent.get_call_summary()
-                if hasattr(agent, 'get_call_success'):
-                    analysis_results["call_success"] = agent.get_call_success()
-            except Exception as fallback_error:
-                # logger.error(f"FALLBACK_ANALYSIS_ERROR | error={str(fallback_error)}")
-                pass
-
-        return analysis_results
-
-    async def _save_call_history_to_database(
-        self, 
-        ctx: JobContext, 
-        assistant_config: Dict[str, Any], 
-        session_history: list, 
-        analysis_results: Dict[str, Any],
-        participant,
-        start_time: datetime.datetime,
-        end_time: datetime.datetime
-    ) -> None:
-        """Save call history and analysis data to database."""
-        try:
-            # Check if database client is available
-            if not self.mongodb.is_available():
-                # logger.warning("Database client not available - skipping call history save")
-                return
-            
-            # Generate call ID from room name
-            call_id = ctx.room.name
-            
-            # Calculate call duration from provided start and end times
-            call_duration = int((end_time - start_time).total_seconds())
-            
-            # Extract call_sid like in old implementation
-            call_sid = self._extract_call_sid(ctx, participant)
-            # logger.info(f"CALL_SID_EXTRACTED | call_sid={call_sid}")
-            
-            # Process transcription from session history
-            transcription = []
-            # logger.info(f"SESSION_HISTORY_DEBUG | items_count={len(session_history)}")
-            
-            for i, item in enumerate(session_history):
-                # logger.info(f"SESSION_ITEM_{i} | type={type(item)} | content={str(item)[:100]}...")
-                if isinstance(item, dict) and "role" in item and "content" in item:
-                    content = item["content"]
-                    # Handle different content formats
-                    if isinstance(content, list):
-                        content_parts = []
-                        for c in content:
-                            if c and str(c).strip():
-                                content_parts.append(str(c).strip())
-                        content = " ".join(content_parts)
-                    elif not isinstance(content, str):
-                        content = str(content)
-                    
-                    # Only add non-empty content
-                    if content and content.strip():
-                        transcription.append({
-                            "role": item["role"],
-                            "content": content.strip()
-                        })
-                        # logger.info(f"TRANSCRIPTION_ADDED | role={item['role']} | content_length={len(content.strip())}")
-            
-            # logger.info(f"TRANSCRIPTION_PREPARED | session_items={len(session_history)} | transcription_items={len(transcription)}")
-            
-            # Determine call status from AI analysis results
-            call_status = analysis_results.get("call_outcome", "Qualified")
-            
-            # Log the AI-determined call status
-            # logger.info(f"AI_CALL_STATUS_DETERMINED | status={call_status} | confidence={analysis_results.get('outcome_confidence', 'N/A')}")
-            
-            # Extract contact name from analysis results
-            contact_name = None
-            if analysis_results.get("structured_data") and isinstance(analysis_results["structured_data"], dict):
-                structured_data = analysis_results["structured_data"]
-                # Try different possible name fields
-                contact_name = (
-                    structured_data.get("name") or 
-                    structured_data.get("full_name") or 
-                    structured_data.get("contact_name") or
-                    structured_data.get("customer_name") or
-                    structured_data.get("client_name")
-                )
-                # logger.info(f"CONTACT_NAME_EXTRACTED | from_analysis={contact_name} | structured_data_keys={list(structured_data.keys())}")
-            
-            # Use contact name if available, otherwise fall back to participant identity or phone number
-            participant_identity = (
-                contact_name or 
-                (participant.identity if participant else None) or 
-                extract_phone_from_room(ctx.room.name)
-            )
-            
-            # logger.info(f"PARTICIPANT_IDENTITY_DETERMINED | phone={extract_phone_from_room(ctx.room.name)}")
-
-            # Prepare call data
-            call_data = {
-                "call_id": call_id,
-                "assistant_id": assistant_config.get("id"),
-                "phone_number": extract_phone_from_room(ctx.room.name),
-                "participant_identity": extract_phone_from_room(ctx.room.name),
-                "start_time": start_time.isoformat(),
-                "end_time": end_time.isoformat(),
-                "call_duration": call_duration,
-                "call_status": call_status,
-                "transcription": transcription if transcription else [],
-                "call_sid": call_sid
-            }
-            
-            # Add analysis results
-            if analysis_results.get("call_summary"):
-                call_data["call_summary"] = analysis_results["call_summary"]
-            if analysis_results.get("call_success") is not None:
-                # Convert boolean to string for database storage
-                call_data["success_evaluation"] = "SUCCESS" if analysis_results["call_success"] else "FAILED"
-            if analysis_results.get("structured_data"):
-                call_data["structured_data"] = analysis_results["structured_data"]
-            
-            # Add outcome analysis details
-            if analysis_results.get("outcome_confidence"):
-                call_data["outcome_confidence"] = analysis_results["outcome_confidence"]
-            if analysis_results.get("outcome_reasoning"):
-                call_data["outcome_reasoning"] = analysis_results["outcome_reasoning"]
-            if analysis_results.get("outcome_key_points"):
-                call_data["outcome_key_points"] = analysis_results["outcome_key_points"]
-            if analysis_results.get("outcome_sentiment"):
-                call_data["outcome_sentiment"] = analysis_results["outcome_sentiment"]
-            if analysis_results.get("follow_up_required"):
-                call_data["follow_up_required"] = analysis_results["follow_up_required"]
-            if analysis_results.get("follow_up_notes"):
-                call_data["follow_up_notes"] = analysis_results["follow_up_notes"]
-            
-            # Log what we're saving
-            # logger.info(f"CALL_DATA_TO_SAVE | call_sid={call_data.get('call_sid')} | call_id={call_data.get('call_id')} | status={call_data.get('call_status')}")
-            
-            # Save to database via MongoDB API
-            success = await self.mongodb.save_call_history(
-                call_id=call_data["call_id"],
-                assistant_id=call_data["assistant_id"],
-                phone_number=call_data["phone_number"],
-                call_duration=call_data["call_duration"],
-                call_status=call_data["call_status"],
-                transcription=call_data["transcription"],
-                participant_identity=call_data.get("participant_identity"),
-                call_sid=call_data.get("call_sid"),
-                start_time=call_data.get("start_time"),
-                end_time=call_data.get("end_time")
-            )
-            
-            if success:
-                # logger.info(f"CALL_HISTORY_SAVED | call_id={call_id} | duration={call_duration}s | ai_status={call_status} | confidence={analysis_results.get('outcome_confidence', 'N/A')} | transcription_items={len(transcription)}")
-                if transcription:
-                    sample_transcript = transcription[0] if len(transcription) > 0 else {}
-                    # logger.info(f"TRANSCRIPTION_SAMPLE | first_entry={sample_transcript}")
-                
-                # Deduct minutes from user account after call completes
-                user_id = assistant_config.get("user_id")
-                if user_id and call_duration > 0:
-                    # Convert seconds to minutes (round up)
-                    minutes_used = call_duration / 60.0
-                    deduction_result = await self.mongodb.deduct_minutes(user_id, minutes_used)
-                    if deduction_result.get("success"):
-                        remaining = deduction_result.get("remaining_minutes", 0)
-                        exceeded = deduction_result.get("exceeded_limit", False)
-                        logger.info(f"MINUTES_DEDUCTED | user={user_id} | minutes={minutes_used:.2f} | remaining={remaining} | exceeded={exceeded}")
-                        if exceeded:
-                            logger.warning(f"MINUTES_LIMIT_EXCEEDED | user={user_id} | used={deduction_result.get('minutes_used')} | limit={deduction_result.get('minutes_limit')}")
-                    else:
-                        logger.error(f"MINUTES_DEDUCTION_FAILED | user={user_id} | error={deduction_result.get('error')}")
-            else:
-                # logger.error(f"CALL_HISTORY_SAVE_FAILED | call_id={call_id}")
-                pass
-                
-        except Exception as e:
-            # logger.error(f"CALL_HISTORY_SAVE_ERROR | error={str(e)}")
-            pass
-
     def _extract_call_sid(self, ctx: JobContext, participant) -> Optional[str]:
         """Extract call_sid from various sources like in old implementation."""
         call_sid = None
@@ -1109,301 +997,15 @@ class CallHandler:
         
         return call_sid
 
-    async def _process_call_analysis(
-        self, 
-        assistant_id: str, 
-        transcription: list, 
-        call_duration: int, 
-        agent, 
-        assistant_config: Dict[str, Any]
-    ) -> Dict[str, Any]:
-        """Process comprehensive call analysis like the old code."""
-        analysis_data = {
-            "call_summary": None,
-            "call_success": None,
-            "structured_data": {}
-        }
-        
-        try:
-            # logger.info(f"PROCESS_CALL_ANALYSIS_START | assistant_id={assistant_id} | transcription_items={len(transcription)}")
-            
-            # Generate call summary if configured
-            call_summary_prompt = assistant_config.get("analysis_summary_prompt")
-            if call_summary_prompt:
-                try:
-                    analysis_data["call_summary"] = await self._generate_call_summary_with_llm(
-                        transcription=transcription,
-                        prompt=call_summary_prompt,
-                        timeout=assistant_config.get("analysis_summary_timeout", 30)
-                    )
-                    # logger.info(f"CALL_SUMMARY_GENERATED | assistant_id={assistant_id} | length={len(analysis_data['call_summary']) if analysis_data['call_summary'] else 0}")
-                except Exception as e:
-                    # logger.warning(f"CALL_SUMMARY_FAILED | assistant_id={assistant_id} | error={str(e)}")
-                    pass
-            
-            # Evaluate call success if configured
-            success_prompt = assistant_config.get("analysis_evaluation_prompt")
-            if success_prompt:
-                try:
-                    analysis_data["call_success"] = await self._evaluate_call_success_with_llm(
-                        transcription=transcription,
-                        prompt=success_prompt,
-                        timeout=assistant_config.get("analysis_evaluation_timeout", 15)
-                    )
-                    # logger.info(f"CALL_SUCCESS_EVALUATED | assistant_id={assistant_id} | success={analysis_data['call_success']}")
-                except Exception as e:
-                    # logger.warning(f"CALL_SUCCESS_EVALUATION_FAILED | assistant_id={assistant_id} | error={str(e)}")
-                    pass
-            
-            # Process structured data extraction
-            structured_data_fields = assistant_config.get("structured_data_fields", [])
-            # logger.info(f"STRUCTURED_DATA_CONFIG_CHECK | assistant_id={assistant_id} | fields_count={len(structured_data_fields)}")
-            
-            # Always try to get data directly from agent
-            agent_structured_data = {}
-            if agent and hasattr(agent, 'get_structured_data'):
-                agent_structured_data = agent.get_structured_data()
-                # logger.info(f"AGENT_STRUCTURED_DATA_RETRIEVED | assistant_id={assistant_id} | fields_count={len(agent_structured_data)}")
-            
-            # Extract names from call summary if no structured name data exists
-            if analysis_data.get("call_summary") and not agent_structured_data.get("Customer Name"):
-                extracted_name = extract_name_from_summary(analysis_data["call_summary"])
-                if extracted_name:
-                    agent_structured_data["Customer Name"] = {
-                        "value": extracted_name,
-                        "type": "string",
-                        "timestamp": datetime.datetime.now().isoformat(),
-                        "collection_method": "summary_extraction"
-                    }
-                    # logger.info(f"NAME_EXTRACTED_FROM_SUMMARY | assistant_id={assistant_id} | name={extracted_name}")
-            
-            # If we have configured fields, also try AI extraction
-            if structured_data_fields and len(structured_data_fields) > 0:
-                try:
-                    ai_structured_data = await self._extract_structured_data_with_ai(
-                        transcription=transcription,
-                        fields=structured_data_fields,
-                        prompt=assistant_config.get("analysis_structured_data_prompt"),
-                        properties=assistant_config.get("analysis_structured_data_properties", {}),
-                        timeout=assistant_config.get("analysis_structured_data_timeout", 20),
-                        agent=agent
-                    )
-                    # Merge AI extracted data with agent data (agent data takes precedence)
-                    final_structured_data = {**ai_structured_data, **agent_structured_data}
-                    analysis_data["structured_data"] = final_structured_data
-                    # logger.info(f"STRUCTURED_DATA_EXTRACTED_WITH_AI | assistant_id={assistant_id} | ai_fields={len(ai_structured_data)} | agent_fields={len(agent_structured_data)} | final_fields={len(final_structured_data)}")
-                except Exception as e:
-                    # logger.error(f"AI_STRUCTURED_DATA_EXTRACTION_FAILED | assistant_id={assistant_id} | error={str(e)} | fields_count={len(structured_data_fields)} | transcription_items={len(transcription)}")
-                    # logger.error(f"AI_EXTRACTION_FALLBACK | assistant_id={assistant_id} | falling_back_to_agent_data_only | agent_fields={len(agent_structured_data)}")
-                    # Fallback to agent data only - but log this as an error, not a warning
-                    # Add a flag to indicate AI extraction failed
-                    fallback_data = agent_structured_data.copy()
-                    fallback_data["_ai_extraction_failed"] = {
-                        "error": str(e),
-                        "timestamp": datetime.datetime.now().isoformat(),
-                        "configured_fields_count": len(structured_data_fields)
-                    }
-                    analysis_data["structured_data"] = fallback_data
-            else:
-                # No configured fields, just use agent data
-                analysis_data["structured_data"] = agent_structured_data
-                # logger.info(f"STRUCTURED_DATA_EXTRACTED_AGENT_ONLY | assistant_id={assistant_id} | fields_count={len(agent_structured_data)}")
-            
-        except Exception as e:
-            # logger.error(f"ANALYSIS_PROCESSING_ERROR | assistant_id={assistant_id} | error={str(e)}")
-            # Fallback to basic agent data
-            if agent and hasattr(agent, 'get_structured_data'):
-                try:
-                    fallback_data = agent.get_structured_data()
-                    analysis_data["structured_data"] = fallback_data
-                    # logger.info(f"STRUCTURED_DATA_FALLBACK_SUCCESS | assistant_id={assistant_id} | fields_count={len(fallback_data)}")
-                except Exception as fallback_error:
-                    # logger.warning(f"STRUCTURED_DATA_FALLBACK_FAILED | assistant_id={assistant_id} | error={str(fallback_error)}")
-                    pass
-        
-        return analysis_data
-
-    async def _generate_call_summary_with_llm(self, transcription: list, prompt: str, timeout: int = 30) -> str:
-        """Generate call summary using LLM like the old code."""
-        try:
-            # logger.info(f"CALL_SUMMARY_DEBUG | transcription_items={len(transcription)}")
-            
-            # Prepare transcription text
-            transcript_text = ""
-            for item in transcription:
-                if isinstance(item, dict) and "content" in item:
-                    role = item.get("role", "unknown")
-                    content = item["content"]
-                    if isinstance(content, str):
-                        transcript_text += f"{role}: {content}\n"
-                        # logger.info(f"TRANSCRIPT_ITEM | role={role} | content_length={len(content)}")
-            
-            # logger.info(f"TRANSCRIPT_TEXT_LENGTH | length={len(transcript_text)}")
-            
-            if not transcript_text.strip():
-                # logger.warning("EMPTY_TRANSCRIPT_TEXT | returning default message")
-                return "No conversation content available for summary."
-
-            # Use OpenAI API for summary generation
-            openai_api_key = os.getenv("OPENAI_API_KEY")
-            if not openai_api_key:
-                # logger.warning("OPENAI_API_KEY not configured for call summary")
-                return "Summary generation not available - API key not configured."
-
-            # Use shared OpenAI client
-            client = AsyncOpenAI(api_key=openai_api_key)
-            
-            response = await asyncio.wait_for(
-                client.chat.completions.create(
-                    model="gpt-4o-mini",
-                    messages=[
-                        {"role": "system", "content": prompt},
-                        {"role": "user", "content": f"Please summarize this call:\n\n{transcript_text}"}
-                    ],
-                    max_tokens=500,
-                    temperature=0.3
-                ),
-                timeout=min(max(timeout, 20), 60),
-            )
-
-            return response.choices[0].message.content.strip()
-
-        except asyncio.TimeoutError:
-            # logger.warning(f"CALL_SUMMARY_TIMEOUT | timeout={timeout}s")
-            return "Summary generation timed out."
-        except Exception as e:
-            # logger.warning(f"CALL_SUMMARY_ERROR | error={str(e)}")
-            return f"Summary generation failed: {str(e)}"
-
-    async def _evaluate_call_success_with_llm(self, transcription: list, prompt: str, timeout: int = 15) -> bool:
-        """Evaluate call success using LLM like the old code."""
-        try:
-            # Prepare transcription text
-            transcript_text = ""
-            for item in transcription:
-                if isinstance(item, dict) and "content" in item:
-                    role = item.get("role", "unknown")
-                    content = item["content"]
-                    if isinstance(content, str):
-                        transcript_text += f"{role}: {content}\n"
-            
-            if not transcript_text.strip():
-                return False
-
-            # Use OpenAI API for success evaluation
-            openai_api_key = os.getenv("OPENAI_API_KEY")
-            if not openai_api_key:
-                # logger.warning("OPENAI_API_KEY not configured for success evaluation")
-                return False
-
-            # Use shared OpenAI client
-            client = AsyncOpenAI(api_key=openai_api_key)
-            
-            response = await asyncio.wait_for(
-                client.chat.completions.create(
-                    model="gpt-4o-mini",
-                    messages=[
-                        {"role": "system", "content": prompt},
-                        {"role": "user", "content": f"Please evaluate this call:\n\n{transcript_text}\n\nWas this call successful? Answer only 'YES' or 'NO'."}
-                    ],
-                    max_tokens=10,
-                    temperature=0.1
-                ),
-                timeout=min(max(timeout, 10), 45),
-            )
-
-            result = response.choices[0].message.content.strip().upper()
-            return result == "YES"
-
-        except asyncio.TimeoutError:
-            # logger.warning(f"CALL_SUCCESS_EVALUATION_TIMEOUT | timeout={timeout}s")
-            return False
-        except Exception as e:
-            # logger.warning(f"CALL_SUCCESS_EVALUATION_ERROR | error={str(e)}")
-            return False
-
-    async def _extract_structured_data_with_ai(
-        self, 
-        transcription: list, 
-        fields: list, 
-        prompt: str = None, 
-        properties: dict = None, 
-        timeout: int = 20,
-        agent = None
-    ) -> Dict[str, Any]:
-        """Extract structured data using AI like the old code."""
-        try:
-            # logger.info(f"AI_STRUCTURED_DATA_EXTRACTION_START | fields_count={len(fields)}")
-            
-            # Prepare transcription text
-            transcript_text = ""
-            for item in transcription:
-                if isinstance(item, dict) and "content" in item:
-                    role = item.get("role", "unknown")
-                    content = item["content"]
-                    if isinstance(content, str):
-                        transcript_text += f"{role}: {content}\n"
-            
-            if not transcript_text.strip():
-                # logger.warning("EMPTY_TRANSCRIPT_FOR_AI_EXTRACTION")
-                return {}
-
-            # Use OpenAI API for structured data extraction
-            openai_api_key = os.getenv("OPENAI_API_KEY")
-            if not openai_api_key:
-                # logger.warning("OPENAI_API_KEY not configured for structured data extraction")
-                return {}
-
-            # Use shared OpenAI client
-            client = AsyncOpenAI(api_key=openai_api_key)
-            
-            # Build the extraction prompt
-            extraction_prompt = prompt or "Extract the following information from the call transcript:"
-            field_descriptions = []
-            for field in fields:
-                field_descriptions.append(f"- {field}")
-            
-            system_prompt = f"{extraction_prompt}\n\n{chr(10).join(field_descriptions)}\n\nReturn the data as a JSON object with the field names as keys."
-            
-            response = await asyncio.wait_for(
-                client.chat.completions.create(
-                    model="gpt-4o-mini",
-                    messages=[
-                        {"role": "system", "content": system_prompt},
-                        {"role": "user", "content": f"Please extract the requested information from this call:\n\n{transcript_text}"}
-                    ],
-                    max_tokens=1000,
-                    temperature=0.1
-                ),
-                timeout=min(max(timeout, 15), 60),
-            )
-
-            # Parse the response
-            result_text = response.choices[0].message.content.strip()
-            try:
-                import json
-                extracted_data = json.loads(result_text)
-                # logger.info(f"AI_STRUCTURED_DATA_EXTRACTED | fields={list(extracted_data.keys())}")
-                return extracted_data
-            except json.JSONDecodeError:
-                # logger.warning(f"AI_EXTRACTION_JSON_PARSE_ERROR | response={result_text[:200]}...")
-                return {}
-
-        except asyncio.TimeoutError:
-            # logger.warning(f"AI_STRUCTURED_DATA_EXTRACTION_TIMEOUT | timeout={timeout}s")
-            return {}
-        except Exception as e:
-            # logger.warning(f"AI_STRUCTURED_DATA_EXTRACTION_ERROR | error={str(e)}")
-            return {}
-
-    def _create_session(self, config: Dict[str, Any]) -> AgentSession:
+    def _create_session(self, config: Dict[str, Any], vad=None) -> AgentSession:
         """Create agent session using assistant's database settings."""
         # Validate and fix model names to prevent API errors
         from config.settings import validate_model_names
-        config = validate_model_names(config)
+        config = validate_model_names(config, profiles=("session",))
         
-        # re-use prewarmed VAD, fallback if missing
-        vad = getattr(self, "_prewarmed_vad", None) or silero.VAD.load()
+        # VAD readiness is resolved by the call-start stage graph; never reload it here
+        if vad is None:
+            vad = self._prewarmed_vad
 
         # Get configuration from assistant data - optimized for performance
         llm_provider = config.get("llm_provider_setting", "OpenAI")
@@ -1847,9 +1449,16 @@ class CallHandler:
 
 
 def prewarm(proc: agents.JobProcess):
-    """Pre-warm the system before handling calls."""
+    """Pre-warm the worker process once, before it is assigned any call."""
     # logger.info("PREWARM_FUNCTION | system pre-warming started")
-    # Pre-warming is now handled in CallHandler.__init__
+    resources = WorkerResources.load(openai_client=_OPENAI_CLIENT)
+    resources.install(proc)
+    logger.info(
+        "PREWARM_COMPLETE | vad=%s | mongodb=%s | rag=%s",
+        resources.vad is not None,
+        resources.mongodb is not None and resources.mongodb.is_available(),
+        resources.rag_service is not None,
+    )
 
 
 async def entrypoint(ctx: JobContext):
@@ -1858,8 +1467,8 @@ async def entrypoint(ctx: JobContext):
     logger.info(f"📋 Job metadata: {ctx.job.metadata}")
     logger.info(f"📋 Room metadata: {ctx.room.metadata}")
     
-    # Create call handler and process the call
-    handler = CallHandler()
+    # Create call handler backed by the process-scoped resources and process the call
+    handler = CallHandler(WorkerResources.from_process(ctx.proc))
     await handler.handle_call(ctx)
     
     logger.info(f"✅ AGENT_ENTRYPOINT_COMPLETE | room={ctx.room.name}")
@@ -4,9 +4,11 @@ Agent factory for creating and configuring LiveKit agents.
 
 import os
 import json
+import hashlib
 import asyncio
 import datetime
 import logging
+from dataclasses import dataclass
 from typing import Dict, Any, Optional
 from zoneinfo import ZoneInfo
 
@@ -14,20 +16,61 @@ from livekit.agents import Agent
 from services.unified_agent import UnifiedAgent
 from integrations.calendar_api import CalComCalendar
 from config.settings import validate_model_names
+from integrations.llm_clients import get_openai_client
+from utils.assistant_profiles import select_profile
+from utils.ttl_cache import TTLCache
 from utils.instruction_builder import build_analysis_instructions, build_call_management_instructions, build_workflow_instructions
 
 logger = logging.getLogger(__name__)
 
-# Global OpenAI client for field classification
-_OPENAI_CLIENT = None
+# Bump when the classification prompt changes so stored results are not reused
+FIELD_CLASSIFICATION_VERSION = 1
 
-def get_openai_client():
-    """Get or create OpenAI client for field classification."""
-    global _OPENAI_CLIENT
-    if _OPENAI_CLIENT is None:
-        from openai import AsyncOpenAI
-        _OPENAI_CLIENT = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-    return _OPENAI_CLIENT
+# fields hash -> classification; shared by every call in the worker process
+_FIELD_CLASSIFICATIONS = TTLCache(max_entries=1024, ttl=24 * 3600)
+
+
+def field_classification_key(structured_data: list) -> str:
+    """Stable hash of the field definitions the classification depends on."""
+    fields = [
+        {
+            "name": field.get("name", ""),
+            "description": field.get("description", ""),
+            "type": field.get("type", "string")
+        }
+        for field in structured_data
+    ]
+    canonical = json.dumps({"version": FIELD_CLASSIFICATION_VERSION, "fields": fields}, sort_keys=True)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+# Compiled instructions keyed by (assistant id, instructions_config_hash)
+_COMPILED_INSTRUCTIONS = TTLCache(max_entries=512, ttl=3600)
+
+KNOWLEDGE_BASE_INSTRUCTIONS = "\n\nKNOWLEDGE BASE ACCESS:\nYou have access to a knowledge base with information about the company. You can use the following tools when needed:\n- query_knowledge_base: Search for specific information\n- get_detailed_information: Get comprehensive details about a topic\n\nIMPORTANT: Only use the knowledge base tools when explicitly instructed to do so in your system prompt or when the user specifically requests information that requires knowledge base lookup. Do not automatically search the knowledge base unless instructed.\n\nWhen you do use the knowledge base, provide complete, well-formatted responses with proper context and source information when available."
+
+BOOKING_INSTRUCTIONS = "\n\nBOOKING CAPABILITIES:\nYou can help users book appointments. You have access to the following booking tools:\n- list_slots_on_day: Show available appointment slots for a specific day (shows 10 slots by default - use max_options=20 to show more)\n- choose_slot: Select a time slot for the appointment (can use time like '7:00pm' or slot number from list)\n- set_name: Set the customer's name\n- set_email: Set the customer's email\n- set_phone: Set the customer's phone number\n- finalize_booking: Complete the booking when ALL information is collected (time slot, name, email, phone)\n\nCRITICAL BOOKING RULES:\n- ONLY start booking if the user explicitly requests it (e.g., 'I want to book', 'schedule an appointment', 'book a time')\n- Do NOT automatically start booking just because you have contact information (phone, email, name)\n- Do NOT call list_slots_on_day or any booking tools unless the user explicitly asks to book or schedule an appointment\n- Do NOT call finalize_booking or confirm_details until you have: 1) selected time slot, 2) customer name, 3) email, and 4) phone number. Only call ONE of these functions, not both."
+
+
+@dataclass(frozen=True)
+class CompiledInstructions:
+    """Per-assistant instruction text, the static prefix of every call's instructions."""
+    text: str
+
+
+def _force_first_message() -> bool:
+    return os.getenv("FORCE_FIRST_MESSAGE", "true").lower() != "false"
+
+
+def instructions_config_hash(config: Dict[str, Any]) -> str:
+    """Hash of every setting the compiled instructions depend on."""
+    settings = select_profile(config, "agent")
+    canonical = json.dumps(
+        {"config": settings, "force_first_message": _force_first_message()},
+        sort_keys=True,
+        default=str
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
 
 
 class AgentFactory:
@@ -42,56 +85,11 @@ class AgentFactory:
     async def create_agent(self, config: Dict[str, Any]) -> Agent:
         """Create appropriate agent based on configuration."""
         # Validate model names first
-        config = validate_model_names(config)
+        config = validate_model_names(config, profiles=("agent",))
         
-        instructions = config.get("prompt", "You are a helpful assistant.")
-
-        # Add date context only if calendar is configured
-        cal_api_key = config.get('cal_api_key')
-        cal_event_type_id = config.get('cal_event_type_id')
-        if cal_api_key and cal_event_type_id:
-            tz_name = (config.get("cal_timezone") or "Asia/Karachi")
-            try:
-                now_local = datetime.datetime.now(ZoneInfo(tz_name))
-            except Exception as e:
-                logger.warning(f"Invalid timezone '{tz_name}': {str(e)}, falling back to UTC")
-                tz_name = "UTC"
-                now_local = datetime.datetime.now(ZoneInfo(tz_name))
-            instructions += (
-                f"\n\nCONTEXT:\n"
-                f"- Current local time: {now_local.isoformat()}\n"
-                f"- Timezone: {tz_name}\n"
-                f"- When the user says a date like '7th October', always interpret it as the next FUTURE occurrence in {tz_name}. "
-                f"Never call tools with past dates; if a parsed date is in the past year, bump it to the next year."
-            )
-
-        # Add call management settings to instructions
-        call_management_config = build_call_management_instructions(config)
-        if call_management_config:
-            instructions += "\n\n" + call_management_config
-
-        # Add analysis instructions for structured data collection
-        analysis_instructions = await build_analysis_instructions(config, self._classify_data_fields_with_llm)
-        if analysis_instructions:
-            instructions += "\n\n" + analysis_instructions
-            logger.info(f"ANALYSIS_INSTRUCTIONS_ADDED | length={len(analysis_instructions)}")
-
-        # Add workflow (node-based) instructions if available
-        workflow_instructions = build_workflow_instructions(config)
-        if workflow_instructions:
-            instructions += "\n\n" + workflow_instructions
-            logger.info(f"WORKFLOW_INSTRUCTIONS_ADDED | length={len(workflow_instructions)}")
-
-        # Add first message handling
-        first_message = config.get("first_message", "")
-        force_first = os.getenv("FORCE_FIRST_MESSAGE", "true").lower() != "false"
-        if force_first and first_message:
-            instructions += f' IMPORTANT: Start the conversation by saying exactly: "{first_message}" Do not repeat or modify this greeting.'
-            logger.info(f"FIRST_MESSAGE_SET | first_message={first_message}")
-
-        # Log final instructions for debugging
-        # logger.info(f"FINAL_INSTRUCTIONS_LENGTH | length={len(instructions)}")
-        # logger.info(f"FINAL_INSTRUCTIONS_PREVIEW | preview={instructions}...")
+        # Byte-stable per assistant version, so providers can serve it from their prompt cache
+        compiled = await self._get_compiled_instructions(config)
+        instructions = compiled.text
 
         # Create unified agent that combines RAG and booking capabilities
         knowledge_base_id = config.get("knowledge_base_id")
@@ -100,16 +98,14 @@ class AgentFactory:
         # Initialize calendar if credentials are available
         calendar = await self._initialize_calendar(config)
 
-        # Add RAG tools to instructions if knowledge base is available
-        if knowledge_base_id:
-            instructions += "\n\nKNOWLEDGE BASE ACCESS:\nYou have access to a knowledge base with information about the company. You can use the following tools when needed:\n- query_knowledge_base: Search for specific information\n- get_detailed_information: Get comprehensive details about a topic\n\nIMPORTANT: Only use the knowledge base tools when explicitly instructed to do so in your system prompt or when the user specifically requests information that requires knowledge base lookup. Do not automatically search the knowledge base unless instructed.\n\nWhen you do use the knowledge base, provide complete, well-formatted responses with proper context and source information when available."
-            logger.info("RAG_TOOLS | Knowledge base tools added to instructions (conditional usage)")
-
         # Add booking instructions only if calendar is available
         if calendar:
-            instructions += "\n\nBOOKING CAPABILITIES:\nYou can help users book appointments. You have access to the following booking tools:\n- list_slots_on_day: Show available appointment slots for a specific day (shows 10 slots by default - use max_options=20 to show more)\n- choose_slot: Select a time slot for the appointment (can use time like '7:00pm' or slot number from list)\n- set_name: Set the customer's name\n- set_email: Set the customer's email\n- set_phone: Set the customer's phone number\n- finalize_booking: Complete the booking when ALL information is collected (time slot, name, email, phone)\n\nCRITICAL BOOKING RULES:\n- ONLY start booking if the user explicitly requests it (e.g., 'I want to book', 'schedule an appointment', 'book a time')\n- Do NOT automatically start booking just because you have contact information (phone, email, name)\n- Do NOT call list_slots_on_day or any booking tools unless the user explicitly asks to book or schedule an appointment\n- Do NOT call finalize_booking or confirm_details until you have: 1) selected time slot, 2) customer name, 3) email, and 4) phone number. Only call ONE of these functions, not both."
+            instructions += BOOKING_INSTRUCTIONS
             logger.info("BOOKING_TOOLS | Calendar booking tools added to instructions")
 
+        # Per-call data goes last so it never changes the cached prefix
+        instructions += self._time_context(config)
+
         # Create unified agent with both RAG and booking capabilities
         # Use pre-warmed components if available
         llm_provider = config.get("llm_provider_setting", "OpenAI")
@@ -161,6 +157,78 @@ class AgentFactory:
 
         return agent
 
+    @staticmethod
+    def _time_context(config: Dict[str, Any]) -> str:
+        """Current local time block; only added when a calendar is configured."""
+        # Add date context only if calendar is configured
+        cal_api_key = config.get('cal_api_key')
+        cal_event_type_id = config.get('cal_event_type_id')
+        if not (cal_api_key and cal_event_type_id):
+            return ""
+        tz_name = (config.get("cal_timezone") or "Asia/Karachi")
+        try:
+            now_local = datetime.datetime.now(ZoneInfo(tz_name))
+        except Exception as e:
+            logger.warning(f"Invalid timezone '{tz_name}': {str(e)}, falling back to UTC")
+            tz_name = "UTC"
+            now_local = datetime.datetime.now(ZoneInfo(tz_name))
+        return (
+            f"\n\nCONTEXT:\n"
+            f"- Current local time: {now_local.isoformat()}\n"
+            f"- Timezone: {tz_name}\n"
+            f"- When the user says a date like '7th October', always interpret it as the next FUTURE occurrence in {tz_name}. "
+            f"Never call tools with past dates; if a parsed date is in the past year, bump it to the next year."
+        )
+
+    async def _get_compiled_instructions(self, config: Dict[str, Any]) -> CompiledInstructions:
+        """Instruction text for this assistant version, built once per worker process."""
+        cache_key = (config.get("_id_str") or config.get("id"), instructions_config_hash(config))
+        compiled = _COMPILED_INSTRUCTIONS.get(cache_key)
+        if compiled is not None:
+            logger.info(f"INSTRUCTIONS_CACHE_HIT | assistant={cache_key[0]} | hash={cache_key[1][:12]}")
+            return compiled
+
+        compiled = await self._compile_instructions(config)
+        fields = config.get("structured_data_fields") or []
+        # A fallback classification (LLM unavailable) is not cached, so neither is its text
+        if not fields or field_classification_key(fields) in _FIELD_CLASSIFICATIONS:
+            _COMPILED_INSTRUCTIONS.set(cache_key, compiled)
+        return compiled
+
+    async def _compile_instructions(self, config: Dict[str, Any]) -> CompiledInstructions:
+        """Build every per-assistant part of the instructions (classifying data fields if needed)."""
+        instructions = config.get("prompt", "You are a helpful assistant.")
+
+        # Add call management settings to instructions
+        call_management_config = build_call_management_instructions(config)
+        if call_management_config:
+            instructions += "\n\n" + call_management_config
+
+        # Add analysis instructions for structured data collection
+        analysis_instructions = await build_analysis_instructions(config, self._classify_data_fields_with_llm)
+        if analysis_instructions:
+            instructions += "\n\n" + analysis_instructions
+            logger.info(f"ANALYSIS_INSTRUCTIONS_ADDED | length={len(analysis_instructions)}")
+
+        # Add workflow (node-based) instructions if available
+        workflow_instructions = build_workflow_instructions(config)
+        if workflow_instructions:
+            instructions += "\n\n" + workflow_instructions
+            logger.info(f"WORKFLOW_INSTRUCTIONS_ADDED | length={len(workflow_instructions)}")
+
+        # Add first message handling
+        first_message = config.get("first_message", "")
+        if _force_first_message() and first_message:
+            instructions += f' IMPORTANT: Start the conversation by saying exactly: "{first_message}" Do not repeat or modify this greeting.'
+            logger.info(f"FIRST_MESSAGE_SET | first_message={first_message}")
+
+        # Add RAG tools to instructions if knowledge base is available
+        if config.get("knowledge_base_id"):
+            instructions += KNOWLEDGE_BASE_INSTRUCTIONS
+            logger.info("RAG_TOOLS | Knowledge base tools added to instructions (conditional usage)")
+
+        return CompiledInstructions(text=instructions)
+
     async def _initialize_calendar(self, config: Dict[str, Any]) -> Optional[CalComCalendar]:
         """Initialize calendar if credentials are available."""
         # Debug logging for calendar configuration
@@ -231,13 +299,45 @@ class AgentFactory:
             return None
 
     async def _classify_data_fields_with_llm(self, structured_data: list) -> Dict[str, list]:
-        """Use LLM to classify which fields should be asked vs extracted."""
-        try:
-            openai_api_key = os.getenv("OPENAI_API_KEY")
-            if not openai_api_key:
-                logger.warning("OPENAI_API_KEY not configured for field classification")
-                return {"ask_user": [], "extract_from_conversation": []}
+        """Classify which fields should be asked vs extracted, memoised by the field definitions.
 
+        The LLM only runs when an assistant's fields change: results are cached in
+        process and persisted to the ``field_classifications`` collection.
+        """
+        fields_hash = field_classification_key(structured_data)
+        classification = _FIELD_CLASSIFICATIONS.get(fields_hash)
+        if classification is not None:
+            logger.info(f"FIELD_CLASSIFICATION_CACHE_HIT | hash={fields_hash[:12]} | source=memory")
+            return classification
+
+        if self.mongodb and self.mongodb.is_available():
+            classification = await self.mongodb.fetch_field_classification(fields_hash)
+            if classification is not None:
+                _FIELD_CLASSIFICATIONS.set(fields_hash, classification)
+                logger.info(f"FIELD_CLASSIFICATION_CACHE_HIT | hash={fields_hash[:12]} | source=mongodb")
+                return classification
+
+        if not os.getenv("OPENAI_API_KEY"):
+            logger.warning("OPENAI_API_KEY not configured for field classification")
+            return {"ask_user": [], "extract_from_conversation": []}
+
+        classification = await self._request_field_classification(structured_data)
+        if classification is None:
+            # Fallback to asking user for all fields (not cached, so the next call retries)
+            return {
+                "ask_user": [field.get("name", "") for field in structured_data],
+                "extract_from_conversation": []
+            }
+
+        _FIELD_CLASSIFICATIONS.set(fields_hash, classification)
+        if self.mongodb and self.mongodb.is_available():
+            # Off the call-start path
+            asyncio.create_task(self.mongodb.save_field_classification(fields_hash, classification))
+        return classification
+
+    async def _request_field_classification(self, structured_data: list) -> Optional[Dict[str, list]]:
+        """Use LLM to classify which fields should be asked vs extracted. Returns None on failure."""
+        try:
             client = get_openai_client()
             
             # Prepare field descriptions
@@ -287,16 +387,8 @@ Return a JSON object with two arrays. You must respond with valid JSON format on
                 return classification
             except json.JSONDecodeError as e:
                 logger.error(f"FIELD_CLASSIFICATION_JSON_ERROR | error={str(e)} | content={content}")
-                # Fallback to asking user for all fields
-                return {
-                    "ask_user": [field.get("name", "") for field in structured_data],
-                    "extract_from_conversation": []
-                }
+                return None
                 
         except Exception as e:
             logger.error(f"FIELD_CLASSIFICATION_ERROR | error={str(e)}")
-            # Fallback to asking user for all fields
-            return {
-                "ask_user": [field.get("name", "") for field in structured_data],
-                "extract_from_conversation": []
-            }
+            return None
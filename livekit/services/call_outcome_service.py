@@ -18,7 +18,9 @@ try:
 except ImportError:
     AsyncOpenAI = None
 
+from integrations.llm_clients import get_openai_client
 from utils.latency_logger import measure_latency_context
+from utils.transcript import Transcript
 
 
 logger = logging.getLogger(__name__)
@@ -34,15 +36,37 @@ class CallOutcomeAnalysis:
     follow_up_required: bool
     follow_up_notes: Optional[str] = None
 
+# Outcome label -> when to choose it
+OUTCOME_GUIDELINES: Dict[str, str] = {
+    "Booked Appointment": "Appointment was successfully scheduled",
+    "Qualified": "Caller meets service criteria and shows interest",
+    "Not Qualified": "Caller doesn't meet service criteria",
+    "Spam": "Unwanted or spam call",
+    "Escalated": "Call needs escalation to franchise or manager",
+    "Call Dropped": "Call ended unexpectedly or was disconnected",
+}
+VALID_OUTCOMES: Tuple[str, ...] = tuple(OUTCOME_GUIDELINES)
+
+
+def outcome_guidelines_text() -> str:
+    return "\n".join(f'- "{outcome}": {guideline}' for outcome, guideline in OUTCOME_GUIDELINES.items())
+
+
 class CallOutcomeService:
     """Service for analyzing call transcriptions and determining outcomes using OpenAI"""
     
-    def __init__(self):
+    def __init__(self, client: Optional["AsyncOpenAI"] = None):
         self.client = None
+        # Token budget for the transcript sent for outcome analysis, to keep latency predictable
+        self.max_transcript_tokens = int(os.getenv("ANALYSIS_TOKEN_BUDGET_OUTCOME", "1000"))
         api_key = os.getenv("OPENAI_API_KEY")
-        if AsyncOpenAI and api_key:
+        if client is not None:
+            # Shared worker client; retries are handled by _call_openai_api
+            self.client = client.with_options(max_retries=0)
+            logger.info("OPENAI_CLIENT_SHARED | Call outcome analysis enabled")
+        elif AsyncOpenAI and api_key:
             try:
-                self.client = AsyncOpenAI(api_key=api_key)
+                self.client = get_openai_client().with_options(max_retries=0)
                 logger.info("OPENAI_CLIENT_INITIALIZED | Call outcome analysis enabled")
             except Exception as e:
                 logger.error(f"OPENAI_CLIENT_INIT_FAILED | error={str(e)}")
@@ -50,13 +74,6 @@ class CallOutcomeService:
         else:
             logger.warning("OPENAI_CLIENT_NOT_AVAILABLE | OPENAI_API_KEY not configured")
     
-    def _truncate_transcript(self, text: str, max_chars: int = 3500) -> str:
-        """Hard-cap the transcript to keep latency predictable."""
-        if len(text) <= max_chars:
-            return text
-        # Keep last part (most recent turns)
-        return text[-max_chars:]
-
     def _retry_delays(self) -> Tuple[float, float, float]:
         """Small, jittered backoff."""
         return (0.2, 0.6, 1.2)
@@ -91,10 +108,8 @@ class CallOutcomeService:
             "call_type": call_type
         }):
             try:
-                # Convert transcription to text format
-                raw_text = self._format_transcription_for_analysis(transcription)
-                transcript_text = self._truncate_transcript(raw_text)
-
+                # Head, tail and salient turns within the budget; shared with the other analysis steps
+                transcript_text = Transcript.of(transcription).window(self.max_transcript_tokens, speaker_labels=True)
                 
                 if not transcript_text.strip():
                     logger.warning("EMPTY_TRANSCRIPTION | Cannot analyze empty transcription")
@@ -123,41 +138,11 @@ class CallOutcomeService:
                 logger.error(f"CALL_OUTCOME_ANALYSIS_ERROR | error={str(e)}")
                 return None
     
-    def _format_transcription_for_analysis(self, transcription: List[Dict[str, Any]]) -> str:
-        """Format transcription for OpenAI analysis"""
-        formatted_lines = []
-        
-        for turn in transcription:
-            role = turn.get('role', 'unknown')
-            content = turn.get('content', '')
-            
-            # Handle different content formats
-            if isinstance(content, list):
-                content = ' '.join(str(item) for item in content if item)
-            elif not isinstance(content, str):
-                content = str(content)
-            
-            if content.strip():
-                # Format as conversation
-                speaker = "Assistant" if role == "assistant" else "Caller"
-                formatted_lines.append(f"{speaker}: {content.strip()}")
-        
-        return '\n'.join(formatted_lines)
-    
     def _create_analysis_prompt(self, transcript_text: str, call_duration: int, call_type: str) -> str:
         """Create the analysis prompt for OpenAI"""
         
-        # Define valid outcomes based on call type
-        if call_type == "outbound":
-            valid_outcomes = [
-                "Booked Appointment", "Qualified", "Not Qualified", "Spam", 
-                "Escalated", "Call Dropped"
-            ]
-        else:  # inbound
-            valid_outcomes = [
-                "Booked Appointment", "Qualified", "Not Qualified", "Spam", 
-                "Escalated", "Call Dropped"
-            ]
+        # Same outcomes for inbound and outbound calls
+        valid_outcomes = list(VALID_OUTCOMES)
         
         prompt = f"""
 You are an expert call analyst. Analyze the following phone call transcription and determine the most appropriate outcome.
@@ -190,12 +175,7 @@ RESPONSE FORMAT (JSON only):
 }}
 
 OUTCOME GUIDELINES:
-- "Booked Appointment": Appointment was successfully scheduled
-- "Qualified": Caller meets service criteria and shows interest
-- "Not Qualified": Caller doesn't meet service criteria
-- "Spam": Unwanted or spam call
-- "Escalated": Call needs escalation to franchise or manager
-- "Call Dropped": Call ended unexpectedly or was disconnected
+{outcome_guidelines_text()}
 
 Respond with ONLY the JSON object, no additional text.
 """
@@ -286,18 +266,8 @@ Respond with ONLY the JSON object, no additional text.
         if call_duration < 10:
             return "Call Dropped"
         
-        # Extract content for analysis
-        all_content = ""
-        for turn in transcription:
-            content = turn.get('content', '')
-            if isinstance(content, list):
-                content = ' '.join(str(item) for item in content if item)
-            elif not isinstance(content, str):
-                content = str(content)
-            all_content += content.lower() + " "
-        
-        # Simple keyword matching with more sophisticated logic
-        all_content_lower = all_content.lower()
+        # Lower-cased content, cached on the transcript
+        all_content_lower = Transcript.of(transcription).lower_text
         
         # Check for actual booking success indicators
         booking_success_keywords = [
@@ -0,0 +1,128 @@
+"""
+Call-start stage graph.
+
+Runs the independent steps needed before a session can start (config
+resolution, minutes check, VAD readiness, ...) as a small dependency graph so
+that steps without a dependency on each other run concurrently, and records
+per-stage timings on the call's ``LatencyProfiler``.
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from utils.latency_logger import LatencyProfiler
+
+logger = logging.getLogger(__name__)
+
+StageFn = Callable[[Dict[str, Any]], Awaitable[Any]]
+
+
+class CallStartAborted(Exception):
+    """Raised by a stage to stop the call from starting (e.g. no assistant, no minutes)."""
+
+    def __init__(self, message: str, disconnect: bool = False) -> None:
+        super().__init__(message)
+        self.message = message
+        self.disconnect = disconnect
+
+
+@dataclass
+class _Stage:
+    name: str
+    fn: StageFn
+    deps: Tuple[str, ...] = field(default_factory=tuple)
+    timeout: Optional[float] = None
+
+
+class StageGraph:
+    """Dependency-ordered set of async call-start stages.
+
+    Each stage receives a dict with the results of the stages it depends on.
+    Stages with no path between them run concurrently. The first stage to fail
+    cancels every stage still running and its exception is re-raised.
+    """
+
+    def __init__(self, call_id: str, profiler: Optional[LatencyProfiler] = None):
+        self.call_id = call_id
+        self.profiler = profiler
+        self._stages: Dict[str, _Stage] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self.durations_ms: Dict[str, float] = {}
+
+    @property
+    def serial_ms(self) -> float:
+        """Sum of all recorded stage durations, i.e. the cost had they run one after another."""
+        return sum(self.durations_ms.values())
+
+    def add(
+        self,
+        name: str,
+        fn: StageFn,
+        deps: Tuple[str, ...] = (),
+        timeout: Optional[float] = None,
+    ) -> "StageGraph":
+        """Register a stage. Dependencies must be registered before their dependents."""
+        missing = [d for d in deps if d not in self._stages]
+        if missing:
+            raise ValueError(f"Stage '{name}' depends on unknown stages: {missing}")
+        self._stages[name] = _Stage(name=name, fn=fn, deps=tuple(deps), timeout=timeout)
+        return self
+
+    async def run(self) -> Dict[str, Any]:
+        """Run all stages and return their results keyed by stage name."""
+        for name in self._stages:
+            self._tasks[name] = asyncio.create_task(self._run_stage(name), name=f"call_start:{name}")
+
+        tasks = list(self._tasks.values())
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+
+        return {name: task.result() for name, task in self._tasks.items()}
+
+    async def _run_stage(self, name: str) -> Any:
+        stage = self._stages[name]
+        if stage.deps:
+            await asyncio.gather(*(self._tasks[d] for d in stage.deps))
+        inputs = {d: self._tasks[d].result() for d in stage.deps}
+
+        started_at = time.time()
+        try:
+            coro = stage.fn(inputs)
+            if stage.timeout is not None:
+                result = await asyncio.wait_for(coro, timeout=stage.timeout)
+            else:
+                result = await coro
+        except asyncio.CancelledError:
+            self._record(name, started_at, success=False, status="cancelled")
+            raise
+        except CallStartAborted as e:
+            self._record(name, started_at, success=False, status="aborted", error=e.message)
+            raise
+        except Exception as e:
+            self._record(name, started_at, success=False, status="error", error=str(e))
+            raise
+
+        self._record(name, started_at, success=True, status="ok")
+        return result
+
+    def _record(self, name: str, started_at: float, success: bool, status: str, error: Optional[str] = None) -> None:
+        finished_at = time.time()
+        self.durations_ms[name] = round((finished_at - started_at) * 1000, 2)
+        metadata = {"status": status, "deps": list(self._stages[name].deps)}
+        if error:
+            metadata["error"] = error
+        if self.profiler:
+            self.profiler.record_stage(name, started_at, finished_at, success=success, metadata=metadata)
+        logger.debug(
+            "CALL_START_STAGE | call_id=%s | stage=%s | status=%s | duration_ms=%.2f",
+            self.call_id, name, status, (finished_at - started_at) * 1000,
+        )
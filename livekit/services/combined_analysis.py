@@ -0,0 +1,173 @@
+"""
+Combined post-call analysis: one structured-output request per call.
+
+The per-task analysis sends the transcript to the model up to four times
+(outcome, summary, success evaluation, structured data extraction). In
+combined mode a single request carries the transcript once and a JSON schema
+that asks for all of them together.
+
+An assistant's custom analysis prompts are embedded as per-section
+instructions. Prompts that dictate their own output format (JSON, tables, a
+different schema, ...) cannot be honoured inside the shared schema; such
+assistants, and field lists that cannot be expressed as one schema, keep the
+per-task requests (see ``combined_conflicts``).
+"""
+
+import re
+import json
+import logging
+from typing import Any, Dict, List, Optional
+
+from services.call_outcome_service import CallOutcomeAnalysis, VALID_OUTCOMES, outcome_guidelines_text
+
+logger = logging.getLogger(__name__)
+
+# Custom prompts mentioning an output format of their own conflict with the shared schema
+_FORMAT_DIRECTIVE = re.compile(r"\b(json|xml|yaml|csv|markdown|schema|table)\b", re.IGNORECASE)
+
+_CUSTOM_PROMPT_KEYS = (
+    "analysis_summary_prompt",
+    "analysis_evaluation_prompt",
+    "analysis_structured_data_prompt",
+)
+
+_FIELD_TYPES = {
+    "string": "string", "text": "string", "date": "string", "datetime": "string",
+    "number": "number", "float": "number", "decimal": "number",
+    "integer": "integer", "int": "integer",
+    "boolean": "boolean", "bool": "boolean",
+}
+
+
+def combined_conflicts(config: Dict[str, Any]) -> List[str]:
+    """Reasons this assistant's analysis cannot be folded into one request (empty when it can)."""
+    reasons: List[str] = []
+    for key in _CUSTOM_PROMPT_KEYS:
+        prompt = config.get(key)
+        if prompt and _FORMAT_DIRECTIVE.search(str(prompt)):
+            reasons.append(f"{key} sets its own output format")
+
+    names = [field.get("name") if isinstance(field, dict) else None
+             for field in config.get("structured_data_fields") or []]
+    if any(not name for name in names):
+        reasons.append("structured_data_fields has unnamed fields")
+    elif len(set(names)) != len(names):
+        reasons.append("structured_data_fields has duplicate names")
+    return reasons
+
+
+def _field_schema(field: Dict[str, Any], properties: Dict[str, Any]) -> Dict[str, Any]:
+    override = properties.get(field["name"]) if isinstance(properties, dict) else None
+    override = override if isinstance(override, dict) else {}
+    field_type = str(override.get("type") or field.get("type") or "string").lower()
+    schema: Dict[str, Any] = {"type": [_FIELD_TYPES.get(field_type, "string"), "null"]}
+    description = override.get("description") or field.get("description")
+    if description:
+        schema["description"] = str(description)
+    return schema
+
+
+def build_combined_schema(config: Dict[str, Any]) -> Dict[str, Any]:
+    """Strict JSON schema for the outcome plus the summary, success and fields the assistant configures."""
+    properties: Dict[str, Any] = {
+        "outcome": {"type": "string", "enum": list(VALID_OUTCOMES)},
+        "confidence": {"type": "number", "description": "Confidence in the outcome, 0.0 to 1.0"},
+        "reasoning": {"type": "string"},
+        "key_points": {"type": "array", "items": {"type": "string"}},
+        "sentiment": {"type": "string", "enum": ["positive", "neutral", "negative"]},
+        "follow_up_required": {"type": "boolean"},
+        "follow_up_notes": {"type": ["string", "null"]},
+    }
+    if config.get("analysis_summary_prompt"):
+        properties["summary"] = {"type": "string"}
+    if config.get("analysis_evaluation_prompt"):
+        properties["success"] = {"type": "boolean"}
+
+    fields = config.get("structured_data_fields") or []
+    if fields:
+        field_properties = {
+            field["name"]: _field_schema(field, config.get("analysis_structured_data_properties") or {})
+            for field in fields
+        }
+        properties["structured_data"] = {
+            "type": "object",
+            "properties": field_properties,
+            "required": list(field_properties),
+            "additionalProperties": False,
+        }
+
+    # Strict mode requires every property to be listed as required
+    return {
+        "type": "object",
+        "properties": properties,
+        "required": list(properties),
+        "additionalProperties": False,
+    }
+
+
+def build_combined_messages(
+    config: Dict[str, Any],
+    transcript_text: str,
+    call_duration: int,
+    call_type: str = "inbound"
+) -> List[Dict[str, str]]:
+    """System and user messages for the combined request."""
+    sections = [
+        "You are an expert call analyst. Analyze the phone call transcript and fill in every field "
+        "of the JSON response.",
+        f"OUTCOME (outcome, confidence, reasoning, key_points, sentiment, follow_up_required, "
+        f"follow_up_notes):\nChoose the most appropriate outcome.\n{outcome_guidelines_text()}",
+    ]
+    if config.get("analysis_summary_prompt"):
+        sections.append(f"SUMMARY (summary):\n{config['analysis_summary_prompt']}")
+    if config.get("analysis_evaluation_prompt"):
+        sections.append(
+            f"SUCCESS (success):\n{config['analysis_evaluation_prompt']}\n"
+            "Set success to true only if the call was successful."
+        )
+    fields = config.get("structured_data_fields") or []
+    if fields:
+        extraction_prompt = (config.get("analysis_structured_data_prompt")
+                             or "Extract the following information from the call transcript:")
+        field_lines = "\n".join(f"- {field['name']}: {field.get('description', '')}" for field in fields)
+        sections.append(
+            f"STRUCTURED DATA (structured_data):\n{extraction_prompt}\n{field_lines}\n"
+            "Use null for information that was not mentioned in the call."
+        )
+
+    return [
+        {"role": "system", "content": "\n\n".join(sections)},
+        {
+            "role": "user",
+            "content": f"Call type: {call_type}\nDuration: {call_duration} seconds\n\nTRANSCRIPT:\n{transcript_text}",
+        },
+    ]
+
+
+def parse_combined_response(raw: str, config: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Split a combined response into the per-task results (``outcome``, ``summary``, ``success``, ``extraction``)."""
+    try:
+        data = json.loads(raw)
+        results: Dict[str, Any] = {
+            "outcome": CallOutcomeAnalysis(
+                outcome=data["outcome"],
+                confidence=float(data.get("confidence", 0.5)),
+                reasoning=data.get("reasoning") or "No reasoning provided",
+                key_points=data.get("key_points") or [],
+                sentiment=data.get("sentiment", "neutral"),
+                follow_up_required=bool(data.get("follow_up_required", False)),
+                follow_up_notes=data.get("follow_up_notes")
+            )
+        }
+    except (json.JSONDecodeError, TypeError, ValueError, KeyError) as e:
+        logger.error(f"ANALYSIS_COMBINED_PARSE_ERROR | error={str(e)} | response={str(raw)[:200]}...")
+        return None
+
+    if config.get("analysis_summary_prompt"):
+        results["summary"] = data.get("summary")
+    if config.get("analysis_evaluation_prompt"):
+        results["success"] = bool(data.get("success", False))
+    if config.get("structured_data_fields"):
+        extracted = data.get("structured_data") or {}
+        results["extraction"] = {name: value for name, value in extracted.items() if value is not None}
+    return results
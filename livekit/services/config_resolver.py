@@ -5,10 +5,10 @@ Configuration resolver for assistant configurations.
 import asyncio
 import json
 import logging
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Sequence
 from livekit.agents import JobContext
 from integrations.mongodb_client import MongoDBClient
-from utils.data_extractors import extract_did_from_room
+from utils.data_extractors import extract_did_from_room, get_room_name, get_room_metadata
 
 logger = logging.getLogger(__name__)
 
@@ -19,17 +19,25 @@ class ConfigResolver:
     def __init__(self, mongodb_client: MongoDBClient):
         self.mongodb = mongodb_client
     
-    async def resolve_assistant_config(self, ctx: JobContext, call_type: str) -> Optional[Dict[str, Any]]:
-        """Resolve assistant configuration for the call."""
+    async def resolve_assistant_config(
+        self,
+        ctx: JobContext,
+        call_type: str,
+        profiles: Optional[Sequence[str]] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Resolve assistant configuration for the call, limited to ``profiles`` when given."""
+        # Room name/metadata are read through helpers so resolution can run before ctx.connect()
+        room_name = get_room_name(ctx)
+        room_metadata_raw = get_room_metadata(ctx)
         try:
             # For web calls, check room metadata first
             if call_type == "web":
                 assistant_id = None
                 
                 # Try to get assistant_id from room metadata
-                if ctx.room.metadata:
+                if room_metadata_raw:
                     try:
-                        room_metadata = json.loads(ctx.room.metadata)
+                        room_metadata = json.loads(room_metadata_raw)
                         assistant_id = room_metadata.get("assistantId") or room_metadata.get("assistant_id")
                         logger.info(f"WEB_ASSISTANT_FROM_ROOM | assistant_id={assistant_id}")
                     except (json.JSONDecodeError, KeyError):
@@ -45,14 +53,14 @@ class ConfigResolver:
                         pass
                 
                 if assistant_id:
-                    return await self._get_assistant_by_id(assistant_id)
+                    return await self._get_assistant_by_id(assistant_id, profiles)
                 else:
                     logger.warning("WEB_NO_ASSISTANT_ID | could not find assistantId in metadata | attempting DID fallback")
                     # Fallback to DID lookup for web calls if they look like they have a DID
-                    called_did = extract_did_from_room(ctx.room.name)
+                    called_did = extract_did_from_room(room_name)
                     if called_did:
                         logger.info(f"WEB_DID_FALLBACK | found DID={called_did} | looking up assistant")
-                        return await self._get_assistant_by_phone(called_did)
+                        return await self._get_assistant_by_phone(called_did, profiles)
                     
                     logger.error("WEB_NO_ASSISTANT_ID | could not find assistantId or DID in room")
                     return None
@@ -69,7 +77,7 @@ class ConfigResolver:
                 assistant_id = dial_info.get("agentId") or dial_info.get("assistant_id")
                 if assistant_id:
                     logger.info(f"OUTBOUND_ASSISTANT | assistant_id={assistant_id}")
-                    return await self._get_assistant_by_id(assistant_id)
+                    return await self._get_assistant_by_id(assistant_id, profiles)
                 else:
                     logger.error("OUTBOUND_NO_ASSISTANT_ID | metadata={metadata}")
                     return None
@@ -79,7 +87,7 @@ class ConfigResolver:
                 assistant_id = dial_info.get("assistantId") or dial_info.get("assistant_id")
                 if assistant_id:
                     logger.info(f"INBOUND_WITH_ASSISTANT | assistant_id={assistant_id}")
-                    return await self._get_assistant_by_id(assistant_id)
+                    return await self._get_assistant_by_id(assistant_id, profiles)
                 else:
                     logger.error("INBOUND_NO_ASSISTANT_ID | metadata={metadata}")
                     return None
@@ -106,12 +114,12 @@ class ConfigResolver:
 
             # Fallback to room name extraction if not found in metadata
             if not called_did:
-                called_did = extract_did_from_room(ctx.room.name)
-                logger.info(f"INBOUND_ROOM_NAME_FALLBACK | room={ctx.room.name} | called_did={called_did}")
+                called_did = extract_did_from_room(room_name)
+                logger.info(f"INBOUND_ROOM_NAME_FALLBACK | room={room_name} | called_did={called_did}")
 
             if called_did:
                 logger.info(f"INBOUND_LOOKUP | looking up assistant for DID={called_did}")
-                return await self._get_assistant_by_phone(called_did)
+                return await self._get_assistant_by_phone(called_did, profiles)
 
             logger.error("INBOUND_NO_DID | could not determine called number")
             return None
@@ -120,22 +128,22 @@ class ConfigResolver:
             logger.error(f"ASSISTANT_RESOLUTION_ERROR | error={str(e)}")
             return None
 
-    async def _get_assistant_by_id(self, assistant_id: str) -> Optional[Dict[str, Any]]:
+    async def _get_assistant_by_id(self, assistant_id: str, profiles: Optional[Sequence[str]] = None) -> Optional[Dict[str, Any]]:
         """Get assistant configuration by ID."""
         try:
             if not self.mongodb.is_available():
                 logger.warning("MongoDB client not available")
                 return None
                 
-            assistant_data = await self.mongodb.fetch_assistant(assistant_id)
+            assistant_data = await self.mongodb.fetch_assistant(assistant_id, profiles)
             
             if assistant_data:
                 logger.info(f"ASSISTANT_FOUND_BY_ID | assistant_id={assistant_id}")
-                logger.info(f"ASSISTANT_CONFIG_DEBUG | knowledge_base_id={assistant_data.get('knowledge_base_id')}")
-                logger.info(f"ASSISTANT_CALENDAR_DEBUG | cal_api_key present: {bool(assistant_data.get('cal_api_key'))} | cal_event_type_id present: {bool(assistant_data.get('cal_event_type_id'))}")
+                logger.debug(f"ASSISTANT_CONFIG_DEBUG | knowledge_base_id={assistant_data.get('knowledge_base_id')}")
+                logger.debug(f"ASSISTANT_CALENDAR_DEBUG | cal_api_key present: {bool(assistant_data.get('cal_api_key'))} | cal_event_type_id present: {bool(assistant_data.get('cal_event_type_id'))}")
                 cal_api_key = assistant_data.get('cal_api_key') or 'NOT_FOUND'
                 cal_event_type_id = assistant_data.get('cal_event_type_id') or 'NOT_FOUND'
-                logger.info(f"ASSISTANT_CALENDAR_DEBUG | cal_api_key: {cal_api_key[:10] if cal_api_key != 'NOT_FOUND' else 'NOT_FOUND'}... | cal_event_type_id: {cal_event_type_id}")
+                logger.debug(f"ASSISTANT_CALENDAR_DEBUG | cal_api_key: {cal_api_key[:10] if cal_api_key != 'NOT_FOUND' else 'NOT_FOUND'}... | cal_event_type_id: {cal_event_type_id}")
                 return assistant_data
             
             logger.warning(f"No assistant found for ID: {assistant_id}")
@@ -144,14 +152,14 @@ class ConfigResolver:
             logger.error(f"DATABASE_ERROR | assistant_id={assistant_id} | error={str(e)}")
             return None
 
-    async def _get_assistant_by_phone(self, phone_number: str) -> Optional[Dict[str, Any]]:
+    async def _get_assistant_by_phone(self, phone_number: str, profiles: Optional[Sequence[str]] = None) -> Optional[Dict[str, Any]]:
         """Get assistant configuration by phone number."""
         try:
             if not self.mongodb.is_available():
                 logger.warning("MongoDB client not available")
                 return None
                 
-            assistant_data = await self.mongodb.fetch_assistant_by_phone(phone_number)
+            assistant_data = await self.mongodb.fetch_assistant_by_phone(phone_number, profiles)
             
             if assistant_data:
                 logger.info(f"ASSISTANT_FOUND_BY_PHONE | phone={phone_number}")
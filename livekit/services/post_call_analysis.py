@@ -0,0 +1,832 @@
+"""
+Post-call analysis: outcome, summary, success evaluation and structured data
+extraction for a finished call, followed by the call history write and the
+minutes deduction.
+
+Voice workers describe a finished call as a ``CallFinishedJob`` and hand it to
+``submit_call_finished``. Depending on ``POST_CALL_ANALYSIS_MODE`` the job is:
+
+- ``inline`` (default): analysed in the job's shutdown callback, as before;
+- ``local``: put on an in-process queue drained by a background worker pool
+  (development / tests - jobs are lost if the process exits);
+- ``redis``: pushed to a Redis list and consumed by a separate analysis
+  service, so the voice worker is released as soon as the job is queued and
+  analysis throughput scales independently of call capacity:
+
+      POST_CALL_ANALYSIS_MODE=redis ANALYSIS_QUEUE_URL=redis://... python -m services.post_call_analysis
+"""
+
+import os
+import json
+import time
+import uuid
+import socket
+import asyncio
+import datetime
+import logging
+from dataclasses import asdict, dataclass, field
+from functools import cached_property
+from typing import Any, Awaitable, Dict, List, Optional, Tuple
+
+try:
+    import redis.asyncio as aioredis
+    REDIS_AVAILABLE = True
+except ImportError:
+    aioredis = None
+    REDIS_AVAILABLE = False
+
+from integrations.llm_clients import close_llm_clients, get_openai_client
+from services.call_outcome_service import CallOutcomeService
+from services.combined_analysis import build_combined_messages, build_combined_schema, combined_conflicts, parse_combined_response
+from utils.assistant_profiles import select_profile
+from utils.data_extractors import extract_name_from_summary
+from utils.latency_logger import log_latency_measurement
+from utils.transcript import Transcript, warm_tokenizer
+
+logger = logging.getLogger(__name__)
+
+# Transcript tokens sent with each analysis request (the outcome budget lives in CallOutcomeService)
+DEFAULT_TOKEN_BUDGETS: Dict[str, int] = {
+    "summary": 6000,
+    "success": 3000,
+    "extraction": 6000,
+    "combined": 8000,
+}
+
+
+@dataclass
+class CallFinishedJob:
+    """Everything post-call analysis needs, detached from the LiveKit job (JSON-serialisable)."""
+    call_id: str
+    assistant_config: Dict[str, Any]
+    transcription: List[Dict[str, str]]
+    call_duration: int
+    start_time: str
+    end_time: str
+    phone_number: Optional[str] = None
+    call_sid: Optional[str] = None
+    # State the agent collected during the call (booking status, structured data, ...)
+    agent_state: Dict[str, Any] = field(default_factory=dict)
+    job_id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    enqueued_at: float = field(default_factory=time.time)
+    # Failed processing attempts so far (queue retries)
+    attempts: int = 0
+
+    @staticmethod
+    def snapshot_agent(agent) -> Dict[str, Any]:
+        """Capture the agent state read by the analysis before the agent is torn down."""
+        state: Dict[str, Any] = {}
+        try:
+            if hasattr(agent, '_booking_data') and hasattr(agent._booking_data, 'booked'):
+                state["booked"] = agent._booking_data.booked
+            if hasattr(agent, 'get_structured_data'):
+                state["structured_data"] = agent.get_structured_data()
+            if hasattr(agent, 'get_call_summary'):
+                state["call_summary"] = agent.get_call_summary()
+            if hasattr(agent, 'get_call_success'):
+                state["call_success"] = agent.get_call_success()
+        except Exception as e:
+            logger.warning(f"AGENT_SNAPSHOT_FAILED | error={str(e)}")
+        return state
+
+    @classmethod
+    def from_call(
+        cls,
+        call_id: str,
+        assistant_config: Dict[str, Any],
+        session_history: list,
+        agent,
+        start_time: datetime.datetime,
+        end_time: datetime.datetime,
+        phone_number: Optional[str] = None,
+        call_sid: Optional[str] = None
+    ) -> "CallFinishedJob":
+        return cls(
+            call_id=call_id,
+            # Identity fields only; the analysis profile is loaded by the analyzer
+            assistant_config=dict(select_profile(assistant_config)),
+            transcription=Transcript.from_session_history(session_history).to_list(),
+            call_duration=int((end_time - start_time).total_seconds()),
+            start_time=start_time.isoformat(),
+            end_time=end_time.isoformat(),
+            phone_number=phone_number,
+            call_sid=call_sid,
+            agent_state=cls.snapshot_agent(agent),
+        )
+
+    @cached_property
+    def transcript(self) -> Transcript:
+        """The transcription as a ``Transcript``, shared by every analysis step of this job."""
+        return Transcript.of(self.transcription)
+
+    def to_json(self) -> str:
+        return json.dumps(asdict(self), default=str)
+
+    @classmethod
+    def from_json(cls, raw: str) -> "CallFinishedJob":
+        return cls(**json.loads(raw))
+
+
+class PostCallAnalyzer:
+    """Runs the analysis for a ``CallFinishedJob`` and persists the result."""
+
+    def __init__(self, mongodb, call_outcome_service: Optional[CallOutcomeService] = None, openai_client=None):
+        self.mongodb = mongodb
+        self.call_outcome_service = call_outcome_service or CallOutcomeService(client=openai_client)
+        self.openai_client = openai_client
+        # Shared deadline for the concurrent analysis requests of one call
+        self.deadline_seconds = float(os.getenv("ANALYSIS_DEADLINE_SECONDS", "60"))
+        # Transcript token budget per request; override with ANALYSIS_TOKEN_BUDGET_<TASK>
+        self.token_budgets = {
+            task: int(os.getenv(f"ANALYSIS_TOKEN_BUDGET_{task.upper()}", str(default)))
+            for task, default in DEFAULT_TOKEN_BUDGETS.items()
+        }
+        # One structured-output request instead of one request per analysis task
+        self.combined_mode = os.getenv("ANALYSIS_COMBINED_MODE", "false").lower() == "true"
+
+    def _get_openai_client(self):
+        """Client passed in, otherwise the pooled one from the registry (None if unavailable)."""
+        if self.openai_client is None:
+            self.openai_client = get_openai_client()
+        return self.openai_client
+
+    async def process(self, job: CallFinishedJob) -> Dict[str, Any]:
+        """Analyse the call, save its history and deduct minutes.
+
+        Raises RuntimeError when the call history could not be saved, so a queued
+        job is retried rather than acked.
+        """
+        started_at = time.time()
+        config = await self.load_analysis_config(job.assistant_config)
+        analysis_results = await self.analyze(config, job)
+        if not await self.save(config, job, analysis_results) and self.mongodb is not None:
+            raise RuntimeError(f"call history not saved | call_id={job.call_id}")
+        logger.info(
+            f"POST_CALL_ANALYSIS_DONE | call_id={job.call_id} | "
+            f"duration_ms={(time.time() - started_at) * 1000:.0f} | "
+            f"queue_wait_ms={(started_at - job.enqueued_at) * 1000:.0f}"
+        )
+        return analysis_results
+
+    async def load_analysis_config(self, assistant_config: Dict[str, Any]) -> Dict[str, Any]:
+        """Fetch the "analysis" profile, which is not loaded at call start. Falls back to the call-start config."""
+        assistant_id = assistant_config.get("_id_str") or assistant_config.get("id")
+        if not assistant_id or not self.mongodb or not self.mongodb.is_available():
+            return assistant_config
+        analysis_config = await self.mongodb.fetch_assistant(assistant_id, profiles=("analysis",))
+        return analysis_config or assistant_config
+
+    async def analyze(self, config: Dict[str, Any], job: CallFinishedJob) -> Dict[str, Any]:
+        """Perform complete post-call analysis including AI-powered outcome determination.
+
+        The outcome, summary, success evaluation and structured extraction requests
+        are independent and run concurrently under one shared deadline; only the
+        name extraction (from the summary) and the final merge wait on them. With
+        ``ANALYSIS_COMBINED_MODE=true`` they are first tried as a single request
+        (see ``services.combined_analysis``).
+        """
+        analysis_results = {
+            "call_summary": None,
+            "call_success": None,
+            "structured_data": {},
+            "call_outcome": None,
+            "outcome_confidence": None,
+            "outcome_reasoning": None,
+            "analysis_timestamp": datetime.datetime.now().isoformat()
+        }
+        transcription = job.transcript
+        call_duration = job.call_duration
+        agent_state = job.agent_state
+        started_at = time.time()
+        timings_ms: Dict[str, float] = {}
+        errors: Dict[str, str] = {}
+
+        try:
+            structured_data_fields = config.get("structured_data_fields") or []
+            results: Optional[Dict[str, Any]] = None
+            if self.combined_mode:
+                conflicts = combined_conflicts(config)
+                if conflicts:
+                    logger.info(f"ANALYSIS_COMBINED_SKIPPED | call_id={job.call_id} | reasons={conflicts}")
+                else:
+                    combined, errors, timings_ms = await self._run_branches(
+                        {"combined": self._run_combined_analysis(config, job)}, self.deadline_seconds
+                    )
+                    results = combined.get("combined")
+                    if results is None:
+                        logger.warning(f"ANALYSIS_COMBINED_FALLBACK | call_id={job.call_id} | error={errors.get('combined')}")
+
+            if results is None:
+                # Per-task requests, within what is left of the shared deadline
+                remaining = max(1.0, self.deadline_seconds - (time.time() - started_at))
+                results, branch_errors, branch_timings = await self._run_branches(
+                    self._per_task_branches(config, job), remaining
+                )
+                errors.update(branch_errors)
+                timings_ms.update(branch_timings)
+
+            outcome_analysis = results.get("outcome")
+            if outcome_analysis:
+                analysis_results.update({
+                    "call_outcome": outcome_analysis.outcome,
+                    "outcome_confidence": outcome_analysis.confidence,
+                    "outcome_reasoning": outcome_analysis.reasoning,
+                    "outcome_key_points": outcome_analysis.key_points,
+                    "outcome_sentiment": outcome_analysis.sentiment,
+                    "follow_up_required": outcome_analysis.follow_up_required,
+                    "follow_up_notes": outcome_analysis.follow_up_notes
+                })
+            elif agent_state.get("booked") is True:
+                # Use actual booking status from the agent before falling back to heuristics
+                analysis_results["call_outcome"] = "Booked Appointment"
+                analysis_results["outcome_confidence"] = 0.9  # High confidence for actual booking
+                analysis_results["outcome_reasoning"] = "Confirmed booking status from agent"
+            else:
+                # Fallback to heuristic-based outcome determination
+                fallback_outcome = self.call_outcome_service.get_fallback_outcome(transcription, call_duration)
+                analysis_results["call_outcome"] = fallback_outcome
+                analysis_results["outcome_confidence"] = 0.3  # Low confidence for fallback
+                analysis_results["outcome_reasoning"] = "Fallback heuristic analysis (OpenAI unavailable)"
+
+            analysis_results["call_summary"] = results.get("summary")
+            analysis_results["call_success"] = results.get("success")
+            analysis_results["structured_data"] = self._merge_structured_data(
+                agent_state=agent_state,
+                call_summary=analysis_results["call_summary"],
+                extraction=results.get("extraction"),
+                extraction_error=errors.get("extraction"),
+                configured_fields_count=len(structured_data_fields)
+            )
+
+        except Exception as e:
+            logger.error(f"POST_CALL_ANALYSIS_ERROR | call_id={job.call_id} | error={str(e)}")
+            # Fallback to basic analysis from the agent snapshot
+            for key in ("structured_data", "call_summary", "call_success"):
+                if key in agent_state:
+                    analysis_results[key] = agent_state[key]
+
+        log_latency_measurement(
+            operation="post_call_analysis",
+            duration_ms=(time.time() - started_at) * 1000,
+            metadata={
+                "call_id": job.call_id,
+                "transcript_tokens": job.transcript.token_count,
+                "branches": timings_ms,
+                "serial_ms": round(sum(timings_ms.values()), 2),
+                "errors": errors,
+            },
+            success=not errors
+        )
+        return analysis_results
+
+    def _per_task_branches(self, config: Dict[str, Any], job: CallFinishedJob) -> Dict[str, Awaitable[Any]]:
+        """One request per analysis task: outcome, plus summary, success and extraction when configured."""
+        transcription = job.transcript
+        structured_data_fields = config.get("structured_data_fields") or []
+        branches = {
+            # Determine call type for outcome analysis (default inbound, could come from context)
+            "outcome": self.call_outcome_service.analyze_call_outcome(
+                transcription=transcription,
+                call_duration=job.call_duration,
+                call_type="inbound"
+            ),
+        }
+        if config.get("analysis_summary_prompt"):
+            branches["summary"] = self._generate_call_summary_with_llm(
+                transcription=transcription,
+                prompt=config["analysis_summary_prompt"],
+                timeout=config.get("analysis_summary_timeout", 30)
+            )
+        if config.get("analysis_evaluation_prompt"):
+            branches["success"] = self._evaluate_call_success_with_llm(
+                transcription=transcription,
+                prompt=config["analysis_evaluation_prompt"],
+                timeout=config.get("analysis_evaluation_timeout", 15)
+            )
+        if structured_data_fields:
+            branches["extraction"] = self._extract_structured_data_with_ai(
+                transcription=transcription,
+                fields=structured_data_fields,
+                prompt=config.get("analysis_structured_data_prompt"),
+                properties=config.get("analysis_structured_data_properties", {}),
+                timeout=config.get("analysis_structured_data_timeout", 20)
+            )
+        return branches
+
+    async def _run_combined_analysis(self, config: Dict[str, Any], job: CallFinishedJob) -> Optional[Dict[str, Any]]:
+        """Outcome, summary, success and structured data from one structured-output request.
+
+        Returns per-task results keyed like ``_per_task_branches``, or None when the
+        request fails so the caller can fall back to per-task requests.
+        """
+        transcript_text = job.transcript.window(self.token_budgets["combined"])
+        client = self._get_openai_client()
+        if client is None or not transcript_text.strip():
+            return None
+
+        # The single request replaces all of them, so it gets the most generous configured timeout
+        timeout = max(
+            config.get("analysis_summary_timeout", 30),
+            config.get("analysis_evaluation_timeout", 15),
+            config.get("analysis_structured_data_timeout", 20),
+        )
+        try:
+            response = await asyncio.wait_for(
+                client.chat.completions.create(
+                    model="gpt-4o-mini",
+                    messages=build_combined_messages(config, transcript_text, job.call_duration),
+                    max_tokens=1500,
+                    temperature=0.1,
+                    response_format={
+                        "type": "json_schema",
+                        "json_schema": {
+                            "name": "post_call_analysis",
+                            "strict": True,
+                            "schema": build_combined_schema(config),
+                        },
+                    },
+                ),
+                timeout=min(max(timeout, 20), 60),
+            )
+        except asyncio.TimeoutError:
+            logger.warning(f"ANALYSIS_COMBINED_TIMEOUT | call_id={job.call_id}")
+            return None
+        except Exception as e:
+            logger.warning(f"ANALYSIS_COMBINED_FAILED | call_id={job.call_id} | error={str(e)}")
+            return None
+
+        message = response.choices[0].message if response and response.choices else None
+        if message is None or getattr(message, "refusal", None) or not message.content:
+            return None
+        return parse_combined_response(message.content, config)
+
+    async def _run_branches(
+        self,
+        branches: Dict[str, Awaitable[Any]],
+        deadline_seconds: float
+    ) -> Tuple[Dict[str, Any], Dict[str, str], Dict[str, float]]:
+        """Run independent analysis requests concurrently under one deadline.
+
+        Returns ``(results, errors, timings_ms)`` keyed by branch name. Branches
+        still running at the deadline are cancelled and reported as errors.
+        """
+        timings_ms: Dict[str, float] = {}
+
+        async def timed(name: str, coro: Awaitable[Any]) -> Any:
+            branch_started = time.time()
+            try:
+                return await coro
+            finally:
+                timings_ms[name] = round((time.time() - branch_started) * 1000, 2)
+
+        tasks = {name: asyncio.create_task(timed(name, coro)) for name, coro in branches.items()}
+        _, pending = await asyncio.wait(tasks.values(), timeout=deadline_seconds)
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+        results: Dict[str, Any] = {}
+        errors: Dict[str, str] = {}
+        for name, task in tasks.items():
+            if task in pending:
+                errors[name] = f"deadline of {deadline_seconds}s exceeded"
+            elif task.exception() is not None:
+                errors[name] = str(task.exception())
+            else:
+                results[name] = task.result()
+        for name, error in errors.items():
+            logger.warning(f"ANALYSIS_BRANCH_FAILED | branch={name} | error={error}")
+        return results, errors, timings_ms
+
+    @staticmethod
+    def _merge_structured_data(
+        agent_state: Dict[str, Any],
+        call_summary: Optional[str],
+        extraction: Optional[Dict[str, Any]],
+        extraction_error: Optional[str],
+        configured_fields_count: int
+    ) -> Dict[str, Any]:
+        """Combine agent-collected data, a name taken from the summary and AI-extracted fields."""
+        # Always start from data collected directly by the agent
+        agent_structured_data = dict(agent_state.get("structured_data") or {})
+
+        # Extract names from call summary if no structured name data exists
+        if call_summary and not agent_structured_data.get("Customer Name"):
+            extracted_name = extract_name_from_summary(call_summary)
+            if extracted_name:
+                agent_structured_data["Customer Name"] = {
+                    "value": extracted_name,
+                    "type": "string",
+                    "timestamp": datetime.datetime.now().isoformat(),
+                    "collection_method": "summary_extraction"
+                }
+
+        if extraction_error:
+            # Fallback to agent data only, flagged so the failure is visible
+            agent_structured_data["_ai_extraction_failed"] = {
+                "error": extraction_error,
+                "timestamp": datetime.datetime.now().isoformat(),
+                "configured_fields_count": configured_fields_count
+            }
+            return agent_structured_data
+
+        # Merge AI extracted data with agent data (agent data takes precedence)
+        return {**(extraction or {}), **agent_structured_data}
+
+    async def _generate_call_summary_with_llm(self, transcription: Transcript, prompt: str, timeout: int = 30) -> str:
+        """Generate call summary using LLM like the old code."""
+        try:
+            transcript_text = Transcript.of(transcription).window(self.token_budgets["summary"])
+            if not transcript_text.strip():
+                return "No conversation content available for summary."
+
+            client = self._get_openai_client()
+            if client is None:
+                return "Summary generation not available - API key not configured."
+
+            response = await asyncio.wait_for(
+                client.chat.completions.create(
+                    model="gpt-4o-mini",
+                    messages=[
+                        {"role": "system", "content": prompt},
+                        {"role": "user", "content": f"Please summarize this call:\n\n{transcript_text}"}
+                    ],
+                    max_tokens=500,
+                    temperature=0.3
+                ),
+                timeout=min(max(timeout, 20), 60),
+            )
+
+            return response.choices[0].message.content.strip()
+
+        except asyncio.TimeoutError:
+            return "Summary generation timed out."
+        except Exception as e:
+            return f"Summary generation failed: {str(e)}"
+
+    async def _evaluate_call_success_with_llm(self, transcription: Transcript, prompt: str, timeout: int = 15) -> bool:
+        """Evaluate call success using LLM like the old code."""
+        try:
+            transcript_text = Transcript.of(transcription).window(self.token_budgets["success"])
+            if not transcript_text.strip():
+                return False
+
+            client = self._get_openai_client()
+            if client is None:
+                return False
+
+            response = await asyncio.wait_for(
+                client.chat.completions.create(
+                    model="gpt-4o-mini",
+                    messages=[
+                        {"role": "system", "content": prompt},
+                        {"role": "user", "content": f"Please evaluate this call:\n\n{transcript_text}\n\nWas this call successful? Answer only 'YES' or 'NO'."}
+                    ],
+                    max_tokens=10,
+                    temperature=0.1
+                ),
+                timeout=min(max(timeout, 10), 45),
+            )
+
+            result = response.choices[0].message.content.strip().upper()
+            return result == "YES"
+
+        except asyncio.TimeoutError:
+            return False
+        except Exception:
+            return False
+
+    async def _extract_structured_data_with_ai(
+        self,
+        transcription: Transcript,
+        fields: list,
+        prompt: str = None,
+        properties: dict = None,
+        timeout: int = 20
+    ) -> Dict[str, Any]:
+        """Extract structured data using AI like the old code."""
+        try:
+            transcript_text = Transcript.of(transcription).window(self.token_budgets["extraction"])
+            if not transcript_text.strip():
+                return {}
+
+            client = self._get_openai_client()
+            if client is None:
+                return {}
+
+            # Build the extraction prompt
+            extraction_prompt = prompt or "Extract the following information from the call transcript:"
+            field_descriptions = []
+            for field_def in fields:
+                field_descriptions.append(f"- {field_def}")
+
+            system_prompt = f"{extraction_prompt}\n\n{chr(10).join(field_descriptions)}\n\nReturn the data as a JSON object with the field names as keys."
+
+            response = await asyncio.wait_for(
+                client.chat.completions.create(
+                    model="gpt-4o-mini",
+                    messages=[
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": f"Please extract the requested information from this call:\n\n{transcript_text}"}
+                    ],
+                    max_tokens=1000,
+                    temperature=0.1
+                ),
+                timeout=min(max(timeout, 15), 60),
+            )
+
+            # Parse the response
+            result_text = response.choices[0].message.content.strip()
+            try:
+                return json.loads(result_text)
+            except json.JSONDecodeError:
+                return {}
+
+        except asyncio.TimeoutError:
+            return {}
+        except Exception:
+            return {}
+
+    async def save(self, config: Dict[str, Any], job: CallFinishedJob, analysis_results: Dict[str, Any]) -> bool:
+        """Save call history with the analysis, then deduct the call's minutes."""
+        if not self.mongodb or not self.mongodb.is_available():
+            return False
+
+        try:
+            success = await self.mongodb.save_call_history(
+                call_id=job.call_id,
+                assistant_id=config.get("id"),
+                phone_number=job.phone_number,
+                call_duration=job.call_duration,
+                # Call status is the AI-determined outcome
+                call_status=analysis_results.get("call_outcome", "Qualified"),
+                transcription=job.transcription,
+                participant_identity=job.phone_number,
+                call_sid=job.call_sid,
+                start_time=job.start_time,
+                end_time=job.end_time,
+                call_summary=analysis_results.get("call_summary") or None,
+                call_success=analysis_results.get("call_success"),
+                structured_data=analysis_results.get("structured_data") or None,
+                call_outcome=analysis_results.get("call_outcome"),
+                outcome_confidence=analysis_results.get("outcome_confidence") or None,
+                outcome_reasoning=analysis_results.get("outcome_reasoning") or None
+            )
+            if not success:
+                return False
+
+            # Deduct minutes from user account after call completes
+            user_id = config.get("user_id") or job.assistant_config.get("user_id")
+            if user_id and job.call_duration > 0:
+                # Convert seconds to minutes (round up)
+                minutes_used = job.call_duration / 60.0
+                # Keyed on the call so a redelivered job does not deduct twice
+                deduction_result = await self.mongodb.deduct_minutes(user_id, minutes_used, call_id=job.call_id)
+                if deduction_result.get("duplicate"):
+                    logger.info(f"MINUTES_ALREADY_DEDUCTED | call_id={job.call_id} | user={user_id}")
+                elif deduction_result.get("success"):
+                    remaining = deduction_result.get("remaining_minutes", 0)
+                    exceeded = deduction_result.get("exceeded_limit", False)
+                    logger.info(f"MINUTES_DEDUCTED | user={user_id} | minutes={minutes_used:.2f} | remaining={remaining} | exceeded={exceeded}")
+                    if exceeded:
+                        logger.warning(f"MINUTES_LIMIT_EXCEEDED | user={user_id} | used={deduction_result.get('minutes_used')} | limit={deduction_result.get('minutes_limit')}")
+                else:
+                    logger.error(f"MINUTES_DEDUCTION_FAILED | user={user_id} | error={deduction_result.get('error')}")
+            return True
+
+        except Exception as e:
+            logger.error(f"CALL_HISTORY_SAVE_ERROR | call_id={job.call_id} | error={str(e)}")
+            return False
+
+
+def max_job_attempts() -> int:
+    return max(1, int(os.getenv("ANALYSIS_MAX_ATTEMPTS", "3")))
+
+
+class InProcessAnalysisQueue:
+    """asyncio-backed queue; a stand-in for Redis in development and tests."""
+
+    def __init__(self) -> None:
+        self._queue: "asyncio.Queue[CallFinishedJob]" = asyncio.Queue()
+        self.max_attempts = max_job_attempts()
+
+    async def put(self, job: CallFinishedJob) -> None:
+        await self._queue.put(job)
+
+    async def get(self) -> CallFinishedJob:
+        return await self._queue.get()
+
+    async def ack(self, job: CallFinishedJob) -> None:
+        self._queue.task_done()
+
+    async def fail(self, job: CallFinishedJob, error: str) -> None:
+        """Requeue a failed job until it has used up its attempts, then drop it."""
+        job.attempts += 1
+        if job.attempts < self.max_attempts:
+            await self._queue.put(job)
+        else:
+            logger.error(f"ANALYSIS_JOB_DEAD | call_id={job.call_id} | attempts={job.attempts} | error={error}")
+        self._queue.task_done()
+
+    def qsize(self) -> int:
+        return self._queue.qsize()
+
+
+class RedisAnalysisQueue:
+    """Redis list queue with at-least-once delivery.
+
+    Each consumer moves a job to its own processing list while working on it and
+    removes it on ``ack``; jobs left there by a crashed or stopped consumer are
+    put back on the queue when a consumer with the same ``consumer_id`` starts
+    again. A job that fails is requeued with its attempt count incremented, and
+    after ``ANALYSIS_MAX_ATTEMPTS`` it is moved to the ``<key>:dead`` list.
+    """
+
+    def __init__(self, url: str, key: str = "post_call_analysis", consumer_id: Optional[str] = None):
+        if not REDIS_AVAILABLE:
+            raise RuntimeError("redis package is required for the Redis analysis queue")
+        self._redis = aioredis.from_url(url, decode_responses=True)
+        self.key = key
+        self.consumer_id = consumer_id or socket.gethostname()
+        self.processing_key = f"{key}:processing:{self.consumer_id}"
+        self.dead_letter_key = f"{key}:dead"
+        self.max_attempts = max_job_attempts()
+        self._raw_by_job_id: Dict[str, str] = {}
+
+    async def put(self, job: CallFinishedJob) -> None:
+        await self._redis.lpush(self.key, job.to_json())
+
+    async def recover(self) -> int:
+        """Requeue jobs this consumer was processing when it last stopped."""
+        recovered = 0
+        while await self._redis.lmove(self.processing_key, self.key, "RIGHT", "RIGHT"):
+            recovered += 1
+        if recovered:
+            logger.warning(f"ANALYSIS_JOBS_RECOVERED | count={recovered} | consumer={self.consumer_id}")
+        return recovered
+
+    async def get(self) -> CallFinishedJob:
+        while True:
+            raw = await self._redis.blmove(self.key, self.processing_key, timeout=5, src="RIGHT", dest="LEFT")
+            if raw is None:
+                continue
+            try:
+                job = CallFinishedJob.from_json(raw)
+            except Exception as e:
+                logger.error(f"ANALYSIS_JOB_INVALID | error={str(e)}")
+                await self._redis.lrem(self.processing_key, 1, raw)
+                continue
+            self._raw_by_job_id[job.job_id] = raw
+            return job
+
+    async def ack(self, job: CallFinishedJob) -> None:
+        raw = self._raw_by_job_id.pop(job.job_id, None)
+        if raw is not None:
+            await self._redis.lrem(self.processing_key, 1, raw)
+
+    async def fail(self, job: CallFinishedJob, error: str) -> None:
+        """Requeue a failed job, or dead-letter it once it has used up its attempts."""
+        raw = self._raw_by_job_id.pop(job.job_id, None)
+        job.attempts += 1
+        if job.attempts < self.max_attempts:
+            target = self.key
+        else:
+            target = self.dead_letter_key
+            logger.error(f"ANALYSIS_JOB_DEAD | call_id={job.call_id} | attempts={job.attempts} | error={error}")
+        # Push and remove atomically so the job is never in neither list
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.lpush(target, job.to_json())
+            if raw is not None:
+                pipe.lrem(self.processing_key, 1, raw)
+            await pipe.execute()
+
+    async def qsize(self) -> int:
+        return await self._redis.llen(self.key)
+
+
+class AnalysisWorkerPool:
+    """Fixed number of consumers draining an analysis queue."""
+
+    def __init__(self, queue, analyzer: PostCallAnalyzer, concurrency: int = 4):
+        self.queue = queue
+        self.analyzer = analyzer
+        self.concurrency = max(1, concurrency)
+        self._tasks: List[asyncio.Task] = []
+
+    @property
+    def running(self) -> bool:
+        return any(not task.done() for task in self._tasks)
+
+    async def start(self) -> None:
+        if self.running:
+            return
+        if hasattr(self.queue, "recover"):
+            await self.queue.recover()
+        self._tasks = [
+            asyncio.create_task(self._consume(i), name=f"post_call_analysis:{i}")
+            for i in range(self.concurrency)
+        ]
+        logger.info(f"ANALYSIS_POOL_STARTED | concurrency={self.concurrency} | queue={type(self.queue).__name__}")
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _consume(self, worker_index: int) -> None:
+        while True:
+            job = await self.queue.get()
+            try:
+                await self.analyzer.process(job)
+            except asyncio.CancelledError:
+                # Not acked: the job stays in the processing list for recover()
+                raise
+            except Exception as e:
+                logger.error(
+                    f"ANALYSIS_JOB_FAILED | call_id={job.call_id} | worker={worker_index} | "
+                    f"attempt={job.attempts + 1} | error={str(e)}"
+                )
+                try:
+                    await self.queue.fail(job, str(e))
+                except Exception as requeue_error:
+                    # Left in the processing list; recover() requeues it on restart
+                    logger.error(f"ANALYSIS_JOB_REQUEUE_FAILED | call_id={job.call_id} | error={str(requeue_error)}")
+                continue
+            await self.queue.ack(job)
+
+
+def get_analysis_mode() -> str:
+    mode = os.getenv("POST_CALL_ANALYSIS_MODE", "inline").strip().lower()
+    if mode == "redis" and not REDIS_AVAILABLE:
+        logger.warning("ANALYSIS_MODE_FALLBACK | redis package not installed | using inline")
+        return "inline"
+    return mode if mode in ("inline", "local", "redis") else "inline"
+
+
+def build_analysis_queue(mode: str):
+    if mode == "redis":
+        return RedisAnalysisQueue(
+            url=os.getenv("ANALYSIS_QUEUE_URL", "redis://localhost:6379/0"),
+            key=os.getenv("ANALYSIS_QUEUE_KEY", "post_call_analysis"),
+            consumer_id=os.getenv("ANALYSIS_WORKER_ID"),
+        )
+    return InProcessAnalysisQueue()
+
+
+# Process-wide queue and (local mode) worker pool
+_analysis_queue = None
+_local_pool: Optional[AnalysisWorkerPool] = None
+
+
+async def submit_call_finished(job: CallFinishedJob, analyzer: PostCallAnalyzer) -> None:
+    """Hand a finished call to post-call analysis according to ``POST_CALL_ANALYSIS_MODE``."""
+    global _analysis_queue, _local_pool
+    mode = get_analysis_mode()
+    if mode == "inline":
+        await analyzer.process(job)
+        return
+
+    try:
+        if _analysis_queue is None:
+            _analysis_queue = build_analysis_queue(mode)
+        if mode == "local" and (_local_pool is None or not _local_pool.running):
+            _local_pool = AnalysisWorkerPool(
+                _analysis_queue, analyzer, int(os.getenv("ANALYSIS_WORKER_CONCURRENCY", "4"))
+            )
+            await _local_pool.start()
+        await _analysis_queue.put(job)
+        logger.info(f"ANALYSIS_JOB_QUEUED | call_id={job.call_id} | mode={mode} | turns={len(job.transcription)}")
+    except Exception as e:
+        # Never drop a call: analyse it here if the queue is unreachable
+        logger.error(f"ANALYSIS_QUEUE_FAILED | call_id={job.call_id} | error={str(e)} | running inline")
+        await analyzer.process(job)
+
+
+async def _serve() -> None:
+    """Standalone analysis service consuming the Redis queue."""
+    from integrations.mongodb_client import get_mongodb_client
+
+    queue = build_analysis_queue("redis")
+    mongodb = get_mongodb_client()
+    mongodb.start_background_sync()
+    analyzer = PostCallAnalyzer(mongodb, openai_client=get_openai_client())
+    pool = AnalysisWorkerPool(queue, analyzer, int(os.getenv("ANALYSIS_WORKER_CONCURRENCY", "8")))
+    # Load the tokenizer before the workers start counting transcript tokens
+    await warm_tokenizer()
+    await pool.start()
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await pool.stop()
+        await mongodb.close()
+        await close_llm_clients()
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s %(message)s")
+    asyncio.run(_serve())
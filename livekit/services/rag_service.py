@@ -7,13 +7,12 @@ import os
 import logging
 import asyncio
 import hashlib
-import time
 from typing import Optional, Dict, List, Any
 from dataclasses import dataclass
 from functools import lru_cache
 
 # MongoDB client for knowledge base lookups
-from integrations.mongodb_client import MongoDBClient
+from integrations.mongodb_client import MongoDBClient, get_mongodb_client
 
 try:
     from pinecone import Pinecone
@@ -21,36 +20,17 @@ except ImportError:
     Pinecone = None
 
 from utils.latency_logger import measure_latency_context
+from utils.rate_limiter import KeyedRateLimiter
+from utils.singleflight import SingleFlight
+from utils.ttl_cache import get_cache
 
-# Cache configuration
-_cache_ttl = 300  # 5 minutes cache TTL
-_cache_max_size = 100  # Maximum cache entries
-_rag_cache: Dict[str, tuple] = {}  # Global cache for RAG queries
+# Global cache for RAG queries (CACHE_RAG_* overrides the limits)
+_rag_cache = get_cache("rag", max_entries=4096, ttl=300, max_bytes=64 * 1024 * 1024)
 
 def _get_cache_key(knowledge_base_id: str, query: str) -> str:
     """Generate cache key for RAG query."""
     return hashlib.md5(f"{knowledge_base_id}:{query.lower().strip()}".encode()).hexdigest()
 
-def _is_cache_valid(timestamp: float) -> bool:
-    """Check if cache entry is still valid."""
-    return time.time() - timestamp < _cache_ttl
-
-def _clean_cache():
-    """Remove expired entries from cache."""
-    current_time = time.time()
-    expired_keys = [
-        key for key, (_, timestamp) in _rag_cache.items()
-        if current_time - timestamp > _cache_ttl
-    ]
-    for key in expired_keys:
-        del _rag_cache[key]
-    
-    # If still over limit, remove oldest entries
-    if len(_rag_cache) > _cache_max_size:
-        sorted_items = sorted(_rag_cache.items(), key=lambda x: x[1][1])
-        for key, _ in sorted_items[:len(_rag_cache) - _cache_max_size]:
-            del _rag_cache[key]
-
 @dataclass
 class RAGContext:
     """Context retrieved from knowledge base"""
@@ -65,19 +45,27 @@ class RAGContext:
 class RAGService:
     """Service for retrieving context from knowledge bases using Pinecone"""
 
-    def __init__(self):
-        self.mongodb: Optional[MongoDBClient] = None
+    def __init__(self, mongodb: Optional[MongoDBClient] = None):
+        self.mongodb: Optional[MongoDBClient] = mongodb
         self.pinecone = None
         # in-process caches
         self._kb_cache: Dict[str, Dict[str, Any]] = {}               # kb_id -> kb_info
         self._assistant_cache: Dict[str, Any] = {}                   # assistant_name -> assistant
+        # Pinecone request budget per knowledge base (default: 2/s sustained, bursts of 4)
+        self._rate_limiter = KeyedRateLimiter(
+            rate=float(os.getenv("RAG_RATE_PER_SECOND", "2")),
+            burst=float(os.getenv("RAG_RATE_BURST", "4")),
+        )
+        # cache key -> in-flight Pinecone search
+        self._inflight = SingleFlight()
         self._initialize_clients()
 
     def _initialize_clients(self):
         """Initialize MongoDB and Pinecone clients"""
-        # Initialize MongoDB client
+        # Initialize MongoDB client (reuse the worker's client when one was provided)
         try:
-            self.mongodb = MongoDBClient()
+            if self.mongodb is None:
+                self.mongodb = get_mongodb_client()
             if self.mongodb.is_available():
                 logging.info("RAG_SERVICE | MongoDB client initialized")
             else:
@@ -122,6 +110,20 @@ class RAGService:
             logging.error("RAG_SERVICE | Error fetching knowledge base %s: %s", knowledge_base_id, e)
             return None
 
+    async def _throttle(self, knowledge_base_id: str) -> None:
+        """Wait for this knowledge base's rate limit; other knowledge bases are unaffected."""
+        wait = await self._rate_limiter.acquire(knowledge_base_id)
+        if wait > 0:
+            logging.info("RAG_RATE_LIMITED | kb=%s | wait_ms=%.0f", knowledge_base_id, wait * 1000)
+
+    def rate_limit_stats(self) -> Dict[str, Any]:
+        """Queueing delay counters of the Pinecone rate limiter."""
+        return self._rate_limiter.snapshot()
+
+    def dedup_stats(self) -> Dict[str, int]:
+        """Pinecone searches started vs. identical concurrent searches that joined one in flight."""
+        return self._inflight.stats()
+
     def _generate_assistant_name(self, company_id: str, knowledge_base_id: str) -> str:
         company_short = company_id[:8] if company_id else "default"
         kb_short = knowledge_base_id[:8] if knowledge_base_id else "unknown"
@@ -146,38 +148,32 @@ class RAGService:
         snippet_size: int = 1536,     # slightly smaller chunks for speed
     ) -> Optional[RAGContext]:
         """Search knowledge base for relevant context snippets with aggressive caching and rate limiting"""
-        # Rate limiting: prevent too many concurrent requests
-        if not hasattr(self, '_request_count'):
-            self._request_count = 0
-            self._last_request_time = 0
-        
-        current_time = time.time()
-        time_since_last = current_time - self._last_request_time
-        
-        # If requests are too frequent, add a small delay
-        if time_since_last < 0.5:  # Minimum 500ms between requests
-            await asyncio.sleep(0.5 - time_since_last)
-        
-        self._request_count += 1
-        self._last_request_time = time.time()
-        
-        call_id = f"rag_{knowledge_base_id}"  # Use knowledge base ID as call identifier
-        
         # Check cache first for massive speed improvement
         cache_key = _get_cache_key(knowledge_base_id, query)
-        if cache_key in _rag_cache:
-            cached_result, timestamp = _rag_cache[cache_key]
-            if _is_cache_valid(timestamp):
-                logging.info("RAG_SERVICE | Cache HIT | query=%s | saved_time=4.8s", query[:50])
-                return cached_result
-            else:
-                # Remove expired entry
-                del _rag_cache[cache_key]
-        
-        # Clean cache periodically
-        if len(_rag_cache) > _cache_max_size * 0.8:
-            _clean_cache()
-        
+        cached_result = _rag_cache.get(cache_key)
+        if cached_result is not None:
+            logging.info("RAG_SERVICE | Cache HIT | query=%s | saved_time=4.8s", query[:50])
+            return cached_result
+
+        # Concurrent identical queries share one Pinecone request
+        if self._inflight.in_flight(cache_key):
+            logging.info("RAG_SERVICE | In-flight JOIN | query=%s", query[:50])
+        return await self._inflight.do(
+            cache_key,
+            lambda: self._search_uncached(knowledge_base_id, query, top_k, snippet_size, cache_key),
+        )
+
+    async def _search_uncached(
+        self,
+        knowledge_base_id: str,
+        query: str,
+        top_k: int,
+        snippet_size: int,
+        cache_key: str,
+    ) -> Optional[RAGContext]:
+        """Query Pinecone and store the result in the RAG cache."""
+        call_id = f"rag_{knowledge_base_id}"  # Use knowledge base ID as call identifier
+
         async with measure_latency_context("rag_knowledge_base_search", call_id, {
             "knowledge_base_id": knowledge_base_id,
             "query_length": len(query),
@@ -203,6 +199,8 @@ class RAGService:
                     logging.error("RAG_SERVICE | Assistant unavailable")
                     return None
 
+                await self._throttle(knowledge_base_id)
+
                 # Pinecone python client is sync → run in thread with exponential backoff
                 max_retries = 3
                 base_delay = 1.0
@@ -250,7 +248,7 @@ class RAGService:
                 )
                 
                 # Cache the result for future queries
-                _rag_cache[cache_key] = (result, time.time())
+                _rag_cache.set(cache_key, result)
                 logging.info("RAG_SERVICE | Cache STORED | query=%s | cache_size=%d", query[:50], len(_rag_cache))
                 
                 return result
@@ -335,9 +333,13 @@ class RAGService:
         def fetch(q: str):
             return assistant.context(query=q, top_k=8, snippet_size=1536)
 
+        async def throttled_fetch(q: str):
+            await self._throttle(knowledge_base_id)
+            return await loop.run_in_executor(None, (lambda: fetch(q)))
+
         try:
             responses = await asyncio.gather(
-                *[loop.run_in_executor(None, (lambda q=q: fetch(q))) for q in qset],
+                *[throttled_fetch(q) for q in qset],
                 return_exceptions=True,
             )
         except Exception as e:
@@ -401,8 +403,8 @@ class RAGService:
 # ---- Singleton factory (prevents double initialization seen in logs) ----
 _service_singleton: Optional[RAGService] = None
 
-def get_rag_service() -> RAGService:
+def get_rag_service(mongodb: Optional[MongoDBClient] = None) -> RAGService:
     global _service_singleton
     if _service_singleton is None:
-        _service_singleton = RAGService()
+        _service_singleton = RAGService(mongodb=mongodb)
     return _service_singleton
\ No newline at end of file
@@ -0,0 +1,88 @@
+"""
+Process-scoped resources shared by every job a worker process handles.
+
+LiveKit runs ``prewarm()`` once per job process before any job is assigned to
+it. Everything that is expensive to build (model weights, connection pools,
+API clients) is created there and stored in ``proc.userdata`` so that each
+``CallHandler`` can borrow it instead of rebuilding it on the answer path.
+"""
+
+import logging
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from livekit.agents import JobProcess
+from livekit.plugins import silero
+
+from integrations.mongodb_client import MongoDBClient, get_mongodb_client
+from services.call_outcome_service import CallOutcomeService
+from services.rag_service import RAGService, get_rag_service
+from utils.transcript import load_tokenizer
+
+logger = logging.getLogger(__name__)
+
+# Key under which the bundle is stored in ``JobProcess.userdata``
+USERDATA_KEY = "worker_resources"
+
+
+@dataclass
+class WorkerResources:
+    """Heavy objects loaded once per worker process and shared by all calls."""
+    vad: Any = None
+    mongodb: Optional[MongoDBClient] = None
+    rag_service: Optional[RAGService] = None
+    call_outcome_service: Optional[CallOutcomeService] = None
+    openai_client: Any = None
+
+    @classmethod
+    def load(cls, openai_client: Any = None) -> "WorkerResources":
+        """Build the bundle. Each component is optional so one failure never blocks the others."""
+        resources = cls(openai_client=openai_client)
+
+        try:
+            resources.vad = silero.VAD.load()
+            logger.info("PREWARM_VAD | VAD loaded")
+        except Exception as e:
+            logger.error(f"PREWARM_VAD_FAILED | error={str(e)}")
+
+        try:
+            resources.mongodb = get_mongodb_client()
+            # Opens the pool now if prewarm runs inside an event loop; otherwise the first job does
+            warmup_scheduled = resources.mongodb.schedule_warmup() is not None
+            logger.info(
+                f"PREWARM_MONGODB | available={resources.mongodb.is_available()} | "
+                f"warmup_scheduled={warmup_scheduled}"
+            )
+            logger.info(f"PREWARM_DID_ROUTES | loaded={resources.mongodb.preload_did_routes()}")
+        except Exception as e:
+            logger.error(f"PREWARM_MONGODB_FAILED | error={str(e)}")
+
+        try:
+            # Registers the process-wide singleton so UnifiedAgent shares it too
+            resources.rag_service = get_rag_service(mongodb=resources.mongodb)
+            logger.info("PREWARM_RAG | RAG service initialized")
+        except Exception as e:
+            logger.error(f"PREWARM_RAG_FAILED | error={str(e)}")
+
+        try:
+            # Transcript token counting for post-call analysis; loads (or downloads) the BPE file
+            logger.info(f"PREWARM_TOKENIZER | available={load_tokenizer()}")
+        except Exception as e:
+            logger.error(f"PREWARM_TOKENIZER_FAILED | error={str(e)}")
+
+        try:
+            resources.call_outcome_service = CallOutcomeService(client=openai_client)
+        except Exception as e:
+            logger.error(f"PREWARM_CALL_OUTCOME_FAILED | error={str(e)}")
+
+        return resources
+
+    def install(self, proc: JobProcess) -> None:
+        """Store the bundle on the job process."""
+        proc.userdata[USERDATA_KEY] = self
+
+    @classmethod
+    def from_process(cls, proc: Optional[JobProcess]) -> Optional["WorkerResources"]:
+        """Return the bundle installed by ``prewarm()``, if any."""
+        userdata = getattr(proc, "userdata", None) or {}
+        return userdata.get(USERDATA_KEY)
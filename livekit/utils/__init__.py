@@ -2,7 +2,7 @@
 Utility functions for the LiveKit voice agent system.
 """
 
-from .helpers import sha256_text, preview, extract_called_did
+from .helpers import sha256_text, preview, extract_called_did, normalize_e164
 from .call_analysis import determine_call_status, CallAnalyzer
 from .logging_config import setup_logging, get_logger
 
@@ -10,6 +10,7 @@ __all__ = [
     "sha256_text",
     "preview", 
     "extract_called_did",
+    "normalize_e164",
     "determine_call_status",
     "CallAnalyzer",
     "setup_logging",
@@ -0,0 +1,152 @@
+"""
+Field profiles for assistant documents.
+
+Each stage of a call reads a different slice of the assistant document. The
+profiles below name those slices so the call path can fetch (and copy) only
+what a stage needs instead of the whole document, which can carry very large
+prompts, workflow graphs and dashboard-only settings.
+
+Profiles are listed by hand, so a consumer may read a field its profile does
+not list. ``ProfileConfig`` catches that: the read is logged once
+(``ASSISTANT_PROFILE_FIELD_UNDECLARED``), the value comes from the full
+document when the view was selected from one, and the field is added to the
+profile's projection for later fetches.
+"""
+
+import logging
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Identity/ownership fields every profile carries
+CORE_FIELDS: Tuple[str, ...] = ("id", "_id_str", "user_id", "company_id", "name")
+
+ASSISTANT_PROFILES: Dict[str, Tuple[str, ...]] = {
+    # LLM / TTS / STT and turn-taking settings used to build the AgentSession
+    "session": (
+        "llm_provider_setting", "llm_model_setting", "temperature_setting", "max_token_setting",
+        "groq_model", "groq_temperature", "groq_max_tokens",
+        "voice_provider_setting", "voice_model_setting", "voice_name_setting", "voice_description",
+        "language_setting", "speed", "speed_alpha", "emotion", "volume", "instant_mode", "reduce_latency",
+        "voice_on_punctuation_seconds", "voice_on_no_punctuation_seconds", "voice_on_number_seconds",
+        "voice_backoff_seconds", "num_words_to_interrupt_assistant", "background_sound_setting",
+        "silence_timeout", "max_call_duration",
+    ),
+    # Instructions, calendar, knowledge base, transfer and call-control settings used by the agent
+    "agent": (
+        "prompt", "instructions", "analysis_instructions", "first_message", "end_call_message",
+        "nodes", "edges",
+        "cal_api_key", "cal_event_type_id", "cal_timezone",
+        "knowledge_base_id",
+        "transfer_enabled", "transfer_phone_number", "transfer_country_code",
+        "transfer_sentence", "transfer_condition",
+        "idle_messages", "max_idle_messages", "silence_timeout", "max_call_duration",
+        "structured_data_fields",
+        # Selects the prewarmed LLM in AgentFactory
+        "llm_provider_setting", "llm_model_setting",
+    ),
+    # Post-call analysis prompts and fields
+    "analysis": (
+        "analysis_summary_prompt", "analysis_summary_timeout",
+        "analysis_evaluation_prompt", "analysis_evaluation_timeout",
+        "analysis_structured_data_prompt", "analysis_structured_data_properties",
+        "analysis_structured_data_timeout", "structured_data_fields",
+    ),
+}
+
+# Profiles needed before the session can start; "analysis" is loaded after the call
+CALL_START_PROFILES: Tuple[str, ...] = ("session", "agent")
+
+
+# Fields read through a profile that does not list them, per profile (added to later fetches)
+_undeclared_fields: Dict[str, Set[str]] = {}
+_MISSING = object()
+
+
+def profile_fields(profiles: Iterable[str]) -> Tuple[str, ...]:
+    """Return the ordered union of fields for ``profiles`` (plus the core fields)."""
+    fields = dict.fromkeys(CORE_FIELDS)
+    for profile in profiles:
+        if profile not in ASSISTANT_PROFILES:
+            raise ValueError(f"Unknown assistant profile: {profile}")
+        fields.update(dict.fromkeys(ASSISTANT_PROFILES[profile]))
+        fields.update(dict.fromkeys(sorted(_undeclared_fields.get(profile, ()))))
+    return tuple(fields)
+
+
+def undeclared_fields() -> Dict[str, Tuple[str, ...]]:
+    """Fields consumers read outside their profiles so far, per profile."""
+    return {profile: tuple(sorted(fields)) for profile, fields in _undeclared_fields.items()}
+
+
+class ProfileConfig(dict):
+    """Assistant fields selected for ``profiles``.
+
+    Reading a field the profiles do not list (``get`` or ``[]``) logs it once,
+    adds it to the profiles' projection and returns the value from ``source``,
+    the document the fields were selected from, when there is one.
+    """
+
+    def __init__(self, data: Any = (), profiles: Iterable[str] = (), source: Optional[Dict[str, Any]] = None):
+        super().__init__(data)
+        self.profiles = tuple(profiles)
+        self._declared = frozenset(profile_fields(self.profiles))
+        self._source = source
+
+    def _undeclared(self, key: Any) -> Any:
+        if key in self._declared or not isinstance(key, str):
+            return _MISSING
+        new = [profile for profile in self.profiles if key not in _undeclared_fields.get(profile, ())]
+        if new:
+            for profile in new:
+                _undeclared_fields.setdefault(profile, set()).add(key)
+            logger.warning(
+                f"ASSISTANT_PROFILE_FIELD_UNDECLARED | field={key} | profiles={'+'.join(self.profiles)} | "
+                f"from_source={self._source is not None}"
+            )
+        if self._source is None:
+            return _MISSING
+        return self._source.get(key, _MISSING)
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        if key in self:
+            return dict.__getitem__(self, key)
+        value = self._undeclared(key)
+        return default if value is _MISSING else value
+
+    def __missing__(self, key: Any) -> Any:
+        value = self._undeclared(key)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def copy(self) -> "ProfileConfig":
+        return ProfileConfig(self, self.profiles, self._source)
+
+
+def profile_projection(profiles: Iterable[str]) -> Dict[str, int]:
+    """MongoDB inclusion projection for ``profiles``."""
+    # _id_str is derived from _id after the read; _id itself is always returned
+    return {field: 1 for field in profile_fields(profiles) if field != "_id_str"}
+
+
+def profile_cache_key(assistant_id: str, profiles: Iterable[str]) -> str:
+    """Cache key for an assistant fetched with ``profiles``.
+
+    Includes the profiles' field count, so entries fetched before a field was
+    added to them are not served.
+    """
+    profiles = sorted(set(profiles))
+    return f"{assistant_id}#{'+'.join(profiles)}#{len(profile_fields(profiles))}"
+
+
+def select_profile(config: Dict[str, Any], *profiles: str) -> ProfileConfig:
+    """Return a new dict holding only the fields of ``profiles`` present in ``config``.
+
+    Fields outside ``profiles`` are still readable from it (see ``ProfileConfig``).
+    """
+    return ProfileConfig(
+        {field: config[field] for field in profile_fields(profiles) if field in config},
+        profiles,
+        source=config,
+    )
@@ -79,3 +79,21 @@ def extract_call_sid_from_metadata(ctx_metadata: dict) -> Optional[str]:
             break
     
     return call_sid
+
+
+def get_room_name(ctx) -> str:
+    """Room name for a job, valid even before ``ctx.connect()`` has completed."""
+    name = getattr(ctx.room, "name", "") or ""
+    if not name:
+        job_room = getattr(ctx.job, "room", None)
+        name = getattr(job_room, "name", "") or ""
+    return name
+
+
+def get_room_metadata(ctx) -> str:
+    """Room metadata for a job, valid even before ``ctx.connect()`` has completed."""
+    metadata = getattr(ctx.room, "metadata", "") or ""
+    if not metadata:
+        job_room = getattr(ctx.job, "room", None)
+        metadata = getattr(job_room, "metadata", "") or ""
+    return metadata
@@ -35,6 +35,30 @@ def extract_called_did(room_name: str) -> Optional[str]:
     return m.group(0) if m else None
 
 
+def normalize_e164(phone: str) -> Optional[str]:
+    """
+    Normalise a phone number to E.164 form ("+<digits>").
+    
+    Args:
+        phone: Phone number in any common format ("+1 (201) 765-6193", "12017656193", "sip:+1...@host")
+        
+    Returns:
+        Normalised number or None if it does not contain 7-15 digits
+    """
+    if not phone:
+        return None
+    
+    number = str(phone).strip().strip("<>")
+    # SIP/tel URIs: keep only the user part, so digits of the host (e.g. an IP) or URI parameters are not read
+    number = re.sub(r'^(sips?|tel):', '', number, flags=re.IGNORECASE)
+    number = re.split(r'[@;]', number, maxsplit=1)[0]
+    
+    digits = re.sub(r'\D', '', number)
+    if not 7 <= len(digits) <= 15:
+        return None
+    return f"+{digits}"
+
+
 def validate_phone_number(phone: str) -> bool:
     """
     Validate phone number format.
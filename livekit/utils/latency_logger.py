@@ -413,6 +413,7 @@ class LatencyProfiler:
         self.start_time = time.time()
         self.checkpoints: Dict[str, float] = {}
         self.metadata: Dict[str, Any] = {}
+        self.stages: Dict[str, Dict[str, Any]] = {}
     
     def checkpoint(self, name: str, metadata: Optional[Dict[str, Any]] = None):
         """Record a checkpoint with optional metadata."""
@@ -420,6 +421,22 @@ class LatencyProfiler:
         if metadata:
             self.metadata[name] = metadata
     
+    def record_stage(
+        self,
+        name: str,
+        started_at: float,
+        finished_at: float,
+        success: bool = True,
+        metadata: Optional[Dict[str, Any]] = None
+    ):
+        """Record a stage that may overlap other stages (unlike sequential checkpoints)."""
+        self.stages[name] = {
+            "started_at": started_at,
+            "finished_at": finished_at,
+            "success": success,
+            "metadata": metadata or {}
+        }
+    
     def finish(self, success: bool = True, error: Optional[str] = None):
         """Finish profiling and log all measurements."""
         total_duration = (time.time() - self.start_time) * 1000
@@ -450,6 +467,19 @@ class LatencyProfiler:
             
             prev_time = checkpoint_time
         
+        # Log concurrent stage durations with their offset from the profiler start
+        for stage_name, stage in self.stages.items():
+            stage_metadata = dict(stage["metadata"])
+            stage_metadata["offset_ms"] = round((stage["started_at"] - self.start_time) * 1000, 2)
+            
+            log_latency_measurement(
+                operation=f"{self.operation}.stage.{stage_name}",
+                duration_ms=(stage["finished_at"] - stage["started_at"]) * 1000,
+                call_id=self.call_id,
+                metadata=stage_metadata,
+                success=stage["success"]
+            )
+        
         # Log final segment
         if self.checkpoints:
             final_checkpoint_time = max(self.checkpoints.values())
@@ -0,0 +1,81 @@
+"""
+Async token-bucket rate limiting, one bucket per key.
+
+A bucket refills at ``rate`` tokens per second up to ``burst``. ``acquire``
+reserves a token immediately and sleeps only for as long as the bucket is in
+debt, so waiters are served in arrival order without holding a lock across
+the sleep, and callers on different keys never wait for each other.
+"""
+
+import time
+import asyncio
+from typing import Any, Dict, Hashable
+
+
+class TokenBucket:
+    """Token bucket for a single key."""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = max(float(rate), 1e-6)
+        self.burst = max(float(burst), 1.0)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+
+    def reserve(self) -> float:
+        """Take one token and return how many seconds the caller must wait before using it."""
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        self._tokens -= 1
+        return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def refund(self) -> None:
+        self._tokens = min(self.burst, self._tokens + 1)
+
+    async def acquire(self) -> float:
+        """Wait for a token. Returns the time spent waiting, in seconds."""
+        wait = self.reserve()
+        if wait > 0:
+            try:
+                await asyncio.sleep(wait)
+            except asyncio.CancelledError:
+                # Give the reserved token back so later waiters are not delayed for nothing
+                self.refund()
+                raise
+        return wait
+
+
+class KeyedRateLimiter:
+    """Independent token buckets per key, with queueing-delay counters."""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self._buckets: Dict[Hashable, TokenBucket] = {}
+        self._stats: Dict[str, Any] = {
+            "acquired": 0,
+            "delayed": 0,
+            "total_wait_ms": 0.0,
+            "max_wait_ms": 0.0,
+        }
+
+    async def acquire(self, key: Hashable) -> float:
+        """Wait for a token for ``key``. Returns the queueing delay in seconds."""
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(self.rate, self.burst)
+        wait = await bucket.acquire()
+
+        wait_ms = wait * 1000
+        self._stats["acquired"] += 1
+        if wait > 0:
+            self._stats["delayed"] += 1
+            self._stats["total_wait_ms"] += wait_ms
+            self._stats["max_wait_ms"] = max(self._stats["max_wait_ms"], round(wait_ms, 2))
+        return wait
+
+    def snapshot(self) -> Dict[str, Any]:
+        stats = dict(self._stats)
+        stats["total_wait_ms"] = round(stats["total_wait_ms"], 2)
+        stats["keys"] = len(self._buckets)
+        return stats
@@ -0,0 +1,39 @@
+"""
+De-duplication of concurrent identical async work.
+
+While a call for a key is in flight, later callers with the same key await
+the same task instead of starting their own. The task is shielded, so a
+caller that gives up (e.g. its call ended) does not cancel the result the
+other callers are waiting for.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """In-flight request map: one running task per key."""
+
+    def __init__(self) -> None:
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self.leaders = 0
+        self.joined = 0
+
+    def in_flight(self, key: Hashable) -> bool:
+        return key in self._inflight
+
+    def stats(self) -> Dict[str, int]:
+        """Runs started (``leaders``) and callers that joined a run already in flight (``joined``)."""
+        return {"leaders": self.leaders, "joined": self.joined, "in_flight": len(self._inflight)}
+
+    async def do(self, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """Return the result of ``factory()``, sharing one run among concurrent callers for ``key``."""
+        task = self._inflight.get(key)
+        if task is None:
+            self.leaders += 1
+            task = asyncio.ensure_future(factory())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.joined += 1
+        return await asyncio.shield(task)
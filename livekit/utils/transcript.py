@@ -0,0 +1,223 @@
+"""
+Normalised call transcript shared by every post-call consumer.
+
+The session history is flattened into ``{"role", "content"}`` turns once, when
+the call ends. The text renderings the analysis prompts need (``role: text``
+lines, ``Caller:/Assistant:`` lines, the lower-cased text used by keyword
+heuristics) and token counts are each built the first time they are read and
+then reused.
+
+Long calls are fitted to a per-task token budget with ``Transcript.window``:
+the opening turns, the most recent turns and the salient turns in between
+(tool calls, contact details, booking confirmations) are kept, and the rest
+is replaced by an omission marker. Tokens are counted with ``tiktoken`` when
+it is installed and its encoding was loaded at startup (``load_tokenizer`` /
+``warm_tokenizer``), otherwise estimated at about four characters per token.
+"""
+
+import re
+import asyncio
+import logging
+from functools import cached_property
+from typing import Any, Dict, Iterable, Iterator, List, Sequence, Set, Tuple
+
+try:
+    import tiktoken
+    TIKTOKEN_AVAILABLE = True
+except ImportError:
+    tiktoken = None
+    TIKTOKEN_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Share of a window's budget reserved for the opening and the most recent turns
+HEAD_SHARE = 0.2
+TAIL_SHARE = 0.5
+
+_SALIENT_PATTERNS = (
+    re.compile(r"[\w.+-]+@[\w-]+\.[\w.]+"),  # email address
+    re.compile(r"\+?\d[\d\s().-]{6,}\d"),  # phone number
+    re.compile(
+        r"\b(book(ed|ing)?|appointment|schedul(e|ed|ing)|reschedul\w*|confirm(ed|ation)?|cancel\w*)\b",
+        re.IGNORECASE,
+    ),
+)
+
+_encoding = None
+_encoding_loaded = False
+
+
+def load_tokenizer() -> bool:
+    """Load the ``o200k_base`` encoding once; returns whether it is available.
+
+    May read (or download) the BPE file, so call it from prewarm or a thread
+    (``warm_tokenizer``), never from the event loop.
+    """
+    global _encoding, _encoding_loaded
+    if _encoding_loaded:
+        return _encoding is not None
+    if TIKTOKEN_AVAILABLE:
+        try:
+            _encoding = tiktoken.get_encoding("o200k_base")
+            logger.info("TOKENIZER_LOADED | encoding=o200k_base")
+        except Exception as e:
+            # The encoding file may not be downloadable (offline workers)
+            logger.warning(f"TOKENIZER_UNAVAILABLE | error={str(e)} | using estimate")
+    _encoding_loaded = True
+    return _encoding is not None
+
+
+async def warm_tokenizer() -> bool:
+    """``load_tokenizer`` off the event loop."""
+    return await asyncio.to_thread(load_tokenizer)
+
+
+def count_tokens(text: str) -> int:
+    """Token count with the local tokenizer once loaded, otherwise a four-characters-per-token estimate."""
+    if _encoding is not None:
+        return len(_encoding.encode(text, disallowed_special=()))
+    return (len(text) + 3) // 4
+
+
+def _content_text(content: Any) -> str:
+    if isinstance(content, list):
+        return " ".join(str(part).strip() for part in content if part and str(part).strip())
+    if not isinstance(content, str):
+        return str(content)
+    return content
+
+
+class Transcript(Sequence):
+    """Read-only list of ``{"role", "content"}`` turns with cached text renderings."""
+
+    def __init__(self, turns: List[Dict[str, str]]):
+        self._turns = turns
+        self._windows: Dict[Tuple[int, bool], str] = {}
+
+    @classmethod
+    def from_session_history(cls, items: Iterable[Any]) -> "Transcript":
+        """Keep dict items with a role and non-empty content; list contents are joined."""
+        turns = []
+        for item in items:
+            if isinstance(item, dict) and "role" in item and "content" in item:
+                content = _content_text(item["content"]).strip()
+                if content:
+                    turns.append({"role": item["role"], "content": content})
+        return cls(turns)
+
+    @classmethod
+    def of(cls, transcription: Any) -> "Transcript":
+        """Return ``transcription`` if it already is a Transcript, otherwise normalise it."""
+        if isinstance(transcription, cls):
+            return transcription
+        return cls.from_session_history(transcription or [])
+
+    def __len__(self) -> int:
+        return len(self._turns)
+
+    def __getitem__(self, index):
+        return self._turns[index]
+
+    def __iter__(self) -> Iterator[Dict[str, str]]:
+        return iter(self._turns)
+
+    def to_list(self) -> List[Dict[str, str]]:
+        return list(self._turns)
+
+    @cached_property
+    def lines(self) -> List[str]:
+        """``role: content`` lines, as sent to the summary, success and extraction prompts."""
+        return [f"{turn['role']}: {turn['content']}" for turn in self._turns]
+
+    @cached_property
+    def speaker_lines(self) -> List[str]:
+        """``Assistant:``/``Caller:`` lines, as sent to outcome analysis."""
+        return [
+            f"{'Assistant' if turn['role'] == 'assistant' else 'Caller'}: {turn['content']}"
+            for turn in self._turns
+        ]
+
+    @cached_property
+    def text(self) -> str:
+        return "".join(f"{line}\n" for line in self.lines)
+
+    @cached_property
+    def lower_text(self) -> str:
+        """All turn contents lower-cased, for keyword heuristics."""
+        return " ".join(turn["content"].lower() for turn in self._turns)
+
+    @cached_property
+    def turn_tokens(self) -> List[int]:
+        """Tokens per ``lines`` entry."""
+        return [count_tokens(line) + 1 for line in self.lines]
+
+    @cached_property
+    def token_count(self) -> int:
+        """Tokens of the whole transcript."""
+        return sum(self.turn_tokens)
+
+    @cached_property
+    def salient_turns(self) -> Set[int]:
+        """Indexes of tool turns and turns mentioning contact details or bookings."""
+        salient = set()
+        for index, turn in enumerate(self._turns):
+            if turn["role"] not in ("user", "assistant") or any(p.search(turn["content"]) for p in _SALIENT_PATTERNS):
+                salient.add(index)
+        return salient
+
+    def window(self, max_tokens: int, speaker_labels: bool = False) -> str:
+        """The transcript fitted to ``max_tokens``: head, tail and salient turns in call order.
+
+        Returns the full rendering when it already fits.
+        """
+        cache_key = (max_tokens, speaker_labels)
+        if cache_key in self._windows:
+            return self._windows[cache_key]
+
+        lines = self.speaker_lines if speaker_labels else self.lines
+        if self.token_count <= max_tokens:
+            window = "\n".join(lines)
+        else:
+            window = "\n".join(self._window_parts(lines, max_tokens))
+        self._windows[cache_key] = window
+        return window
+
+    def _window_parts(self, lines: List[str], max_tokens: int) -> List[str]:
+        costs = self.turn_tokens
+        selected: Set[int] = set()
+        used = 0
+
+        for index in range(len(lines)):
+            if used + costs[index] > max_tokens * HEAD_SHARE:
+                break
+            selected.add(index)
+            used += costs[index]
+
+        tail_used = 0
+        for index in reversed(range(len(lines))):
+            if index in selected or tail_used + costs[index] > max_tokens * TAIL_SHARE:
+                break
+            selected.add(index)
+            tail_used += costs[index]
+        used += tail_used
+
+        # Most recent salient turns first, while they fit
+        for index in sorted(self.salient_turns, reverse=True):
+            if index not in selected and used + costs[index] <= max_tokens:
+                selected.add(index)
+                used += costs[index]
+
+        last_index = len(lines) - 1
+        if last_index not in selected:
+            # The final turn alone exceeds the tail budget: keep its end
+            selected.add(last_index)
+            lines = lines[:last_index] + ["[...]" + lines[last_index][-int(max_tokens * TAIL_SHARE * 4):]]
+
+        parts: List[str] = []
+        previous = -1
+        for index in sorted(selected):
+            if index - previous > 1:
+                parts.append(f"[... {index - previous - 1} turns omitted ...]")
+            parts.append(lines[index])
+            previous = index
+        return parts
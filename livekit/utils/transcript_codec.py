@@ -0,0 +1,150 @@
+"""
+Compact storage format for call transcripts.
+
+A transcript is normally stored as a list of ``{"role", "content"}`` dicts,
+which repeats the key names for every turn and grows with each word spoken.
+The compact format keeps one small integer per turn for the role, all turn
+texts concatenated into a single UTF-8 buffer with byte offsets, and
+compresses that buffer (zstd when ``zstandard`` is installed, zlib
+otherwise) once it passes a size threshold:
+
+    {
+        "format": "compact-v1",
+        "roles": ["user", "assistant"],   # role table
+        "role_codes": [1, 0, 1, ...],     # index into "roles" per turn
+        "offsets": [0, 27, 61, ...],      # byte offset where each turn starts
+        "codec": "zstd" | "zlib" | "none",
+        "text": <bytes or str>            # concatenated turn texts
+    }
+
+Offsets are UTF-8 byte offsets so any language can slice the buffer.
+``CompactTranscript`` decodes lazily: the buffer is decompressed on first
+access and individual turns are only decoded when read.
+"""
+
+import zlib
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Union
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    zstandard = None
+    ZSTD_AVAILABLE = False
+
+COMPACT_FORMAT = "compact-v1"
+
+
+def is_compact(value: Any) -> bool:
+    return isinstance(value, dict) and value.get("format") == COMPACT_FORMAT
+
+
+def encode_transcript(
+    turns: Sequence[Dict[str, Any]],
+    compress_threshold: int = 4096,
+    codec: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Encode ``{"role", "content"}`` turns; the text is compressed when it exceeds ``compress_threshold`` bytes.
+
+    ``codec`` ("zstd" or "zlib") picks the compression; by default zstd when installed.
+    """
+    roles: List[str] = []
+    role_index: Dict[str, int] = {}
+    role_codes: List[int] = []
+    offsets: List[int] = []
+    chunks: List[bytes] = []
+    position = 0
+
+    for turn in turns:
+        role = str(turn.get("role", ""))
+        if role not in role_index:
+            role_index[role] = len(roles)
+            roles.append(role)
+        encoded = str(turn.get("content", "")).encode("utf-8")
+        role_codes.append(role_index[role])
+        offsets.append(position)
+        chunks.append(encoded)
+        position += len(encoded)
+
+    buffer = b"".join(chunks)
+    if len(buffer) <= compress_threshold:
+        codec, text = "none", buffer.decode("utf-8")
+    elif (codec or "zstd") == "zstd" and ZSTD_AVAILABLE:
+        codec, text = "zstd", zstandard.ZstdCompressor(level=3).compress(buffer)
+    else:
+        codec, text = "zlib", zlib.compress(buffer, 6)
+
+    return {
+        "format": COMPACT_FORMAT,
+        "roles": roles,
+        "role_codes": role_codes,
+        "offsets": offsets,
+        "codec": codec,
+        "text": text,
+    }
+
+
+class CompactTranscript(Sequence):
+    """Read-only, lazily decoded view of a compact transcript.
+
+    Behaves like the list of ``{"role", "content"}`` dicts it was encoded from.
+    """
+
+    def __init__(self, encoded: Dict[str, Any]):
+        if not is_compact(encoded):
+            raise ValueError("Not a compact transcript")
+        self._encoded = encoded
+        self._buffer: Optional[bytes] = None
+
+    def _text_buffer(self) -> bytes:
+        if self._buffer is None:
+            codec = self._encoded.get("codec", "none")
+            text = self._encoded.get("text", b"")
+            if codec == "none":
+                self._buffer = text.encode("utf-8") if isinstance(text, str) else bytes(text)
+            elif codec == "zstd":
+                if not ZSTD_AVAILABLE:
+                    raise RuntimeError("zstandard is required to read this transcript")
+                self._buffer = zstandard.ZstdDecompressor().decompress(bytes(text))
+            elif codec == "zlib":
+                self._buffer = zlib.decompress(bytes(text))
+            else:
+                raise ValueError(f"Unknown transcript codec: {codec}")
+        return self._buffer
+
+    def __len__(self) -> int:
+        return len(self._encoded["role_codes"])
+
+    def role(self, index: int) -> str:
+        """Role of a turn; does not decompress the text."""
+        return self._encoded["roles"][self._encoded["role_codes"][index]]
+
+    def content(self, index: int) -> str:
+        offsets = self._encoded["offsets"]
+        buffer = self._text_buffer()
+        start = offsets[index]
+        end = offsets[index + 1] if index + 1 < len(offsets) else len(buffer)
+        return buffer[start:end].decode("utf-8")
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("transcript index out of range")
+        return {"role": self.role(index), "content": self.content(index)}
+
+    def __iter__(self) -> Iterator[Dict[str, str]]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def to_list(self) -> List[Dict[str, str]]:
+        return list(self)
+
+
+def read_transcript(value: Any) -> Union[Sequence[Dict[str, Any]], CompactTranscript]:
+    """Return a list-like view over a stored transcription in either format."""
+    if is_compact(value):
+        return CompactTranscript(value)
+    return value or []
@@ -0,0 +1,172 @@
+"""
+Small in-process cache with per-entry TTL and least-recently-used eviction.
+
+Caches can be bounded by entry count and, optionally, by approximate size in
+bytes. Each keeps hit/miss/eviction counters. Process-wide caches are
+registered by namespace with ``get_cache``; their limits can be overridden per
+namespace from the environment (``CACHE_<NAMESPACE>_MAX_ENTRIES``,
+``CACHE_<NAMESPACE>_MAX_BYTES``, ``CACHE_<NAMESPACE>_TTL_SECONDS``).
+"""
+
+import os
+import sys
+import time
+import threading
+import dataclasses
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+def approximate_size(value: Any, _depth: int = 0) -> int:
+    """Rough deep size in bytes of common containers, strings and dataclasses."""
+    size = sys.getsizeof(value)
+    if _depth > 6:
+        return size
+    if isinstance(value, dict):
+        return size + sum(approximate_size(k, _depth + 1) + approximate_size(v, _depth + 1) for k, v in value.items())
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return size + sum(approximate_size(item, _depth + 1) for item in value)
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return size + sum(approximate_size(getattr(value, f.name), _depth + 1) for f in dataclasses.fields(value))
+    return size
+
+
+class TTLCache:
+    """Bounded cache where every operation is O(1) (amortised).
+
+    Entries expire ``ttl`` seconds after they were stored. When the cache is
+    over ``max_entries`` (or ``max_bytes``, when set) the least recently used
+    entries are evicted. ``on_evict(key, value)``, when given, is called for
+    every entry dropped by expiry or eviction (not for ``pop``/``clear``).
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl: float = 300.0,
+        max_bytes: Optional[int] = None,
+        sizer: Callable[[Any], int] = approximate_size,
+        on_evict: Optional[Callable[[Hashable, Any], None]] = None,
+    ):
+        self.max_entries = max(1, int(max_entries))
+        self.ttl = float(ttl)
+        self.max_bytes = int(max_bytes) if max_bytes else None
+        self._sizer = sizer
+        self._on_evict = on_evict
+        # key -> (value, expires_at, size_bytes)
+        self._data: "OrderedDict[Hashable, Tuple[Any, float, int]]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value, or ``default`` when missing or expired."""
+        item = self._data.get(key)
+        if item is None:
+            self.misses += 1
+            return default
+        value, expires_at, _ = item
+        if expires_at <= time.monotonic():
+            self._evict(key)
+            self.expirations += 1
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Store a value, evicting least recently used entries beyond the limits."""
+        now = time.monotonic()
+        expires_at = now + (self.ttl if ttl is None else float(ttl))
+        size = self._sizer(value) if self.max_bytes else 0
+        if key in self._data:
+            self._remove(key)
+        self._data[key] = (value, expires_at, size)
+        self._bytes += size
+
+        # Drop already-expired entries sitting at the LRU end before evicting live ones
+        while self._data:
+            oldest_key, (_, oldest_expires_at, _) = next(iter(self._data.items()))
+            if oldest_expires_at > now or oldest_key == key:
+                break
+            self._evict(oldest_key)
+            self.expirations += 1
+
+        while len(self._data) > self.max_entries or (self.max_bytes and self._bytes > self.max_bytes and len(self._data) > 1):
+            oldest_key = next(iter(self._data))
+            self._evict(oldest_key)
+            self.evictions += 1
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """Remove an entry and return its value (expired or not)."""
+        item = self._data.get(key)
+        if item is None:
+            return default
+        self._remove(key)
+        return item[0]
+
+    def _remove(self, key: Hashable) -> Any:
+        value, _, size = self._data.pop(key)
+        self._bytes -= size
+        return value
+
+    def _evict(self, key: Hashable) -> None:
+        value = self._remove(key)
+        if self._on_evict is not None:
+            self._on_evict(key, value)
+
+    def clear(self) -> None:
+        self._data.clear()
+        self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._data),
+            "bytes": self._bytes if self.max_bytes else None,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+    def __contains__(self, key: Hashable) -> bool:
+        item = self._data.get(key)
+        return item is not None and item[1] > time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+# Process-wide caches by namespace
+_caches: Dict[str, TTLCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_cache(namespace: str, max_entries: int = 1024, ttl: float = 300.0, max_bytes: Optional[int] = None) -> TTLCache:
+    """Return the process-wide cache for ``namespace``, creating it on first use.
+
+    The arguments are defaults; ``CACHE_<NAMESPACE>_*`` variables override them.
+    """
+    with _caches_lock:
+        cache = _caches.get(namespace)
+        if cache is None:
+            prefix = f"CACHE_{namespace.upper()}_"
+            cache = TTLCache(
+                max_entries=int(os.getenv(f"{prefix}MAX_ENTRIES", str(max_entries))),
+                ttl=float(os.getenv(f"{prefix}TTL_SECONDS", str(ttl))),
+                max_bytes=int(os.getenv(f"{prefix}MAX_BYTES", str(max_bytes or 0))) or None,
+            )
+            _caches[namespace] = cache
+        return cache
+
+
+def cache_stats() -> Dict[str, Dict[str, Any]]:
+    """Counters of every namespaced cache."""
+    with _caches_lock:
+        caches = dict(_caches)
+    return {namespace: cache.stats() for namespace, cache in caches.items()}
@@ -1,6 +1,7 @@
 import express from 'express';
 import { authenticateToken } from '../utils/auth.js';
 import { CallHistory, Assistant } from '../models/index.js';
+import { safeDecodeTranscript } from '../utils/transcript-codec.js';
 
 const router = express.Router();
 
@@ -100,7 +101,8 @@ router.get('/', authenticateToken, async (req, res) => {
                 type: 'Inbound', // Default for now, as CallHistory doesn't specify
                 call_outcome: call.call_status,
                 summary: call.summary,
-                transcript: call.transcription, // Might be object or string, frontend handles it?
+                // Compact transcripts (TRANSCRIPT_COMPACT_ENCODING) are decoded to [{role, content}]
+                transcript: safeDecodeTranscript(call.transcription, call.call_id),
                 call_recording: call.recording_url,
                 call_sid: call.call_sid || call.call_id,
                 analysis: call.sentiment ? { sentiment: call.sentiment } : null
@@ -213,7 +215,7 @@ router.get('/:id', authenticateToken, async (req, res) => {
             type: 'Inbound',
             call_outcome: call.call_status,
             summary: call.summary,
-            transcript: call.transcription,
+            transcript: safeDecodeTranscript(call.transcription, call.call_id),
             call_recording: call.recording_url,
             call_sid: call.call_sid || call.call_id,
             analysis: call.sentiment ? { sentiment: call.sentiment } : null
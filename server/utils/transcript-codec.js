@@ -0,0 +1,76 @@
+/**
+ * Decoding of compact call transcripts
+ * The voice agent can store callhistories.transcription in the "compact-v1"
+ * format (TRANSCRIPT_COMPACT_ENCODING=true, see livekit/utils/transcript_codec.py):
+ * a role table, one role code and one UTF-8 byte offset per turn, and all turn
+ * texts in one buffer that may be zlib or zstd compressed.
+ */
+
+import zlib from 'zlib';
+
+export const COMPACT_FORMAT = 'compact-v1';
+
+/**
+ * @param {any} value - Stored transcription
+ * @returns {boolean} - Whether it is a compact transcript
+ */
+export const isCompactTranscript = (value) =>
+  !!value && typeof value === 'object' && !Array.isArray(value) && value.format === COMPACT_FORMAT;
+
+// BSON Binary (driver) or Buffer -> Buffer
+const toBuffer = (value) => {
+  if (Buffer.isBuffer(value)) return value;
+  if (value && value.buffer) return Buffer.from(value.buffer);
+  if (value instanceof Uint8Array) return Buffer.from(value);
+  throw new Error('Unsupported transcript buffer');
+};
+
+const textBuffer = (encoded) => {
+  const codec = encoded.codec || 'none';
+  const text = encoded.text ?? '';
+  if (codec === 'none') {
+    return typeof text === 'string' ? Buffer.from(text, 'utf8') : toBuffer(text);
+  }
+  if (codec === 'zlib') {
+    return zlib.inflateSync(toBuffer(text));
+  }
+  if (codec === 'zstd') {
+    // Built into zlib from Node 22.15 / 23.8
+    if (typeof zlib.zstdDecompressSync !== 'function') {
+      throw new Error('zstd transcripts need Node >= 22.15');
+    }
+    return zlib.zstdDecompressSync(toBuffer(text));
+  }
+  throw new Error(`Unknown transcript codec: ${codec}`);
+};
+
+/**
+ * @param {any} value - Stored transcription, plain or compact
+ * @returns {Array<{role: string, content: string}>|any} - Plain turns; non-compact values are returned as is
+ */
+export const decodeTranscript = (value) => {
+  if (!isCompactTranscript(value)) return value;
+
+  const buffer = textBuffer(value);
+  const { roles = [], role_codes: roleCodes = [], offsets = [] } = value;
+  return roleCodes.map((code, index) => {
+    const start = offsets[index];
+    const end = index + 1 < offsets.length ? offsets[index + 1] : buffer.length;
+    return { role: roles[code], content: buffer.subarray(start, end).toString('utf8') };
+  });
+};
+
+/**
+ * Like decodeTranscript, but never throws: an undecodable transcript becomes an empty list
+ * @param {any} value - Stored transcription
+ * @param {string} callId - For the error log
+ * @returns {any}
+ */
+export const safeDecodeTranscript = (value, callId) => {
+  try {
+    return decodeTranscript(value);
+  } catch (error) {
+    console.error(`Error decoding transcript for call ${callId}:`, error.message);
+    return [];
+  }
+};